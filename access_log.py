@@ -0,0 +1,293 @@
+"""
+Redirect access log.
+
+With ACCESS_LOG_DIR set, every resolved redirect is recorded by appending
+(time, short_path) to an in-memory buffer; the request thread does nothing
+else. A background thread per worker writes the buffer out every
+ACCESS_LOG_FLUSH_INTERVAL seconds as JSON lines to its own file,
+``access.<pid>.jsonl``, so workers never interleave writes. Once that file
+reaches ACCESS_LOG_MAX_BYTES, or is older than ACCESS_LOG_MAX_AGE seconds,
+it is renamed to ``access.<pid>.<timestamp>.jsonl`` and a new one started.
+
+A worker flushes and rotates its file when it exits (at interpreter exit,
+and from gunicorn's ``worker_exit`` hook). Rotated files are complete and
+never written again. ``aggregate_access_logs`` (see
+scripts/aggregate_access_log.py) streams them into per-link, per-day counts
+in the ``link_daily_hits`` table and deletes them; the admin Stats page
+reports top and unused links from there. Active files left behind by a
+worker that died without rotating are rotated by the aggregator first.
+"""
+
+import atexit
+import glob
+import heapq
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from operator import attrgetter
+
+from sqlalchemy import exists, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from extensions import db
+from models import GoLink, LinkDailyHits
+from storage import get_store
+
+ACTIVE_SUFFIX = '.jsonl'
+# Appended to rotated files kept after aggregation, so they aren't counted again
+DONE_SUFFIX = '.done'
+
+
+class AccessLogWriter:
+    """Buffers redirect records and writes them from a background thread."""
+
+    def __init__(self, directory, max_bytes=16 * 1024 * 1024, max_age=3600.0, flush_interval=1.0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.flush_interval = flush_interval
+        self._buffer = deque()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._file = None
+        self._opened_at = 0.0
+        self._rotations = 0
+
+    def record(self, short_path):
+        # deque.append is atomic, so request threads never take a lock here
+        if self._pid != os.getpid():
+            self._start()
+        self._buffer.append((time.time(), short_path))
+
+    def _start(self):
+        # Started lazily in the worker process; a forked child starts its own
+        # thread and file instead of sharing the parent's
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            self._file = None
+            self._buffer.clear()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='access-log', daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+            # Otherwise the records of an exiting worker sit in its active
+            # file, which the aggregator only takes once the pid is gone
+            atexit.register(self.stop, rotate=True)
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, f'access.{self._pid}{ACTIVE_SUFFIX}')
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        """Write out everything buffered so far, rotating the file if it is due."""
+        lines = []
+        while True:
+            try:
+                timestamp, short_path = self._buffer.popleft()
+            except IndexError:
+                break
+            lines.append(json.dumps({'t': round(timestamp, 3), 'p': short_path}, ensure_ascii=False))
+        if self._file is None and not lines:
+            return
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+            self._opened_at = time.monotonic()
+        if lines:
+            self._file.write('\n'.join(lines) + '\n')
+            self._file.flush()
+        size = self._file.tell()
+        if size >= self.max_bytes or (size and time.monotonic() - self._opened_at >= self.max_age):
+            self.rotate()
+
+    def rotate(self):
+        """Close the current file and rename it so the aggregator picks it up."""
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        self._rotations += 1
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+        rotated = os.path.join(self.directory, f'access.{self._pid}.{stamp}-{self._rotations}{ACTIVE_SUFFIX}')
+        os.replace(self.path, rotated)
+
+    def stop(self, rotate=False):
+        """Stop the thread after a final flush; optionally rotate the last file."""
+        if self._pid != os.getpid():
+            # Not started in this process (e.g. a gunicorn master after fork)
+            return
+        atexit.unregister(self.stop)
+        if self._thread is not None and self._thread.is_alive():
+            self._stop.set()
+            self._thread.join()
+        if rotate:
+            self.rotate()
+
+
+def pid_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def rotate_orphaned_files(directory):
+    """
+    Rotate the active files of workers that are no longer running, which
+    exited without rotating them (killed, or crashed). Returns how many.
+    """
+    rotated = 0
+    for path in glob.glob(os.path.join(directory, f'access.*{ACTIVE_SUFFIX}')):
+        pid = os.path.basename(path)[len('access.'):-len(ACTIVE_SUFFIX)]
+        if not pid.isdigit() or pid_running(int(pid)):
+            continue
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+        try:
+            os.replace(path, os.path.join(directory, f'access.{pid}.{stamp}-orphan{ACTIVE_SUFFIX}'))
+        except FileNotFoundError:
+            continue
+        rotated += 1
+    return rotated
+
+
+def rotated_files(directory):
+    """Rotated log files in ``directory``, oldest first."""
+    paths = glob.glob(os.path.join(directory, f'access.*.*{ACTIVE_SUFFIX}'))
+    return sorted(paths, key=os.path.getmtime)
+
+
+def read_records(path):
+    """Yield (day, short_path) for each record in a log file, skipping damaged lines."""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                day = datetime.fromtimestamp(record['t'], timezone.utc).date()
+                yield day, record['p']
+            except (ValueError, KeyError, TypeError):
+                continue
+
+
+def _save_counts(counts):
+    stmt = sqlite_insert(LinkDailyHits)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[LinkDailyHits.short_path, LinkDailyHits.day],
+        set_={'hits': LinkDailyHits.hits + stmt.excluded.hits})
+    db.session.execute(stmt, [{'short_path': short_path, 'day': day, 'hits': hits}
+                              for (short_path, day), hits in counts.items()])
+
+
+def aggregate_access_logs(directory, keep=False, max_keys=10000):
+    """
+    Add the records of every rotated log file to ``link_daily_hits``,
+    after rotating those left active by workers that have exited.
+
+    Files are streamed line by line and counts are written out whenever
+    ``max_keys`` distinct (link, day) pairs have piled up, so memory stays
+    bounded however large the logs are. Each file is committed separately
+    and then deleted, or with ``keep`` renamed with a ``.done`` suffix so
+    later runs skip it. Returns (files, records).
+    """
+    files = records = 0
+    rotate_orphaned_files(directory)
+    for path in rotated_files(directory):
+        counts = {}
+        for day, short_path in read_records(path):
+            key = (short_path, day)
+            counts[key] = counts.get(key, 0) + 1
+            records += 1
+            if len(counts) >= max_keys:
+                _save_counts(counts)
+                counts.clear()
+        if counts:
+            _save_counts(counts)
+        db.session.commit()
+        if keep:
+            os.replace(path, path + DONE_SUFFIX)
+        else:
+            os.unlink(path)
+        files += 1
+    return files, records
+
+
+def _merged_by_hits(query, limit):
+    # Run in every database holding links; each link lives in one of them,
+    # so per-database totals are complete
+    rows = [row for session in get_store().link_sessions() for row in session.execute(query).all()]
+    return sorted(rows, key=lambda row: (-row.hits, row.short_path))[:limit]
+
+
+def top_links(days=30, limit=20):
+    """(short_path, hits) for the most-used existing links over the last ``days`` days."""
+    since = datetime.now(timezone.utc).date() - timedelta(days=days)
+    total = func.sum(LinkDailyHits.hits).label('hits')
+    query = (select(LinkDailyHits.short_path, total)
+             .join(GoLink, GoLink.short_path == LinkDailyHits.short_path)
+             .where(LinkDailyHits.day >= since)
+             .group_by(LinkDailyHits.short_path)
+             .order_by(total.desc(), LinkDailyHits.short_path)
+             .limit(limit))
+    return _merged_by_hits(query, limit)
+
+
+def popular_links(days=30, limit=10000):
+    """(short_path, target_url, hits) for the most-used links, for warming caches."""
+    since = datetime.now(timezone.utc).date() - timedelta(days=days)
+    total = func.sum(LinkDailyHits.hits).label('hits')
+    query = (select(GoLink.short_path, GoLink.target_url, total)
+             .join(LinkDailyHits, LinkDailyHits.short_path == GoLink.short_path)
+             .where(LinkDailyHits.day >= since)
+             .group_by(GoLink.short_path)
+             .order_by(total.desc(), GoLink.short_path)
+             .limit(limit))
+    return _merged_by_hits(query, limit)
+
+
+def hit_counts(days=30, limit=10000):
+    """
+    (short_path, hits) for the most-used short paths, most used first.
+    Unlike top_links, paths aren't checked against the links table, so
+    this is one query on the main database however links are stored.
+    """
+    since = datetime.now(timezone.utc).date() - timedelta(days=days)
+    total = func.sum(LinkDailyHits.hits).label('hits')
+    query = (select(LinkDailyHits.short_path, total)
+             .where(LinkDailyHits.day >= since)
+             .group_by(LinkDailyHits.short_path)
+             .order_by(total.desc(), LinkDailyHits.short_path)
+             .limit(limit))
+    return db.session.execute(query).all()
+
+
+def unused_links(days=30, limit=100):
+    """Links with no recorded use over the last ``days`` days, by short_path."""
+    since = datetime.now(timezone.utc).date() - timedelta(days=days)
+    used = exists().where(LinkDailyHits.short_path == GoLink.short_path, LinkDailyHits.day >= since)
+    lists = (session.query(GoLink).filter(~used).order_by(GoLink.short_path).limit(limit).all()
+             for session in get_store().link_sessions())
+    return list(islice(heapq.merge(*lists, key=attrgetter('short_path')), limit))
+
+
+def init_access_log(app):
+    directory = app.config['ACCESS_LOG_DIR']
+    if directory:
+        app.extensions['access_log'] = AccessLogWriter(
+            os.path.join(app.instance_path, directory),
+            max_bytes=app.config['ACCESS_LOG_MAX_BYTES'],
+            max_age=app.config['ACCESS_LOG_MAX_AGE'],
+            flush_interval=app.config['ACCESS_LOG_FLUSH_INTERVAL'])
@@ -0,0 +1,45 @@
+"""
+Content-hashed URLs for static assets.
+
+Templates call ``asset_url('css/base.css')`` instead of
+``url_for('static', ...)``. The URL carries a digest of the file contents, so
+browsers may cache it forever: any change to the file produces a new URL.
+"""
+
+import hashlib
+import os
+
+from flask import request, url_for
+
+# One year, the conventional "never expires" value
+FAR_FUTURE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def file_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+def init_assets(app):
+    """Register the ``asset_url`` template global and static cache headers on ``app``."""
+    digests = {}
+
+    def asset_url(filename):
+        path = os.path.join(app.static_folder, filename)
+        # Re-hash on every call while debugging so edits show up immediately
+        digest = None if app.debug else digests.get(filename)
+        if digest is None:
+            digest = digests[filename] = file_digest(path)
+        return url_for('static', filename=filename, v=digest)
+
+    app.add_template_global(asset_url)
+
+    @app.after_request
+    def cache_fingerprinted_assets(response):
+        if request.endpoint == 'static' and request.args.get('v') and response.status_code == 200:
+            response.cache_control.public = True
+            response.cache_control.max_age = FAR_FUTURE_MAX_AGE
+            response.cache_control.immutable = True
+        return response
+
+    return asset_url
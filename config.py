@@ -0,0 +1,78 @@
+import os
+
+
+class Config:
+    """Default settings. ``create_app`` applies overrides on top of these."""
+
+    # Cookie signing key, shared by all workers. If unset, one is generated
+    # once and kept in the instance folder (see sessions.py)
+    SECRET_KEY = os.environ.get('GOLINKS_SECRET_KEY')
+    # '' keeps sessions in the signed cookie; 'sqlite' keeps them server-side
+    # in SESSION_DB_PATH (relative to the instance folder)
+    SESSION_STORE = os.environ.get('GOLINKS_SESSION_STORE', '')
+    SESSION_DB_PATH = 'sessions.db'
+    SESSION_SWEEP_INTERVAL = 300.0
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///golinks.db'
+    # werkzeug.security method for new password hashes
+    PASSWORD_HASH_METHOD = 'scrypt'
+    # Max number of rendered list-page fragments kept per worker (0 disables)
+    PAGE_CACHE_SIZE = 512
+    # Redirect cache size per worker, and how often (seconds) to check for
+    # link writes made by other workers
+    LINK_CACHE_SIZE = 10000
+    LINK_CACHE_CHECK_INTERVAL = 1.0
+    # Only let a new link into a full redirect cache if it is requested more
+    # often than the entry it would evict (see popularity.py)
+    LINK_CACHE_ADMISSION = True
+    # Optional directory for compiled template bytecode shared across restarts
+    TEMPLATE_BYTECODE_CACHE_DIR = os.environ.get('GOLINKS_TEMPLATE_CACHE_DIR')
+    # Where redirects are resolved from: 'sql' (the database), 'snapshot'
+    # (a read-only file exported with scripts/export_snapshot.py),
+    # 'linktable' (a file compiled with scripts/compile_link_table.py) or
+    # 'partitioned' (links spread over several SQLite files)
+    LINK_STORE = os.environ.get('GOLINKS_LINK_STORE', 'sql')
+    LINK_SNAPSHOT_PATH = os.environ.get('GOLINKS_LINK_SNAPSHOT_PATH', 'golinks.snapshot')
+    LINK_TABLE_PATH = os.environ.get('GOLINKS_LINK_TABLE_PATH', 'golinks.linktable')
+    # Number of partition files for LINK_STORE = 'partitioned', and their
+    # directory relative to the instance folder. Change the number with
+    # scripts/rebalance_partitions.py, not by editing it alone.
+    LINK_PARTITIONS = int(os.environ.get('GOLINKS_LINK_PARTITIONS', 4))
+    LINK_PARTITION_DIR = os.environ.get('GOLINKS_LINK_PARTITION_DIR', 'partitions')
+    # Commit concurrent link creations together (see group_commit.py)
+    GROUP_COMMIT_ENABLED = os.environ.get('GOLINKS_GROUP_COMMIT', '') == '1'
+    GROUP_COMMIT_MAX_BATCH = 256
+    GROUP_COMMIT_MAX_WAIT = 0.0
+    # Link health checks (see health.py): requests in flight, minimum seconds
+    # between requests to one host, and per-request timeout
+    HEALTH_CHECK_CONCURRENCY = 20
+    HEALTH_CHECK_HOST_INTERVAL = 0.5
+    HEALTH_CHECK_TIMEOUT = 10.0
+    # Redirect access log directory, relative to the instance folder (unset
+    # disables logging), and when each worker's file is rotated: at this many
+    # bytes or seconds, whichever comes first (see access_log.py)
+    ACCESS_LOG_DIR = os.environ.get('GOLINKS_ACCESS_LOG_DIR')
+    ACCESS_LOG_MAX_BYTES = 16 * 1024 * 1024
+    ACCESS_LOG_MAX_AGE = 3600.0
+    ACCESS_LOG_FLUSH_INTERVAL = 1.0
+    # Per-worker concurrency limits (see load_shedding.py). Keep
+    # LOAD_SHEDDING_SHARED_SLOTS below the worker's thread count so some
+    # threads are always left for redirects.
+    LOAD_SHEDDING_ENABLED = os.environ.get('GOLINKS_LOAD_SHEDDING', '') == '1'
+    LOAD_SHEDDING_SHARED_SLOTS = int(os.environ.get('GOLINKS_LOAD_SHEDDING_SHARED_SLOTS', 12))
+    LOAD_SHEDDING_EXPENSIVE_SLOTS = int(os.environ.get('GOLINKS_LOAD_SHEDDING_EXPENSIVE_SLOTS', 4))
+    LOAD_SHEDDING_SHARED_TIMEOUT = 5.0
+    LOAD_SHEDDING_EXPENSIVE_TIMEOUT = 0.1
+    LOAD_SHEDDING_RETRY_AFTER = 2
+    # Sampling profiler (see profiler.py): seconds between samples, and the
+    # longest profile /admin/profile will run
+    PROFILE_INTERVAL = 0.005
+    PROFILE_MAX_SECONDS = 60
+    # Address-bar suggestions (see suggest.py): how many per request, the
+    # days of redirect counts they are ranked by, and how often (seconds)
+    # those counts are reloaded
+    SUGGEST_LIMIT = 10
+    SUGGEST_RANK_DAYS = 30
+    SUGGEST_RANK_INTERVAL = 300.0
+    # Also suggest to visitors who aren't logged in, which lets anyone list
+    # every short path
+    SUGGEST_PUBLIC = os.environ.get('GOLINKS_SUGGEST_PUBLIC', '') == '1'
@@ -0,0 +1,14 @@
+"""Extension instances shared by the app factory, models and views."""
+
+from flask_login import LoginManager
+from flask_sqlalchemy import SQLAlchemy
+
+from link_cache import LinkCache
+from page_cache import FragmentCache
+from schedule import LinkSchedule
+
+db = SQLAlchemy()
+login_manager = LoginManager()
+fragment_cache = FragmentCache()
+link_cache = LinkCache()
+link_schedule = LinkSchedule(link_cache)
@@ -0,0 +1,106 @@
+"""
+Group commit for link creation.
+
+When many people create links at once, committing each one separately
+means one fsync and one trip through SQLite's write lock per request.
+With GROUP_COMMIT_ENABLED, request threads hand their new link to a single
+writer thread per worker. The writer commits everything that queued up
+while its previous commit was in flight (up to GROUP_COMMIT_MAX_BATCH
+links, optionally waiting GROUP_COMMIT_MAX_WAIT seconds for more) in one
+transaction, so batches grow with load and a lone request isn't delayed.
+Each request still gets its own result.
+
+Batching only happens between concurrent requests in the same process, so
+it pays off with threaded workers (``gunicorn -k gthread --threads N``).
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+log = logging.getLogger(__name__)
+
+
+class GroupCommitWriter:
+    """Background thread that commits queued link creations in batches."""
+
+    def __init__(self, app, create_many, max_batch=256, max_wait=0.0, timeout=30.0):
+        self.app = app
+        self.create_many = create_many
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.committed = 0
+
+    def _ensure_started(self):
+        # Started lazily so the thread is created in the worker process, not
+        # in a gunicorn master that forks afterwards
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='group-commit', daemon=True)
+                    self._thread.start()
+
+    def submit(self, short_path, target_url, user_id, not_before=None, expires_at=None):
+        """Queue a link and wait for its batch. Returns False if the path was taken."""
+        self._ensure_started()
+        future = Future()
+        self._queue.put(((short_path, target_url, user_id, not_before, expires_at), future))
+        return future.result(timeout=self.timeout)
+
+    def stop(self):
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Finish this batch, then stop
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            entries = [entry for entry, _ in batch]
+            try:
+                with self.app.app_context():
+                    results = self.create_many(entries)
+            except Exception as exc:
+                log.exception('Group commit of %d links failed', len(batch))
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            self.batches += 1
+            self.committed += sum(results)
+            for (_, future), created in zip(batch, results):
+                future.set_result(created)
+
+
+def init_group_commit(app, store):
+    if app.config['GROUP_COMMIT_ENABLED']:
+        app.extensions['group_commit'] = GroupCommitWriter(
+            app, store.create_many,
+            max_batch=app.config['GROUP_COMMIT_MAX_BATCH'],
+            max_wait=app.config['GROUP_COMMIT_MAX_WAIT'])
@@ -0,0 +1,17 @@
+# Gunicorn configuration: `gunicorn 'app:create_app()'` picks this file up automatically.
+
+
+def post_worker_init(worker):
+    # Runs in each worker after the app is loaded and before it accepts
+    # connections, so no user request pays for template compilation,
+    # mapper configuration or a cold link cache.
+    from warmup import warm_start
+    warm_start(worker.wsgi)
+
+
+def worker_exit(server, worker):
+    # Write out and rotate the worker's access log, so a restart (deploy,
+    # max_requests) doesn't leave its last records unaggregated
+    access_log = worker.wsgi.extensions.get('access_log')
+    if access_log is not None:
+        access_log.stop(rotate=True)
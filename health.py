@@ -0,0 +1,242 @@
+"""
+Link health checks.
+
+``run_health_checks(app)`` checks every link's target URL and stores the
+outcome on the link (``health_*`` columns), which the links page uses to
+flag broken links. It is meant to run out of band, e.g.
+``python scripts/check_links.py --interval 3600`` as a sidecar or cron job,
+so redirect workers never wait on it.
+
+Checks run on asyncio with at most HEALTH_CHECK_CONCURRENCY requests in
+flight and at least HEALTH_CHECK_HOST_INTERVAL seconds between requests to
+the same host, so a thousand links into one wiki don't hammer it. Each
+check sends HEAD and falls back to GET for servers that don't support HEAD.
+Only the status line and headers are read. Re-checks send the
+ETag/Last-Modified seen last time, so unchanged pages answer 304.
+"""
+
+import asyncio
+import ssl
+import time
+from collections import defaultdict, namedtuple
+from datetime import datetime, timezone
+from operator import attrgetter
+from urllib.parse import quote, urlsplit
+
+from sqlalchemy import literal, select, update
+
+from extensions import db
+from models import GoLink, bump_generations
+from storage import get_store
+
+USER_AGENT = 'dgo-links-health/1.0'
+
+# Statuses that mean "this server doesn't do HEAD", not "this page is gone"
+HEAD_UNSUPPORTED = {400, 403, 405, 501}
+
+CheckResult = namedtuple('CheckResult', 'status latency_ms error etag last_modified')
+
+HEALTH_COLUMNS = ['health_status', 'health_latency_ms', 'health_error', 'health_etag',
+                  'health_last_modified', 'health_checked_at']
+
+
+class HealthCheckError(Exception):
+    """The server's response could not be understood."""
+
+
+async def fetch_head(url, method='HEAD', headers=None, timeout=10.0):
+    """
+    Send one request and return (status, headers) without reading the body.
+
+    Header names in the returned dict are lower-cased.
+    """
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in ('http', 'https') or not parts.hostname:
+        raise HealthCheckError(f'unsupported URL {url!r}')
+    host = parts.hostname
+    port = parts.port or (443 if scheme == 'https' else 80)
+    target = quote(parts.path or '/', safe="/%:@!$&'()*+,;=~")
+    if parts.query:
+        target += '?' + quote(parts.query, safe="/%:@!$&'()*+,;=~?")
+    host_header = host.encode('idna').decode('ascii')
+    if ':' in host_header:
+        host_header = f'[{host_header}]'
+    if parts.port:
+        host_header += f':{parts.port}'
+
+    ssl_context = ssl.create_default_context() if scheme == 'https' else None
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection(host, port, ssl=ssl_context), timeout)
+    try:
+        lines = [f'{method} {target} HTTP/1.1', f'Host: {host_header}',
+                 f'User-Agent: {USER_AGENT}', 'Accept: */*', 'Connection: close']
+        lines += [f'{name}: {value}' for name, value in (headers or {}).items()]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        await writer.drain()
+
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        try:
+            _, status, _ = (status_line.decode('latin-1').rstrip('\r\n') + ' ').split(' ', 2)
+            status = int(status)
+        except ValueError:
+            raise HealthCheckError(f'bad status line {status_line[:80]!r}') from None
+        response_headers = {}
+        while True:
+            line = await asyncio.wait_for(reader.readline(), timeout)
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+        return status, response_headers
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except (OSError, ssl.SSLError):
+            pass
+
+
+class HostRateLimiter:
+    """Spaces out request starts to the same host by ``min_interval`` seconds."""
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._locks = {}
+        self._next_start = {}
+
+    async def wait(self, host, semaphore=None):
+        """
+        Wait until a request to ``host`` may start. With ``semaphore``, then
+        also acquire it (the caller releases it), so a request held up for a
+        slot still starts no sooner than ``min_interval`` after the last one.
+        """
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            loop = asyncio.get_running_loop()
+            delay = self._next_start.get(host, 0.0) - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if semaphore is not None:
+                await semaphore.acquire()
+            self._next_start[host] = loop.time() + self.min_interval
+
+
+async def check_url(url, etag=None, last_modified=None, previous_status=None,
+                    limiter=None, timeout=10.0, semaphore=None):
+    """
+    Check one URL, HEAD first with a GET fallback, and return a ``CheckResult``.
+
+    ``semaphore`` is taken only once the host's ``limiter`` lets a request
+    start and released when it is done, so links queued behind a busy host
+    don't hold concurrency slots other hosts could use.
+    """
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    started = time.perf_counter()
+    try:
+        host = (urlsplit(url).hostname or '').lower()
+        status = None
+        for method in ('HEAD', 'GET'):
+            if limiter is not None:
+                await limiter.wait(host, semaphore)
+            elif semaphore is not None:
+                await semaphore.acquire()
+            try:
+                started = time.perf_counter()
+                status, response_headers = await fetch_head(url, method, headers, timeout)
+            finally:
+                if semaphore is not None:
+                    semaphore.release()
+            if status not in HEAD_UNSUPPORTED:
+                break
+    # ValueError: a port out of range in legacy targets, or an over-long
+    # header line
+    except (OSError, asyncio.TimeoutError, ssl.SSLError, HealthCheckError, UnicodeError, ValueError) as exc:
+        latency_ms = int((time.perf_counter() - started) * 1000)
+        message = str(exc) or type(exc).__name__
+        return CheckResult(None, latency_ms, message[:200], etag, last_modified)
+    latency_ms = int((time.perf_counter() - started) * 1000)
+    if status == 304:
+        # Unchanged since the last check; keep what we knew
+        return CheckResult(previous_status or 200, latency_ms, None, etag, last_modified)
+    return CheckResult(status, latency_ms, None,
+                       response_headers.get('etag'), response_headers.get('last-modified'))
+
+
+async def check_links(links, concurrency=20, host_interval=0.5, timeout=10.0, key=attrgetter('id')):
+    """
+    Check many links concurrently.
+
+    ``links`` are objects with ``id``, ``target_url``, ``health_etag``,
+    ``health_last_modified`` and ``health_status`` attributes (e.g. rows).
+    Returns {key(link): CheckResult}, by default keyed by link id.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = HostRateLimiter(host_interval)
+
+    async def check(link):
+        try:
+            result = await check_url(
+                link.target_url, link.health_etag, link.health_last_modified,
+                link.health_status, limiter, timeout, semaphore)
+        except Exception as exc:
+            # One link failing in an unforeseen way must not abort the others
+            message = f'{type(exc).__name__}: {exc}'
+            result = CheckResult(None, None, message[:200], link.health_etag, link.health_last_modified)
+        return key(link), result
+
+    return dict(await asyncio.gather(*(check(link) for link in links)))
+
+
+def run_health_checks(app):
+    """Check every link and store the results. Returns the number of broken links."""
+    with app.app_context():
+        # With partitioned storage link ids repeat across partitions, so
+        # links are told apart by (partition, id)
+        sessions = get_store().link_sessions()
+        links = []
+        for index, session in enumerate(sessions):
+            links += session.execute(select(
+                literal(index).label('partition'), GoLink.id, GoLink.target_url,
+                GoLink.health_etag, GoLink.health_last_modified, GoLink.health_status)).all()
+            session.rollback()
+
+        results = asyncio.run(check_links(
+            links,
+            concurrency=app.config['HEALTH_CHECK_CONCURRENCY'],
+            host_interval=app.config['HEALTH_CHECK_HOST_INTERVAL'],
+            timeout=app.config['HEALTH_CHECK_TIMEOUT'],
+            key=attrgetter('partition', 'id')))
+
+        checked_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        rows = defaultdict(list)
+        for (index, link_id), result in results.items():
+            rows[index].append({'link_id': link_id,
+                                'health_status': result.status,
+                                'health_latency_ms': result.latency_ms,
+                                'health_error': result.error,
+                                'health_etag': result.etag,
+                                'health_last_modified': result.last_modified,
+                                'health_checked_at': checked_at})
+        if rows:
+            # Health doesn't change where links redirect, so this bypasses the
+            # ORM hooks that would flush every worker's redirect cache and only
+            # invalidates cached list pages. Their 'health' generation is in
+            # the main database, which is also the only session without
+            # partitioning, so then it is bumped in the same transaction.
+            table = GoLink.__table__
+            stmt = update(table).where(table.c.id == db.bindparam('link_id')).values(
+                {name: db.bindparam(name) for name in HEALTH_COLUMNS})
+            for index, session in enumerate(sessions):
+                if rows[index]:
+                    session.connection().execute(stmt, rows[index])
+            bump_generations(db.session.connection(), ['health'])
+            for session in sessions:
+                session.commit()
+            db.session.commit()
+        return sum(1 for result in results.values()
+                   if result.error is not None or (result.status or 0) >= 400)
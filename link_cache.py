@@ -0,0 +1,166 @@
+"""
+Per-worker cache of short_path -> target_url for the redirect route.
+
+Each worker keeps its own LRU. Writes made by this worker discard the
+affected keys immediately; writes made by other workers are picked up by
+polling the shared 'links' generation at most once per ``check_interval``
+seconds, so a redirect is never more than that stale.
+
+With ``admission`` enabled, every lookup is also counted in a
+``CountMinSketch``. Once the cache is full, a newly resolved link only
+replaces the LRU victim if it has been requested more often than the
+victim, so a one-off scan of random short paths can't flush the hot links.
+Popularity survives invalidation, which only drops the cached URLs.
+
+Links that exist but are outside their schedule are *held* (see
+schedule.py): ``get`` returns ``HELD`` for them, which redirect_link treats
+as not found without asking the store, and ``set`` won't cache them.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from popularity import CountMinSketch
+
+SEED_COUNT_CAP = 15
+
+# Returned by get() for held links; falsy, but not None (a miss)
+HELD = ''
+
+
+class LinkCache:
+    """A thread-safe LRU of resolved links, revalidated against a generation counter."""
+
+    def __init__(self, max_entries=10000, check_interval=1.0, generation_source=None, admission=False,
+                 on_change=None):
+        self.max_entries = max_entries
+        self.check_interval = check_interval
+        self.generation_source = generation_source
+        self.on_change = on_change
+        self.popularity = self._sketch() if admission else None
+        self._entries = OrderedDict()
+        self._held = frozenset()
+        self._lock = threading.Lock()
+        self._generation = None
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+
+    def init_app(self, app, generation_source, on_change=None):
+        self.max_entries = app.config['LINK_CACHE_SIZE']
+        self.check_interval = app.config['LINK_CACHE_CHECK_INTERVAL']
+        self.generation_source = generation_source
+        self.on_change = on_change
+        self.popularity = self._sketch() if app.config['LINK_CACHE_ADMISSION'] else None
+        self.clear()
+
+    def _sketch(self):
+        # ~8 counters per cached entry keeps collisions rare among the keys
+        # competing for a slot
+        return CountMinSketch(width=max(1024, 8 * self.max_entries))
+
+    def revalidate(self, force=False):
+        """
+        Drop every entry if the shared generation moved since the last check,
+        then call ``on_change``.
+        """
+        if self.generation_source is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        generation = self.generation_source()
+        if generation != self._generation:
+            with self._lock:
+                self._entries.clear()
+                self._generation = generation
+            if self.on_change is not None:
+                self.on_change()
+
+    def get(self, short_path):
+        self.revalidate()
+        with self._lock:
+            if self.popularity is not None:
+                self.popularity.add(short_path)
+            target_url = self._entries.get(short_path)
+            if target_url is None:
+                self.misses += 1
+                return HELD if short_path in self._held else None
+            self._entries.move_to_end(short_path)
+            self.hits += 1
+            return target_url
+
+    def set(self, short_path, target_url):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if short_path in self._held:
+                return
+            if (self.popularity is not None and short_path not in self._entries
+                    and len(self._entries) >= self.max_entries):
+                victim = next(iter(self._entries))
+                if self.popularity.estimate(short_path) <= self.popularity.estimate(victim):
+                    self.rejected += 1
+                    return
+            self._entries[short_path] = target_url
+            self._entries.move_to_end(short_path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def load(self, items):
+        """Bulk-insert (short_path, target_url) pairs, e.g. when warming a new worker."""
+        for short_path, target_url in items:
+            self.set(short_path, target_url)
+
+    def seed_popularity(self, counts):
+        """Add (short_path, count) pairs to the popularity sketch, e.g. from the access log."""
+        if self.popularity is None:
+            return
+        with self._lock:
+            for short_path, count in counts:
+                # Enough to outrank one-off requests without letting history
+                # outweigh what this worker sees from now on
+                self.popularity.add(short_path, min(count, SEED_COUNT_CAP))
+
+    def hold(self, short_paths):
+        """Hold ``short_paths`` (and only those) until the next call, dropping any cached entries."""
+        held = frozenset(short_paths)
+        with self._lock:
+            self._held = held
+            for short_path in held:
+                self._entries.pop(short_path, None)
+
+    @property
+    def held(self):
+        """The short paths currently held, as a frozenset replaced (not changed) by each ``hold``."""
+        return self._held
+
+    def discard(self, short_path):
+        with self._lock:
+            self._entries.pop(short_path, None)
+
+    def invalidate(self):
+        """Drop every entry, e.g. after a bulk update touching unknown keys."""
+        with self._lock:
+            self._entries.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._held = frozenset()
+            self._generation = None
+            self._checked_at = 0.0
+            self.hits = 0
+            self.misses = 0
+            self.rejected = 0
+            if self.popularity is not None:
+                self.popularity.clear()
+
+    def __contains__(self, short_path):
+        return short_path in self._entries
+
+    def __len__(self):
+        return len(self._entries)
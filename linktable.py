@@ -0,0 +1,139 @@
+"""
+Compiled, immutable link table for redirect-only replicas.
+
+``compile_link_table`` writes every (short_path, target_url) pair into one
+binary file; ``LinkTable`` memory-maps it and answers lookups straight from
+the mapped pages. Every worker on a host maps the same file, so they all
+share one page-cache copy.
+
+File layout (all integers little-endian)::
+
+    header   magic b'GOLT', version, entry count, slot count      (16 bytes)
+    slots    slot count x (crc32 of key, entry index + 1)          (8 bytes each)
+    entries  entry count x (key offset, key length,
+                            url offset, url length)                (16 bytes each)
+    data     UTF-8 keys and URLs, entries in short_path order
+
+The slots form an open-addressing hash table with linear probing and a load
+factor of at most 1/2; slot value 0 marks an empty slot. A lookup hashes the
+key, compares stored hashes, and only compares key bytes (in place in the
+mapping, without slicing it) when the hashes match.
+"""
+
+import mmap
+import os
+import struct
+import zlib
+
+MAGIC = b'GOLT'
+VERSION = 1
+HEADER = struct.Struct('<4sIII')
+SLOT = struct.Struct('<II')
+ENTRY = struct.Struct('<IIII')
+
+
+class LinkTableError(Exception):
+    """Raised when a file is not a readable link table."""
+
+
+def _slot_count(count):
+    slots = 1
+    while slots < count * 2:
+        slots *= 2
+    return slots
+
+
+def compile_link_table(pairs, path):
+    """
+    Write ``pairs`` of (short_path, target_url) to a link table at ``path``.
+
+    The table is written to a temporary file next to ``path``, flushed to
+    disk and renamed over it, so readers always map a complete file.
+    Returns the number of links written.
+    """
+    items = sorted((key.encode('utf-8'), url.encode('utf-8')) for key, url in pairs)
+    count = len(items)
+    nslots = _slot_count(count)
+    slots_offset = HEADER.size
+    entries_offset = slots_offset + nslots * SLOT.size
+    data_offset = entries_offset + count * ENTRY.size
+
+    slots = bytearray(nslots * SLOT.size)
+    entries = bytearray(count * ENTRY.size)
+    data = bytearray()
+    mask = nslots - 1
+    for index, (key, url) in enumerate(items):
+        key_offset = data_offset + len(data)
+        data += key
+        url_offset = data_offset + len(data)
+        data += url
+        ENTRY.pack_into(entries, index * ENTRY.size, key_offset, len(key), url_offset, len(url))
+
+        key_hash = zlib.crc32(key)
+        slot = key_hash & mask
+        while SLOT.unpack_from(slots, slot * SLOT.size)[1]:
+            slot = (slot + 1) & mask
+        SLOT.pack_into(slots, slot * SLOT.size, key_hash, index + 1)
+
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, count, nslots))
+            f.write(slots)
+            f.write(entries)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return count
+
+
+class LinkTable:
+    """A read-only, memory-mapped view of a compiled link table."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        if len(self._mmap) < HEADER.size:
+            raise LinkTableError(f'{path} is too short to be a link table')
+        magic, version, self.count, self.nslots = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise LinkTableError(f'{path} is not a version {VERSION} link table')
+        self._mask = self.nslots - 1
+        self._slots_offset = HEADER.size
+        self._entries_offset = self._slots_offset + self.nslots * SLOT.size
+
+    def _entry(self, index):
+        return ENTRY.unpack_from(self._mmap, self._entries_offset + index * ENTRY.size)
+
+    def get(self, short_path):
+        """Return the target URL for ``short_path``, or None."""
+        key = short_path.encode('utf-8')
+        key_hash = zlib.crc32(key)
+        buf = self._mmap
+        slot = key_hash & self._mask
+        while True:
+            stored_hash, index = SLOT.unpack_from(buf, self._slots_offset + slot * SLOT.size)
+            if not index:
+                return None
+            if stored_hash == key_hash:
+                key_offset, key_length, url_offset, url_length = self._entry(index - 1)
+                # With equal lengths, find can only match at key_offset itself
+                if key_length == len(key) and buf.find(key, key_offset, key_offset + key_length) == key_offset:
+                    return buf[url_offset:url_offset + url_length].decode('utf-8')
+            slot = (slot + 1) & self._mask
+
+    def __iter__(self):
+        """Yield (short_path, target_url) pairs in short_path order."""
+        for index in range(self.count):
+            key_offset, key_length, url_offset, url_length = self._entry(index)
+            yield (str(self._view[key_offset:key_offset + key_length], 'utf-8'),
+                   str(self._view[url_offset:url_offset + url_length], 'utf-8'))
+
+    def __len__(self):
+        return self.count
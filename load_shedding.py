@@ -0,0 +1,105 @@
+"""
+Per-route concurrency limits that keep redirects fast under admin load.
+
+Routes fall into three classes:
+
+priority
+    Redirects (``@priority``). Never limited or queued.
+expensive
+    List, search and bulk-edit routes (``@expensive``). At most
+    LOAD_SHEDDING_EXPENSIVE_SLOTS run at once per worker; a request that
+    can't get a slot within LOAD_SHEDDING_EXPENSIVE_TIMEOUT seconds gets
+    503 with Retry-After.
+everything else
+    Login, create, edit, ... Waits up to LOAD_SHEDDING_SHARED_TIMEOUT
+    seconds for a slot, then gets 503 too.
+
+Every non-priority request, expensive or not, also needs one of
+LOAD_SHEDDING_SHARED_SLOTS. With that set below the worker's thread count
+(``gunicorn -k gthread --threads N``), the remaining threads are always
+free for redirects, however busy the admin UI gets.
+"""
+
+import threading
+
+from flask import Response, g, request
+
+PRIORITY = 'priority'
+EXPENSIVE = 'expensive'
+
+
+def route_class(name):
+    def decorator(view):
+        view.load_class = name
+        return view
+    return decorator
+
+
+priority = route_class(PRIORITY)
+expensive = route_class(EXPENSIVE)
+
+
+class Overloaded(Exception):
+    """No slot became free in time."""
+
+
+class LoadShedder:
+    """Hands out per-class slots to request threads."""
+
+    def __init__(self, shared_slots, expensive_slots, shared_timeout=5.0, expensive_timeout=0.1):
+        self.shared = threading.BoundedSemaphore(shared_slots)
+        self.expensive = threading.BoundedSemaphore(expensive_slots)
+        self.shared_timeout = shared_timeout
+        self.expensive_timeout = expensive_timeout
+        self.shed = {EXPENSIVE: 0, None: 0}
+
+    def acquire(self, load_class):
+        """Take the slots ``load_class`` needs and return them, or raise Overloaded."""
+        held = []
+        timeout = self.shared_timeout
+        if load_class == EXPENSIVE:
+            timeout = self.expensive_timeout
+            if not self.expensive.acquire(timeout=timeout):
+                self.shed[EXPENSIVE] += 1
+                raise Overloaded
+            held.append(self.expensive)
+        if not self.shared.acquire(timeout=timeout):
+            self.release(held)
+            self.shed[load_class] += 1
+            raise Overloaded
+        held.append(self.shared)
+        return held
+
+    def release(self, held):
+        for semaphore in held:
+            semaphore.release()
+
+
+def init_load_shedding(app):
+    if not app.config['LOAD_SHEDDING_ENABLED']:
+        return
+    shedder = app.extensions['load_shedder'] = LoadShedder(
+        app.config['LOAD_SHEDDING_SHARED_SLOTS'],
+        app.config['LOAD_SHEDDING_EXPENSIVE_SLOTS'],
+        shared_timeout=app.config['LOAD_SHEDDING_SHARED_TIMEOUT'],
+        expensive_timeout=app.config['LOAD_SHEDDING_EXPENSIVE_TIMEOUT'])
+    retry_after = str(app.config['LOAD_SHEDDING_RETRY_AFTER'])
+
+    @app.before_request
+    def admit_request():
+        view = app.view_functions.get(request.endpoint)
+        load_class = getattr(view, 'load_class', None)
+        if load_class == PRIORITY:
+            return None
+        try:
+            g.load_shedding_slots = shedder.acquire(load_class)
+        except Overloaded:
+            return Response('The server is busy. Please try again shortly.\n', 503,
+                            {'Retry-After': retry_after}, mimetype='text/plain')
+        return None
+
+    @app.teardown_request
+    def release_slots(exc):
+        held = g.pop('load_shedding_slots', None)
+        if held:
+            shedder.release(held)
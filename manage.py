@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Management commands.
+
+    python manage.py user create NAME [--admin] [--password-stdin]
+    python manage.py user promote|demote NAME
+    python manage.py user ls
+    python manage.py link add SHORT_PATH URL --user NAME
+    python manage.py link rm SHORT_PATH
+    python manage.py link ls [PREFIX] [--limit N]
+    python manage.py seed N [--user NAME] [--start I]
+    python manage.py db vacuum|analyze|integrity-check
+
+Commands talk to the SQLite database with the standard library and import
+only what they use, so they start about as fast as Python itself instead of
+building the Flask app. Writes bump the same cache generations the app's
+writes do, so running workers see them within LINK_CACHE_CHECK_INTERVAL.
+
+With LINK_STORE=partitioned, link commands go through the app's link store
+instead, and ``db`` commands also cover the partition files. ``seed`` always
+writes to the main database; move seeded links into partitions with
+scripts/rebalance_partitions.py --from-database.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+
+from config import Config
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# Where Flask puts the instance folder for this app
+INSTANCE_PATH = os.path.join(ROOT, 'instance')
+
+SEED_HOSTS = 100
+
+
+class CommandError(Exception):
+    """Reported to the user and exits with status 1."""
+
+
+def database_path():
+    uri = Config.SQLALCHEMY_DATABASE_URI
+    if not uri.startswith('sqlite:///'):
+        raise CommandError(f'Not a SQLite database: {uri}')
+    path = uri[len('sqlite:///'):]
+    return path if os.path.isabs(path) else os.path.join(INSTANCE_PATH, path)
+
+
+def partition_files():
+    directory = os.path.join(INSTANCE_PATH, Config.LINK_PARTITION_DIR)
+    count = Config.LINK_PARTITIONS
+    paths = [os.path.join(directory, f'links-{index}-of-{count}.db') for index in range(count)]
+    return [path for path in paths if os.path.exists(path)]
+
+
+def connect(path):
+    if not os.path.exists(path):
+        raise CommandError(f'No database at {path}')
+    return sqlite3.connect(path, timeout=30)
+
+
+def bump_generation(conn, name):
+    # As models.bump_generations, so workers drop their cached pages and links
+    conn.execute('INSERT INTO cache_generation (name, value) VALUES (?, 1) '
+                 'ON CONFLICT (name) DO UPDATE SET value = value + 1', (name,))
+
+
+def user_id(conn, username):
+    row = conn.execute('SELECT id FROM user WHERE username = ?', (username,)).fetchone()
+    if row is None:
+        raise CommandError(f"User '{username}' not found")
+    return row[0]
+
+
+def link_row(short_path, target_url, owner_id):
+    from utils import canonical_host, normalize_url, url_hash
+    try:
+        canonical = normalize_url(target_url)
+    except ValueError:
+        raise CommandError(f'Not a valid URL: {target_url}') from None
+    return (short_path, target_url, owner_id, canonical, url_hash(canonical), canonical_host(canonical))
+
+
+INSERT_LINK = ('INSERT INTO go_link (short_path, target_url, user_id, canonical_url, url_hash, target_host) '
+               'VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (short_path) DO NOTHING')
+
+
+def app_store(fn):
+    # Only partitioned links need the app; importing it costs most of a second
+    from app import create_app
+    from storage import get_store
+    app = create_app()
+    with app.app_context():
+        return fn(get_store())
+
+
+def user_create(args, conn):
+    import getpass
+    from utils import hash_password
+    if args.password_stdin:
+        password = sys.stdin.readline().rstrip('\n')
+    else:
+        password = getpass.getpass(f'Password for {args.username}: ')
+    if not password:
+        raise CommandError('Empty password')
+    with conn:
+        try:
+            conn.execute('INSERT INTO user (username, password_hash, is_admin) VALUES (?, ?, ?)',
+                         (args.username, hash_password(password, Config.PASSWORD_HASH_METHOD), args.admin))
+        except sqlite3.IntegrityError:
+            raise CommandError(f"User '{args.username}' already exists") from None
+        bump_generation(conn, 'users')
+    print(f"Created {'admin' if args.admin else 'user'} '{args.username}'")
+
+
+def user_set_admin(args, conn):
+    is_admin = args.command == 'promote'
+    with conn:
+        changed = conn.execute('UPDATE user SET is_admin = ? WHERE username = ? AND is_admin IS NOT ?',
+                               (is_admin, args.username, is_admin)).rowcount
+        if changed:
+            bump_generation(conn, 'users')
+    if not changed:
+        user_id(conn, args.username)
+        print(f"User '{args.username}' is already {'an admin' if is_admin else 'not an admin'}")
+    else:
+        print(f"{'Promoted' if is_admin else 'Demoted'} '{args.username}'")
+
+
+def user_ls(args, conn):
+    for username, is_admin in conn.execute('SELECT username, is_admin FROM user ORDER BY username'):
+        print(f"{username}\t{'admin' if is_admin else ''}".rstrip())
+
+
+def link_add(args, conn):
+    owner_id = user_id(conn, args.user)
+    if Config.LINK_STORE == 'partitioned':
+        link_row(args.short_path, args.target_url, owner_id)  # validates the URL
+        created = app_store(lambda store: store.create(args.short_path, args.target_url, owner_id))
+    else:
+        with conn:
+            created = conn.execute(INSERT_LINK, link_row(args.short_path, args.target_url, owner_id)).rowcount
+            if created:
+                bump_generation(conn, 'links')
+    if not created:
+        raise CommandError(f"'{args.short_path}' is already taken")
+    print(f'Added {args.short_path} -> {args.target_url}')
+
+
+def link_rm(args, conn):
+    if Config.LINK_STORE == 'partitioned':
+        def delete(store):
+            link = store.get(args.short_path)
+            if link is not None:
+                store.delete(link)
+            return link is not None
+        deleted = app_store(delete)
+    else:
+        with conn:
+            deleted = conn.execute('DELETE FROM go_link WHERE short_path = ?', (args.short_path,)).rowcount
+            if deleted:
+                bump_generation(conn, 'links')
+    if not deleted:
+        raise CommandError(f"No link '{args.short_path}'")
+    print(f'Removed {args.short_path}')
+
+
+def link_ls(args, conn):
+    if Config.LINK_STORE == 'partitioned':
+        from itertools import islice
+
+        def matching(store):
+            return list(islice((row for row in store.iter_links() if row[0].startswith(args.prefix)),
+                               args.limit))
+        rows = app_store(matching)
+    else:
+        from utils import prefix_upper_bound
+        # A range on the unique index rather than LIKE, as in storage._prefix_range
+        upper = prefix_upper_bound(args.prefix)
+        bounds = 'short_path >= ?' + (' AND short_path < ?' if upper is not None else '')
+        params = (args.prefix, upper) if upper is not None else (args.prefix,)
+        rows = conn.execute(f'SELECT short_path, target_url FROM go_link WHERE {bounds} '
+                            'ORDER BY short_path LIMIT ?', (*params, args.limit))
+    for short_path, target_url in rows:
+        print(f'{short_path}\t{target_url}')
+
+
+def seed(args, conn):
+    """
+    Insert ``count`` synthetic links, seed-0000000 onwards, spread over
+    SEED_HOSTS hosts. Rows are generated lazily and inserted with
+    executemany, one transaction per batch.
+    """
+    from utils import url_hash
+    owner_id = user_id(conn, args.user) if args.user else conn.execute('SELECT min(id) FROM user').fetchone()[0]
+    if owner_id is None:
+        raise CommandError('Create a user first')
+    # Losing a seeded batch to a crash doesn't matter; fsyncs would dominate.
+    # A bigger page cache keeps the four indexes' hot pages in memory.
+    conn.execute('PRAGMA synchronous = OFF')
+    conn.execute('PRAGMA cache_size = -262144')
+
+    def rows(start, stop):
+        for i in range(start, stop):
+            # Already in canonical form, so normalize_url can be skipped
+            url = f'https://h{i % SEED_HOSTS}.example.com/seed/{i}'
+            yield (f'seed-{i:07d}', url, owner_id, url, url_hash(url), f'h{i % SEED_HOSTS}.example.com')
+
+    inserted = 0
+    end = args.start + args.count
+    for start in range(args.start, end, args.batch):
+        with conn:
+            before = conn.total_changes
+            conn.executemany(INSERT_LINK, rows(start, min(start + args.batch, end)))
+            inserted += conn.total_changes - before
+    with conn:
+        bump_generation(conn, 'links')
+    print(f'Inserted {inserted} links')
+
+
+def db_maintenance(args, conn):
+    paths = [args.database]
+    if Config.LINK_STORE == 'partitioned':
+        paths += partition_files()
+    ok = True
+    for path in paths:
+        target = conn if path == args.database else connect(path)
+        if args.command == 'vacuum':
+            target.execute('VACUUM')
+            print(f'{path}: vacuumed')
+        elif args.command == 'analyze':
+            target.execute('ANALYZE')
+            print(f'{path}: analyzed')
+        else:
+            problems = [row[0] for row in target.execute('PRAGMA integrity_check')]
+            ok = ok and problems == ['ok']
+            print(f'{path}: ' + '\n  '.join(problems))
+        if target is not conn:
+            target.close()
+    if not ok:
+        raise CommandError('Integrity check failed')
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Manage go-links users, links and the database.')
+    parser.add_argument('--database', help='SQLite file to use (default: from the app config)')
+    groups = parser.add_subparsers(dest='group', required=True)
+
+    users = groups.add_parser('user', help='manage users').add_subparsers(dest='command', required=True)
+    create = users.add_parser('create', help='create a user')
+    create.add_argument('username')
+    create.add_argument('--admin', action='store_true')
+    create.add_argument('--password-stdin', action='store_true', help='read the password from stdin')
+    create.set_defaults(handler=user_create)
+    for name in ('promote', 'demote'):
+        command = users.add_parser(name, help=f'{name} a user {"to" if name == "promote" else "from"} admin')
+        command.add_argument('username')
+        command.set_defaults(handler=user_set_admin)
+    users.add_parser('ls', help='list users').set_defaults(handler=user_ls)
+
+    links = groups.add_parser('link', help='manage links').add_subparsers(dest='command', required=True)
+    add = links.add_parser('add', help='add a link')
+    add.add_argument('short_path')
+    add.add_argument('target_url')
+    add.add_argument('--user', required=True, help='owner username')
+    add.set_defaults(handler=link_add)
+    rm = links.add_parser('rm', help='remove a link')
+    rm.add_argument('short_path')
+    rm.set_defaults(handler=link_rm)
+    ls = links.add_parser('ls', help='list links in short path order')
+    ls.add_argument('prefix', nargs='?', default='')
+    ls.add_argument('--limit', type=int, default=100)
+    ls.set_defaults(handler=link_ls)
+
+    seeder = groups.add_parser('seed', help='insert N synthetic links for benchmarking')
+    seeder.add_argument('count', type=int)
+    seeder.add_argument('--user', help='owner username (default: the first user)')
+    seeder.add_argument('--start', type=int, default=0, help='number of the first link')
+    seeder.add_argument('--batch', type=int, default=50000, help='links per transaction')
+    seeder.set_defaults(handler=seed)
+
+    maintenance = groups.add_parser('db', help='database maintenance')
+    maintenance.add_argument('command', choices=['vacuum', 'analyze', 'integrity-check'])
+    maintenance.set_defaults(handler=db_maintenance)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        args.database = args.database or database_path()
+        conn = connect(args.database)
+        try:
+            args.handler(args, conn)
+        finally:
+            conn.close()
+    except CommandError as exc:
+        print(f'Error: {exc}', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
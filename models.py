@@ -0,0 +1,151 @@
+from flask_login import UserMixin
+from sqlalchemy import event, literal, select, true
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import CursorResult
+from sqlalchemy.orm import validates
+
+from extensions import db, link_cache, login_manager
+from utils import canonical_host, normalize_url, url_hash
+
+
+class User(UserMixin, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    password_hash = db.Column(db.String(120), nullable=False)
+    is_admin = db.Column(db.Boolean, default=False)
+    links = db.relationship('GoLink', backref='creator', lazy=True)
+
+class GoLink(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    short_path = db.Column(db.String(50), unique=True, nullable=False)
+    target_url = db.Column(db.String(500), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # target_url normalized once at write time (see utils.normalize_url), its
+    # hash for indexed "which links point here?" lookups, and its host for
+    # "which links are on this host?". canonical_url is indexed too, for URL
+    # prefix range scans. The redirect itself still goes to target_url
+    # exactly as typed.
+    canonical_url = db.Column(db.String(2000), index=True)
+    url_hash = db.Column(db.BigInteger, index=True)
+    target_host = db.Column(db.String(255), index=True)
+    # Last link-health check (see health.py). health_status is the HTTP
+    # status, or None with health_error set if the request failed
+    health_status = db.Column(db.Integer)
+    health_error = db.Column(db.String(200))
+    health_latency_ms = db.Column(db.Integer)
+    health_checked_at = db.Column(db.DateTime)
+    health_etag = db.Column(db.String(200))
+    health_last_modified = db.Column(db.String(100))
+    # Optional schedule, in naive UTC: the link only redirects from
+    # not_before on and until expires_at. Applied by each worker's
+    # LinkSchedule (see schedule.py), never checked per redirect
+    not_before = db.Column(db.DateTime, index=True)
+    expires_at = db.Column(db.DateTime, index=True)
+
+    @validates('target_url')
+    def _set_canonical_url(self, key, target_url):
+        for name, value in canonical_url_fields(target_url).items():
+            setattr(self, name, value)
+        return target_url
+
+    @property
+    def is_broken(self):
+        return self.health_error is not None or (self.health_status or 0) >= 400
+
+def canonical_url_fields(target_url):
+    """Return the GoLink columns derived from a target URL (all None if it doesn't parse)."""
+    try:
+        canonical = normalize_url(target_url)
+    except (ValueError, AttributeError):
+        return {'canonical_url': None, 'url_hash': None, 'target_host': None}
+    return {'canonical_url': canonical, 'url_hash': url_hash(canonical),
+            'target_host': canonical_host(canonical)}
+
+class LinkDailyHits(db.Model):
+    # Redirect counts per link and UTC day, aggregated from the access log
+    # (see access_log.py). Keyed by short_path, as that is what gets logged.
+    short_path = db.Column(db.String(50), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    hits = db.Column(db.Integer, nullable=False, default=0)
+
+class CacheGeneration(db.Model):
+    # One row per cached data set ('links', 'users', 'health'). The value is
+    # bumped in the same transaction as every write, so all workers agree on
+    # when their cached fragments went stale.
+    name = db.Column(db.String(20), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+GENERATION_MODELS = {GoLink: 'links', User: 'users'}
+
+def bump_generations(connection, names):
+    for name in sorted(names):
+        stmt = sqlite_insert(CacheGeneration).values(name=name, value=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CacheGeneration.name],
+            set_={'value': CacheGeneration.value + 1})
+        connection.execute(stmt)
+
+@event.listens_for(db.session, 'after_flush')
+def bump_generations_after_flush(session, flush_context):
+    names = {GENERATION_MODELS[type(obj)]
+             for obj in (*session.new, *session.dirty, *session.deleted)
+             if type(obj) in GENERATION_MODELS}
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, GoLink):
+            link_cache.discard(obj.short_path)
+    bump_generations(session.connection(), names)
+
+@event.listens_for(db.session, 'do_orm_execute')
+def bump_generations_after_dml(orm_execute_state):
+    # INSERT/UPDATE/DELETE statements bypass the flush, so catch them here
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return None
+    mapper = orm_execute_state.bind_mapper
+    name = GENERATION_MODELS.get(mapper.class_) if mapper is not None else None
+    if name is None:
+        return None
+    result = orm_execute_state.invoke_statement()
+    if isinstance(result, CursorResult) and not result.returns_rows:
+        changed = result.rowcount
+    elif orm_execute_state.is_executemany and not orm_execute_state.is_insert:
+        # A bulk UPDATE/DELETE by primary key returns no rowcount; each
+        # parameter set names a row that was there when it was read
+        changed = len(orm_execute_state.parameters)
+    else:
+        # With RETURNING, rowcount isn't reliable until the rows are consumed
+        frozen = result.freeze()
+        changed = len(frozen.data)
+        result = frozen()
+    if changed:
+        if mapper.class_ is GoLink and not orm_execute_state.is_insert:
+            link_cache.invalidate()
+        bump_generations(orm_execute_state.session.connection(), [name])
+    return result
+
+def current_generations():
+    rows = db.session.query(CacheGeneration.name, CacheGeneration.value).all()
+    generations = {'links': 0, 'users': 0, 'health': 0}
+    generations.update(rows)
+    return generations
+
+@login_manager.user_loader
+def load_user(user_id):
+    return db.session.get(User, int(user_id))
+
+def insert_user(username, password_hash, is_admin=None):
+    """
+    Insert a user in one statement, relying on the unique username.
+
+    With ``is_admin=None`` the user becomes an admin only if there were no
+    users yet. Returns the new user's admin flag, or None if the username is
+    already taken.
+    """
+    admin = ~select(User.id).exists() if is_admin is None else literal(is_admin)
+    stmt = sqlite_insert(User).from_select(
+        ['username', 'password_hash', 'is_admin'],
+        # The WHERE keeps SQLite from parsing ON CONFLICT as part of the SELECT
+        select(literal(username), literal(password_hash), admin).where(true()),
+    ).on_conflict_do_nothing(index_elements=[User.username]).returning(User.is_admin)
+    created = db.session.execute(stmt).scalar()
+    db.session.commit()
+    return created
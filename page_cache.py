@@ -0,0 +1,53 @@
+"""
+In-process cache for rendered page fragments.
+
+Entries are keyed on everything the fragment depends on, including the
+current data generation, so a write never has to find and purge stale
+entries: it bumps the generation and the old keys simply age out of the LRU.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class FragmentCache:
+    """A small thread-safe LRU mapping of cache keys to rendered HTML."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.max_entries = app.config['PAGE_CACHE_SIZE']
+        self.clear()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
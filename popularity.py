@@ -0,0 +1,73 @@
+"""
+Fixed-memory popularity estimates for short paths.
+
+``CountMinSketch`` counts how often each key is seen using four rows of
+``width`` counters; a key's estimate is the smallest of its counters, so
+it may overcount (when keys collide) but never undercounts. Memory doesn't
+grow with the number of distinct keys, so a scan of a million random
+paths costs nothing beyond the counters.
+
+Counts are aged: after ``sample_size`` additions every counter is halved,
+so links that were popular last month gradually make way for today's.
+This is the frequency half of TinyLFU; ``LinkCache`` uses it to decide
+whether a newly resolved link is worth evicting its LRU victim for.
+"""
+
+from array import array
+
+
+class CountMinSketch:
+    """Four rows of counters; estimates never undercount."""
+
+    DEPTH = 4
+
+    def __init__(self, width=16384, sample_size=None):
+        # A power of two lets the row index be a mask instead of a modulo
+        self.width = 1 << max(width - 1, 1).bit_length()
+        self.sample_size = sample_size or 10 * self.width
+        self._mask = self.width - 1
+        self._rows = [array('I', bytes(4 * self.width)) for _ in range(self.DEPTH)]
+        self._additions = 0
+
+    def _indexes(self, key):
+        # One 64-bit hash split into two halves gives the four row indexes by
+        # double hashing (h1 + i * h2), without hashing the key again per row.
+        # Unrolled, since this runs on every redirect.
+        h = hash(key)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        mask = self._mask
+        return h1 & mask, (h1 + h2) & mask, (h1 + 2 * h2) & mask, (h1 + 3 * h2) & mask
+
+    def add(self, key, count=1):
+        """Count ``key`` seen ``count`` more times."""
+        i0, i1, i2, i3 = self._indexes(key)
+        r0, r1, r2, r3 = self._rows
+        # Conservative update: only raise the counters that are below the new
+        # estimate, which keeps collisions from inflating other keys' counts
+        target = min(min(r0[i0], r1[i1], r2[i2], r3[i3]) + count, 0xFFFFFFFF)
+        if r0[i0] < target:
+            r0[i0] = target
+        if r1[i1] < target:
+            r1[i1] = target
+        if r2[i2] < target:
+            r2[i2] = target
+        if r3[i3] < target:
+            r3[i3] = target
+        self._additions += count
+        if self._additions >= self.sample_size:
+            self.age()
+
+    def estimate(self, key):
+        """Return how many times ``key`` has (approximately) been seen."""
+        i0, i1, i2, i3 = self._indexes(key)
+        r0, r1, r2, r3 = self._rows
+        return min(r0[i0], r1[i1], r2[i2], r3[i3])
+
+    def age(self):
+        """Halve every counter."""
+        self._rows = [array('I', (value >> 1 for value in row)) for row in self._rows]
+        self._additions //= 2
+
+    def clear(self):
+        self._rows = [array('I', bytes(4 * self.width)) for _ in range(self.DEPTH)]
+        self._additions = 0
@@ -2,45 +2,166 @@
 """
 Test runner for D-Go Links application.
 Runs all tests in the tests/ directory.
+
+Usage:
+    python run_tests.py                  # all tests, serially
+    python run_tests.py links            # only tests/test_links.py
+    python run_tests.py --parallel 4     # test modules sharded over 4 processes
+    python run_tests.py --durations 20   # report the 20 slowest tests
 """
 
-import unittest
-import sys
+import argparse
 import os
+import sys
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # Add the project root to the Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-def run_all_tests():
+
+class TimingResultMixin:
+    """Records how long each test takes."""
+
+    def startTest(self, test):
+        self._started_at = time.perf_counter()
+        super().startTest(test)
+
+    def stopTest(self, test):
+        super().stopTest(test)
+        self.durations.append((test.id(), time.perf_counter() - self._started_at))
+
+
+class TimingTextTestResult(TimingResultMixin, unittest.TextTestResult):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.durations = []
+
+
+class TimingTestResult(TimingResultMixin, unittest.TestResult):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.durations = []
+
+
+def print_durations(durations, count):
+    if count <= 0 or not durations:
+        return
+    print(f'\nSlowest {min(count, len(durations))} tests:')
+    for test_id, seconds in sorted(durations, key=lambda item: item[1], reverse=True)[:count]:
+        print(f'  {seconds * 1000:8.1f} ms  {test_id}')
+
+
+def run_suite(suite, durations):
+    runner = unittest.TextTestRunner(verbosity=2, resultclass=TimingTextTestResult)
+    result = runner.run(suite)
+    print_durations(result.durations, durations)
+    return result.wasSuccessful()
+
+
+def run_all_tests(durations=10):
     """Discover and run all tests."""
     loader = unittest.TestLoader()
     start_dir = 'tests'
     suite = loader.discover(start_dir, pattern='test_*.py')
-    
-    runner = unittest.TextTestRunner(verbosity=2)
-    result = runner.run(suite)
-    
-    return result.wasSuccessful()
+    return run_suite(suite, durations)
+
 
-def run_specific_test(test_module):
+def run_specific_test(test_module, durations=10):
     """Run a specific test module."""
     loader = unittest.TestLoader()
     suite = loader.loadTestsFromName(f'tests.{test_module}')
-    
-    runner = unittest.TextTestRunner(verbosity=2)
-    result = runner.run(suite)
-    
-    return result.wasSuccessful()
+    return run_suite(suite, durations)
 
-if __name__ == '__main__':
-    if len(sys.argv) > 1:
+
+def discover_modules():
+    tests_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tests')
+    return sorted(name[:-3] for name in os.listdir(tests_dir)
+                  if name.startswith('test_') and name.endswith('.py'))
+
+
+def run_module_in_worker(test_module):
+    """Run one test module inside a pool worker and return a picklable summary."""
+    suite = unittest.TestLoader().loadTestsFromName(f'tests.{test_module}')
+    result = TimingTestResult()
+    started = time.perf_counter()
+    suite.run(result)
+    return {
+        'module': test_module,
+        'tests_run': result.testsRun,
+        'seconds': time.perf_counter() - started,
+        'failures': [(test.id(), trace) for test, trace in result.failures]
+                    + [(test.id(), 'Unexpected success') for test in result.unexpectedSuccesses],
+        'errors': [(test.id(), trace) for test, trace in result.errors],
+        'skipped': len(result.skipped),
+        'durations': result.durations,
+    }
+
+
+def run_parallel(workers, durations=10):
+    """
+    Run every test module in a pool of worker processes.
+
+    Modules are handed out one at a time, so a slow module doesn't hold up a
+    whole pre-assigned shard. Each process builds its own template database
+    (see tests/base.py), so workers never share a database file.
+    """
+    modules = discover_modules()
+    started = time.perf_counter()
+    summaries = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_module_in_worker, module) for module in modules]
+        for future in as_completed(futures):
+            summary = future.result()
+            summaries.append(summary)
+            status = 'ok' if not summary['failures'] and not summary['errors'] else 'FAILED'
+            print(f"{summary['module']:<28} {summary['tests_run']:4d} tests "
+                  f"{summary['seconds']:7.2f}s  {status}")
+
+    problems = [(kind, test_id, trace)
+                for summary in summaries
+                for kind in ('failures', 'errors')
+                for test_id, trace in summary[kind]]
+    for kind, test_id, trace in problems:
+        print('=' * 70)
+        print(f"{'FAIL' if kind == 'failures' else 'ERROR'}: {test_id}")
+        print('-' * 70)
+        print(trace)
+
+    total = sum(summary['tests_run'] for summary in summaries)
+    skipped = sum(summary['skipped'] for summary in summaries)
+    print('-' * 70)
+    print(f'Ran {total} tests in {time.perf_counter() - started:.3f}s '
+          f'across {workers} processes')
+    print_durations([d for summary in summaries for d in summary['durations']], durations)
+    if problems:
+        print(f'\nFAILED ({len(problems)} failures/errors)')
+        return False
+    print(f"\nOK{f' (skipped={skipped})' if skipped else ''}")
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('module', nargs='?', help='run only this test module, e.g. "links"')
+    parser.add_argument('-j', '--parallel', type=int, metavar='N',
+                        help='shard test modules over N processes (0 = one per CPU)')
+    parser.add_argument('--durations', type=int, default=10, metavar='N',
+                        help='report the N slowest tests (0 to disable)')
+    args = parser.parse_args(argv)
+
+    if args.module:
         # Run specific test module
-        test_module = sys.argv[1]
+        test_module = args.module
         if not test_module.startswith('test_'):
             test_module = f'test_{test_module}'
-        success = run_specific_test(test_module)
-    else:
-        # Run all tests
-        success = run_all_tests()
-    
-    sys.exit(0 if success else 1)
\ No newline at end of file
+        return run_specific_test(test_module, args.durations)
+    if args.parallel is not None:
+        return run_parallel(args.parallel or os.cpu_count(), args.durations)
+    # Run all tests
+    return run_all_tests(args.durations)
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
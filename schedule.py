@@ -0,0 +1,116 @@
+"""
+Expiring and scheduled links.
+
+A link with ``not_before`` only redirects from that time on, and one with
+``expires_at`` stops redirecting then. Rather than comparing timestamps on
+every redirect, each worker keeps a ``LinkSchedule``. Links that are not
+live right now are *held* by the redirect cache, which answers for them as
+if they didn't exist without asking the store; upcoming activations and
+expiries wait in a min-heap, and a background thread sleeps until the
+earliest one is due and then updates the held set. The redirect path never
+looks at the clock.
+
+The schedule is reloaded from the store (an indexed query for links with a
+future ``not_before`` or any ``expires_at``) whenever the redirect cache
+sees the 'links' generation move, so schedule edits made by other workers
+take effect within LINK_CACHE_CHECK_INTERVAL, like any other link edit.
+"""
+
+import heapq
+import os
+import threading
+from datetime import datetime, timezone
+
+
+def utcnow():
+    """The current time as the naive UTC datetime stored in the database."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def is_live(not_before, expires_at, now):
+    return (not_before is None or not_before <= now) and (expires_at is None or expires_at > now)
+
+
+class LinkSchedule:
+    """Upcoming activations and expiries, applied to a ``LinkCache`` when due."""
+
+    # Longest single sleep, so a jump in the wall clock is noticed eventually
+    MAX_SLEEP = 60.0
+
+    def __init__(self, cache, source=None):
+        self.cache = cache
+        self.source = source
+        self._times = {}
+        self._heap = []
+        self._wakeup = threading.Condition()
+        self._thread = None
+        self._pid = None
+
+    def init_app(self, app, source):
+        self.source = source
+        self.load([])
+
+    def load(self, rows, now=None):
+        """Replace the schedule with (short_path, not_before, expires_at) rows."""
+        now = now or utcnow()
+        times = {}
+        heap = []
+        for short_path, not_before, expires_at in rows:
+            times[short_path] = (not_before, expires_at)
+            for when in (not_before, expires_at):
+                if when is not None and when > now:
+                    heap.append((when, short_path))
+        heapq.heapify(heap)
+        with self._wakeup:
+            self._times = times
+            self._heap = heap
+            self._hold_pending(now)
+            self._wakeup.notify()
+        if heap:
+            self._ensure_started()
+
+    def reload(self):
+        """Load the schedule from ``source``, e.g. after links changed."""
+        if self.source is not None:
+            self.load(self.source())
+
+    def _hold_pending(self, now):
+        self.cache.hold(short_path for short_path, (not_before, expires_at) in self._times.items()
+                        if not is_live(not_before, expires_at, now))
+
+    def run_due(self, now=None):
+        """Apply every transition due by ``now``. Returns seconds until the next one, or None."""
+        now = now or utcnow()
+        with self._wakeup:
+            due = False
+            while self._heap and self._heap[0][0] <= now:
+                heapq.heappop(self._heap)
+                due = True
+            if due:
+                self._hold_pending(now)
+            if not self._heap:
+                return None
+            return (self._heap[0][0] - now).total_seconds()
+
+    def upcoming(self):
+        """Return the pending (when, short_path) transitions in order."""
+        with self._wakeup:
+            return sorted(self._heap)
+
+    def _ensure_started(self):
+        # Started lazily so the thread runs in the worker process, not in a
+        # gunicorn master that forks afterwards
+        if self._pid != os.getpid() or not self._thread.is_alive():
+            with self._wakeup:
+                if self._pid != os.getpid() or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='link-schedule', daemon=True)
+                    self._pid = os.getpid()
+                    self._thread.start()
+
+    def _run(self):
+        # Holding the condition between checking the heap and waiting means
+        # a load() can't slip in unnoticed
+        with self._wakeup:
+            while True:
+                delay = self.run_due()
+                self._wakeup.wait(self.MAX_SLEEP if delay is None else min(delay, self.MAX_SLEEP))
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Fold rotated redirect access logs into per-link, per-day counts.
+
+Each rotated file is streamed into the link_daily_hits table and then
+deleted (with --keep, renamed to *.done), so this can run from cron as
+often as you like. Files still being
+written by a running worker are left alone; those of workers that exited
+without rotating them are rotated and aggregated.
+
+Usage: python scripts/aggregate_access_log.py [--keep] [directory]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from access_log import aggregate_access_logs
+from app import create_app
+from extensions import db
+from warmup import ensure_schema
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Aggregate rotated redirect access logs.')
+    parser.add_argument('directory', nargs='?', help='log directory (default: ACCESS_LOG_DIR)')
+    parser.add_argument('--keep', action='store_true', help="rename aggregated files to *.done instead of deleting them")
+    args = parser.parse_args()
+
+    app = create_app()
+    directory = args.directory or app.config['ACCESS_LOG_DIR']
+    if not directory:
+        parser.error('no directory given and ACCESS_LOG_DIR is not set')
+    with app.app_context():
+        ensure_schema(db)
+        files, records = aggregate_access_logs(os.path.join(app.instance_path, directory), keep=args.keep)
+    print(f"Aggregated {records} redirects from {files} files")
+
+
+if __name__ == '__main__':
+    main()
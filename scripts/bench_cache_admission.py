@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Compare redirect-cache hit ratios with and without popularity admission.
+
+Replays synthetic request streams against a LinkCache the way
+redirect_link uses it (get, then set on a miss):
+
+skewed        Zipf-distributed requests over the link set
+skewed+scan   the same, with a share of requests for random one-off paths
+              (crawlers, typos, link checkers)
+uniform       every link equally likely
+
+Usage: python scripts/bench_cache_admission.py [requests]
+"""
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from link_cache import LinkCache
+
+LINKS = 50000
+CACHE_SIZE = 1000
+ZIPF_S = 0.9
+SCAN_SHARE = 0.3
+
+
+def zipf_stream(rng, count):
+    weights = [1 / (rank ** ZIPF_S) for rank in range(1, LINKS + 1)]
+    cum_weights = list(itertools.accumulate(weights))
+    ranks = rng.choices(range(LINKS), cum_weights=cum_weights, k=count)
+    return [f'link{rank}' for rank in ranks]
+
+
+def workloads(count, seed=1):
+    rng = random.Random(seed)
+    skewed = zipf_stream(rng, count)
+    scan = [f'scan{rng.randrange(10 ** 9)}' if rng.random() < SCAN_SHARE else key
+            for key in zipf_stream(rng, count)]
+    uniform = [f'link{rng.randrange(LINKS)}' for _ in range(count)]
+    return {'skewed': skewed, 'skewed+scan': scan, 'uniform': uniform}
+
+
+def replay(keys, admission):
+    cache = LinkCache(max_entries=CACHE_SIZE, admission=admission)
+    started = time.perf_counter()
+    for key in keys:
+        if cache.get(key) is None:
+            cache.set(key, 'https://example.com/' + key)
+    elapsed = time.perf_counter() - started
+    return cache.hits / len(keys), elapsed / len(keys)
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    print(f'{count} requests over {LINKS} links, cache of {CACHE_SIZE}')
+    print(f"{'workload':<12} {'LRU':>8} {'admission':>10} {'LRU us/op':>10} {'adm us/op':>10}")
+    for name, keys in workloads(count).items():
+        lru_ratio, lru_cost = replay(keys, admission=False)
+        adm_ratio, adm_cost = replay(keys, admission=True)
+        print(f'{name:<12} {lru_ratio:8.1%} {adm_ratio:10.1%} {lru_cost * 1e6:10.2f} {adm_cost * 1e6:10.2f}')
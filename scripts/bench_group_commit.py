@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Compare link-creation throughput with and without group commit.
+
+N threads each create links as fast as they can against a fresh on-disk
+SQLite database, either committing one link per transaction or through the
+group-commit writer.
+
+Usage: python scripts/bench_group_commit.py [links_per_thread]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from extensions import db
+from models import User
+from storage import add_link
+
+
+def run(group_commit, threads, per_thread):
+    tmpdir = tempfile.mkdtemp()
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmpdir}/bench.db',
+        'GROUP_COMMIT_ENABLED': group_commit,
+    })
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    def worker(n):
+        with app.app_context():
+            for i in range(per_thread):
+                add_link(f'bench-{n}-{i}', 'https://example.com', user_id)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    writer = app.extensions.get('group_commit')
+    if writer is not None:
+        writer.stop()
+    with app.app_context():
+        db.engine.dispose()
+    shutil.rmtree(tmpdir)
+    return threads * per_thread / elapsed
+
+
+def main():
+    per_thread = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    print(f"{'threads':>8} {'per-link commit':>18} {'group commit':>15}")
+    for threads in (1, 4, 16, 64):
+        single = run(False, threads, per_thread)
+        grouped = run(True, threads, per_thread)
+        print(f'{threads:>8} {single:>14.0f}/s {grouped:>12.0f}/s')
+
+
+if __name__ == '__main__':
+    main()
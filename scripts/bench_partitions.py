@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Compare link-write throughput with 1, 4 and 16 partitions.
+
+N threads each create, edit and delete links as fast as they can, one
+transaction per write as the web views do, against fresh on-disk
+partitions. The plain database (LINK_STORE=sql) is included for reference.
+
+Usage: python scripts/bench_partitions.py [threads] [links_per_thread]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from extensions import db
+from models import User
+from storage import get_store
+
+
+def run(partitions, threads, per_thread):
+    tmpdir = tempfile.mkdtemp()
+    config = {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmpdir}/bench.db', 'SECRET_KEY': 'bench'}
+    if partitions:
+        config.update(LINK_STORE='partitioned', LINK_PARTITIONS=partitions, LINK_PARTITION_DIR=tmpdir)
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    def worker(n):
+        with app.app_context():
+            store = get_store()
+            for i in range(per_thread):
+                store.create(f'bench-{n}-{i}', 'https://example.com', user_id)
+            for i in range(0, per_thread, 2):
+                store.update(store.get(f'bench-{n}-{i}'), 'https://example.org')
+                store.delete(store.get(f'bench-{n}-{i + 1}'))
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    if partitions:
+        app.extensions['link_store'].close()
+    with app.app_context():
+        db.engine.dispose()
+    shutil.rmtree(tmpdir)
+    return threads * per_thread * 2 / elapsed
+
+
+if __name__ == '__main__':
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    per_thread = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    print(f'{threads} threads, {per_thread} links each (create, then edit or delete each)')
+    for partitions in (None, 1, 4, 16):
+        label = f'{partitions} partitions' if partitions else 'database'
+        print(f'{label:<14} {run(partitions, threads, per_thread):8.0f} writes/s')
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Measure worker cold-start cost with and without warm_start().
+
+Each sample runs in a fresh interpreter, mimicking a restarted gunicorn
+worker, and times the import, the optional warm start, and the first few
+requests a worker typically sees.
+
+Usage: python scripts/bench_startup.py [samples]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import json, sys, time
+t0 = time.perf_counter()
+from app import create_app
+from extensions import db
+app = create_app()
+t1 = time.perf_counter()
+if sys.argv[1] == 'warm':
+    from warmup import warm_start
+    warm_start(app)
+else:
+    with app.app_context():
+        db.create_all()
+t2 = time.perf_counter()
+client = app.test_client()
+timings = {'import': t1 - t0, 'startup': t2 - t1}
+for path in ['/login', '/register', '/login', '/bench-startup-missing']:
+    started = time.perf_counter()
+    client.get(path)
+    timings.setdefault(path, time.perf_counter() - started)
+print(json.dumps(timings))
+'''
+
+
+def sample(mode):
+    out = subprocess.run([sys.executable, '-c', CHILD, mode], cwd=ROOT,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for mode in ('cold', 'warm'):
+        runs = [sample(mode) for _ in range(samples)]
+        print(f'{mode}:')
+        for key in runs[0]:
+            median = statistics.median(run[key] for run in runs) * 1000
+            print(f'  {key:<24} {median:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Measure address-bar suggestion latency.
+
+Builds a SuggestionIndex of synthetic short paths, ranks the most used
+ones with Zipf-distributed redirect counts, then replays typing: for each
+link picked (by popularity), one suggestion call per prefix of its short
+path, as a browser sends one per keystroke. Reports per-call percentiles
+for the index alone and for a full GET /api/suggest through the WSGI app.
+
+Usage: python scripts/bench_suggest.py [links] [typed links]
+"""
+import itertools
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from suggest import RANKED_LINKS, SuggestionIndex
+
+ZIPF_S = 0.9
+WORDS = ['api', 'docs', 'wiki', 'team', 'oncall', 'dash', 'design', 'eng', 'hr', 'plan', 'q3', 'roadmap']
+
+
+def short_paths(rng, count):
+    paths = set()
+    while len(paths) < count:
+        if rng.random() < 0.5:
+            paths.add(f'{rng.choice(WORDS)}/{rng.choice(WORDS)}-{rng.randrange(10 ** 5)}')
+        else:
+            paths.add(''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 12))))
+    return sorted(paths)
+
+
+def percentiles(timings):
+    timings.sort()
+    pick = lambda q: timings[min(len(timings) - 1, int(q * len(timings)))] * 1e6
+    return f'p50 {pick(0.5):7.1f} us   p99 {pick(0.99):7.1f} us   max {timings[-1] * 1e6:8.1f} us'
+
+
+def typed_prefixes(rng, paths, count):
+    weights = list(itertools.accumulate(1 / (rank ** ZIPF_S) for rank in range(1, len(paths) + 1)))
+    for path in rng.choices(paths, cum_weights=weights, k=count):
+        for length in range(1, len(path) + 1):
+            yield path[:length]
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    typed = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    rng = random.Random(1)
+    paths = short_paths(rng, count)
+    by_use = rng.sample(paths, len(paths))
+
+    index = SuggestionIndex()
+    started = time.perf_counter()
+    index.replace(paths)
+    index.rank((path, int(100000 / rank ** ZIPF_S)) for rank, path in enumerate(by_use[:RANKED_LINKS], 1))
+    print(f'{count} links indexed in {(time.perf_counter() - started) * 1000:.0f} ms')
+    started = time.perf_counter()
+    index.add(['new-link'])
+    print(f'one new link merged in {(time.perf_counter() - started) * 1000:.1f} ms')
+
+    prefixes = list(typed_prefixes(rng, by_use, typed))
+    timings = []
+    for prefix in prefixes:
+        started = time.perf_counter()
+        index.suggest(prefix)
+        timings.append(time.perf_counter() - started)
+    print(f'index.suggest, {len(prefixes)} calls:  {percentiles(timings)}')
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmpdir, 'bench.db')}",
+                          'SECRET_KEY': 'bench', 'SUGGEST_PUBLIC': True})
+        app.extensions['suggestions'] = index
+        client = app.test_client()
+        client.get('/api/suggest', query_string={'q': ''})
+        timings = []
+        for prefix in prefixes:
+            started = time.perf_counter()
+            client.get('/api/suggest', query_string={'q': prefix})
+            timings.append(time.perf_counter() - started)
+        print(f'GET /api/suggest, {len(prefixes)} calls: {percentiles(timings)}')
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Check every link's target URL and record which ones are broken.
+
+With --interval the checks repeat forever, sleeping that many seconds
+between rounds, so this can run as a sidecar next to the web workers.
+Otherwise one round runs and the script exits (e.g. from cron).
+
+Usage: python scripts/check_links.py [--interval SECONDS]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from extensions import db
+from health import run_health_checks
+from warmup import ensure_schema
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check go-link targets for broken links.')
+    parser.add_argument('--interval', type=float, metavar='SECONDS',
+                        help='repeat the checks every SECONDS seconds')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        ensure_schema(db)
+    while True:
+        started = time.monotonic()
+        broken = run_health_checks(app)
+        print(f"Checked links in {time.monotonic() - started:.1f}s, {broken} broken", flush=True)
+        if not args.interval:
+            return
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Compile all links into the memory-mapped table used by LINK_STORE=linktable.
+
+The new table is renamed over the old one, so running workers switch to it
+within LINK_CACHE_CHECK_INTERVAL seconds without a restart.
+
+Usage: python scripts/compile_link_table.py [path]
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from linktable import compile_link_table
+from storage import SQLAlchemyLinkStore
+
+if __name__ == '__main__':
+    app = create_app()
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(app.instance_path, app.config['LINK_TABLE_PATH'])
+    with app.app_context():
+        count = compile_link_table(SQLAlchemyLinkStore().iter_links(), path)
+    print(f"Compiled {count} links into {path}")
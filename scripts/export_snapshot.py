@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+"""
+Export all links to the read-only snapshot used by LINK_STORE=snapshot.
+
+Usage: python scripts/export_snapshot.py [path]
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from storage import SQLAlchemyLinkStore, export_snapshot
+
+if __name__ == '__main__':
+    app = create_app()
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(app.instance_path, app.config['LINK_SNAPSHOT_PATH'])
+    with app.app_context():
+        count = export_snapshot(SQLAlchemyLinkStore(), path)
+    print(f"Exported {count} links to {path}")
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Change the number of link partitions used by LINK_STORE=partitioned.
+
+Copies every link from the current partitions (LINK_PARTITIONS files in
+LINK_PARTITION_DIR), or from the main database with --from-database, into
+COUNT new partition files alongside them. Stop link writes while it runs,
+then set GOLINKS_LINK_PARTITIONS=COUNT and restart the workers. The old
+files are left in place until you delete them.
+
+Usage: python scripts/rebalance_partitions.py COUNT [--from-database]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from storage import database_path, partition_paths, rebalance_partitions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('count', type=int, help='number of partitions to create')
+    parser.add_argument('--from-database', action='store_true',
+                        help='copy links from the main database instead of the current partitions')
+    args = parser.parse_args()
+
+    app = create_app()
+    directory = os.path.join(app.instance_path, app.config['LINK_PARTITION_DIR'])
+    os.makedirs(directory, exist_ok=True)
+    if args.from_database:
+        sources = [database_path(app)]
+    else:
+        sources = partition_paths(directory, app.config['LINK_PARTITIONS'])
+    targets = partition_paths(directory, args.count)
+    if set(sources) & set(targets) or any(os.path.exists(path) for path in targets):
+        sys.exit(f'{args.count} partitions already exist in {directory}')
+    count = rebalance_partitions(sources, targets)
+    print(f'Copied {count} links into {args.count} partitions in {directory}')
+    print(f'Set GOLINKS_LINK_PARTITIONS={args.count} and restart the workers')
@@ -0,0 +1,172 @@
+"""
+Stable secret key and optional server-side sessions.
+
+Every worker must sign cookies with the same key, and keep it across
+restarts, or users are logged out whenever a request lands on another
+worker. ``init_sessions`` takes SECRET_KEY from the config
+(GOLINKS_SECRET_KEY) or else from ``secret_key`` in the instance folder,
+generating that file once; concurrent workers race to create it with
+O_EXCL, and the losers read the winner's key.
+
+With SESSION_STORE = 'sqlite', session data lives in a small SQLite file
+(SESSION_DB_PATH) shared by all workers on the host instead of in the
+cookie, which only carries a random session id. Sessions can then be
+revoked, and survive restarts the same way. The id is replaced whenever the
+logged-in user changes. Rows are written only when a
+session changes or is past half its lifetime, and expired rows are swept
+at most every SESSION_SWEEP_INTERVAL seconds per worker.
+"""
+
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+
+def load_or_create_secret_key(path):
+    """Return the key stored at ``path``, creating it if it doesn't exist yet."""
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # Another worker may still be writing it
+        for _ in range(50):
+            with open(path) as f:
+                key = f.read().strip()
+            if key:
+                return key
+            time.sleep(0.01)
+        raise RuntimeError(f'{path} is empty')
+    key = secrets.token_hex(32)
+    with os.fdopen(fd, 'w') as f:
+        f.write(key + '\n')
+    return key
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Session data loaded from the store; ``modified`` is set on any change."""
+
+    def __init__(self, initial=None, sid=None, new=False, expires_at=0.0):
+        def on_update(session):
+            session.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.expires_at = expires_at
+        self.modified = False
+        # Flask-Login's key for the logged-in user, as loaded
+        self.loaded_user_id = self.get('_user_id')
+
+
+class SQLiteSessionStore:
+    """Session rows in a SQLite file, one connection per thread."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS sessions ('
+                         'sid TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL'
+                         ') WITHOUT ROWID')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_sessions_expires_at ON sessions (expires_at)')
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def load(self, sid, now):
+        """Return (data, expires_at) for a live session, or None."""
+        return self._connection().execute(
+            'SELECT data, expires_at FROM sessions WHERE sid = ? AND expires_at > ?', (sid, now)
+        ).fetchone()
+
+    def save(self, sid, data, expires_at):
+        with self._connection() as conn:
+            conn.execute('INSERT INTO sessions (sid, data, expires_at) VALUES (?, ?, ?) '
+                         'ON CONFLICT (sid) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at',
+                         (sid, data, expires_at))
+
+    def delete(self, sid):
+        with self._connection() as conn:
+            conn.execute('DELETE FROM sessions WHERE sid = ?', (sid,))
+
+    def sweep(self, now):
+        """Delete expired sessions. Returns how many were removed."""
+        with self._connection() as conn:
+            return conn.execute('DELETE FROM sessions WHERE expires_at <= ?', (now,)).rowcount
+
+
+class ServerSessionInterface(SessionInterface):
+    """Keeps session data in a ``SQLiteSessionStore``; the cookie holds only the id."""
+
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, store, sweep_interval=300.0):
+        self.store = store
+        self.sweep_interval = sweep_interval
+        self._swept_at = 0.0
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            row = self.store.load(sid, time.time())
+            if row is not None:
+                data, expires_at = row
+                return ServerSession(self.serializer.loads(data), sid, expires_at=expires_at)
+        return ServerSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        now = time.time()
+        if now - self._swept_at >= self.sweep_interval:
+            self._swept_at = now
+            self.store.sweep(now)
+
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if not session:
+            if session.modified and not session.new:
+                # Logged out or cleared: forget it on both sides
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        if not (session.new or session.modified or session.expires_at - now < lifetime / 2):
+            return
+        if not session.new and session.get('_user_id') != session.loaded_user_id:
+            # A new id whenever the user changes, so a session id planted
+            # before login (session fixation) never becomes a logged-in one
+            self.store.delete(session.sid)
+            session.sid = secrets.token_urlsafe(32)
+        self.store.save(session.sid, self.serializer.dumps(dict(session)), now + lifetime)
+        response.set_cookie(
+            name, session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+            domain=domain, path=path)
+
+
+def init_sessions(app):
+    if not app.config['SECRET_KEY']:
+        os.makedirs(app.instance_path, exist_ok=True)
+        app.config['SECRET_KEY'] = load_or_create_secret_key(os.path.join(app.instance_path, 'secret_key'))
+
+    backend = app.config['SESSION_STORE']
+    if backend == 'sqlite':
+        os.makedirs(app.instance_path, exist_ok=True)
+        store = SQLiteSessionStore(os.path.join(app.instance_path, app.config['SESSION_DB_PATH']))
+        app.session_interface = ServerSessionInterface(store, app.config['SESSION_SWEEP_INTERVAL'])
+    elif backend:
+        raise ValueError(f'Unknown SESSION_STORE {backend!r}')
@@ -0,0 +1,11 @@
+// Remove flash messages after animation completes
+document.addEventListener('DOMContentLoaded', function() {
+    const flashMessages = document.querySelectorAll('.flash');
+    flashMessages.forEach(function(message) {
+        message.addEventListener('animationend', function(e) {
+            if (e.animationName === 'fadeOut') {
+                message.remove();
+            }
+        });
+    });
+});
@@ -0,0 +1,850 @@
+"""
+Link storage backends.
+
+Views never query ``GoLink`` directly; they go through the app's
+``LinkStore`` (``get_store()``), selected by the ``LINK_STORE`` setting:
+
+``sql``
+    The SQLAlchemy database. Handles both resolution and management.
+``snapshot``
+    Redirects are resolved from a read-only SQLite key/value file written by
+    ``export_snapshot`` (see scripts/export_snapshot.py) and shared by every
+    worker on the host. Management still goes to the database. Meant for
+    redirect pods that can tolerate links being as fresh as the last export.
+``linktable``
+    Like ``snapshot``, but resolving from a compiled, memory-mapped hash table
+    (see linktable.py and scripts/compile_link_table.py). No SQLite on the
+    redirect path at all.
+``partitioned``
+    Links spread over LINK_PARTITIONS SQLite files by a hash of short_path,
+    each with its own write lock, so writes to different partitions don't
+    queue behind each other. Users stay in the database. Change the number
+    of partitions with scripts/rebalance_partitions.py.
+"""
+
+import heapq
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter, defaultdict
+from itertools import islice
+from operator import attrgetter, itemgetter
+from urllib.parse import urlsplit
+
+from flask import current_app
+from flask_sqlalchemy.pagination import Pagination
+from sqlalchemy import create_engine, event, func, insert, make_url, or_, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+from extensions import db
+from group_commit import init_group_commit
+from linktable import LinkTable
+from models import (CacheGeneration, GoLink, bump_generations_after_dml, bump_generations_after_flush,
+                    canonical_url_fields)
+from utils import normalize_host, normalize_url, prefix_upper_bound, url_hash
+
+# Default for update() arguments that should be left as they are
+UNCHANGED = object()
+
+
+class LinkStore:
+    """Interface for resolving and managing go-links."""
+
+    def resolve(self, short_path):
+        """Return the target URL for ``short_path``, or None."""
+        raise NotImplementedError
+
+    def generation(self):
+        """Return a value that changes whenever resolved links may have changed."""
+        raise NotImplementedError
+
+    def list_generation(self):
+        """
+        Return a value that changes whenever the links behind ``search``,
+        ``link_counts`` and ``short_paths`` may have changed. The same as
+        ``generation`` unless those come from another store.
+        """
+        return self.generation()
+
+    def get(self, short_path):
+        """Return the ``GoLink`` for ``short_path``, or None."""
+        raise NotImplementedError
+
+    def create(self, short_path, target_url, user_id, not_before=None, expires_at=None):
+        """Add a link. Returns False if ``short_path`` is already taken."""
+        raise NotImplementedError
+
+    def create_many(self, entries):
+        """
+        Add (short_path, target_url, user_id) entries in one transaction.
+
+        Entries may also carry (not_before, expires_at) after user_id.
+        Returns one bool per entry, as ``create`` would. Within the batch the
+        first entry for a short_path wins.
+        """
+        raise NotImplementedError
+
+    def update(self, link, target_url, not_before=UNCHANGED, expires_at=UNCHANGED):
+        """Change a link's target and, if given, its schedule."""
+        raise NotImplementedError
+
+    def delete(self, link):
+        raise NotImplementedError
+
+    def search(self, user_id=None, q='', page=1, per_page=10):
+        """Return a pagination of links, optionally filtered by owner and substring."""
+        raise NotImplementedError
+
+    def iter_links(self):
+        """Yield every (short_path, target_url) pair in short_path order."""
+        raise NotImplementedError
+
+    def scheduled_links(self, now):
+        """Return (short_path, not_before, expires_at) for links that start after ``now`` or ever expire."""
+        raise NotImplementedError
+
+    def short_paths(self, since=None):
+        """
+        Return (short_paths, marker, complete) for keeping a copy of the set
+        of short paths up to date.
+
+        ``since`` is the marker from an earlier call. If no link was deleted
+        since then, only the short paths added since are returned, with
+        ``complete`` False; otherwise (or without ``since``) every short
+        path is, in no particular order, with ``complete`` True.
+        """
+        raise NotImplementedError
+
+    def link_counts(self, user_ids):
+        """Return {user_id: number of links} for those of ``user_ids`` that have links."""
+        raise NotImplementedError
+
+    def links_for_url(self, url):
+        """Return the links whose target normalizes to the same URL as ``url``."""
+        raise NotImplementedError
+
+    def duplicate_targets(self):
+        """Return (canonical_url, [short_path, ...]) for targets shared by several links."""
+        raise NotImplementedError
+
+    def links_for_host(self, host):
+        """Return the links whose target is on ``host`` (any scheme or port)."""
+        raise NotImplementedError
+
+    def links_with_prefix(self, prefix):
+        """Return the links whose normalized target starts with normalized ``prefix``."""
+        raise NotImplementedError
+
+    def rewrite_host(self, old_host, new_host):
+        """Move every link on ``old_host`` to ``new_host``. Returns the number rewritten."""
+        raise NotImplementedError
+
+    def rewrite_prefix(self, old_prefix, new_prefix):
+        """Replace ``old_prefix`` with ``new_prefix`` in every matching target. Returns the number rewritten."""
+        raise NotImplementedError
+
+    def link_sessions(self):
+        """
+        Return the sessions of every database holding links, for reports that
+        query the ``go_link`` table directly (health checks, usage stats).
+        Each also sees the main database's tables.
+        """
+        raise NotImplementedError
+
+
+class SQLAlchemyLinkStore(LinkStore):
+    """Links stored in the app's SQLAlchemy database, or in ``session``'s."""
+
+    def __init__(self, session=db.session):
+        self.session = session
+
+    def resolve(self, short_path):
+        return self.session.execute(
+            select(GoLink.target_url).filter_by(short_path=short_path)
+        ).scalar()
+
+    def generation(self):
+        return self.session.execute(
+            select(CacheGeneration.value).filter_by(name='links')
+        ).scalar() or 0
+
+    def get(self, short_path):
+        return self.session.query(GoLink).filter_by(short_path=short_path).first()
+
+    def create(self, short_path, target_url, user_id, not_before=None, expires_at=None):
+        return self.create_many([(short_path, target_url, user_id, not_before, expires_at)])[0]
+
+    def create_many(self, entries):
+        # One INSERT ... ON CONFLICT DO NOTHING: the unique index settles
+        # races, and RETURNING tells us which rows went in
+        stmt = sqlite_insert(GoLink).on_conflict_do_nothing(
+            index_elements=[GoLink.short_path]).returning(GoLink.short_path)
+        rows = []
+        for short_path, target_url, user_id, *schedule in entries:
+            not_before, expires_at = schedule or (None, None)
+            rows.append(dict(canonical_url_fields(target_url),
+                             short_path=short_path, target_url=target_url, user_id=user_id,
+                             not_before=not_before, expires_at=expires_at))
+        inserted = set(self.session.scalars(stmt, rows))
+        self.session.commit()
+        results = []
+        for short_path, *_ in entries:
+            results.append(short_path in inserted)
+            # Within the batch the first entry for a path wins
+            inserted.discard(short_path)
+        return results
+
+    def update(self, link, target_url, not_before=UNCHANGED, expires_at=UNCHANGED):
+        link.target_url = target_url
+        if not_before is not UNCHANGED:
+            link.not_before = not_before
+        if expires_at is not UNCHANGED:
+            link.expires_at = expires_at
+        self.session.commit()
+
+    def delete(self, link):
+        self.session.delete(link)
+        self.session.commit()
+
+    def search(self, user_id=None, q='', page=1, per_page=10):
+        return LinkPagination(page, per_page, error_out=False, sessions=[self.session],
+                              query=_search_query(user_id, q))
+
+    def link_sessions(self):
+        return [self.session]
+
+    def iter_links(self):
+        query = select(GoLink.short_path, GoLink.target_url).order_by(GoLink.short_path)
+        yield from self.session.execute(query.execution_options(yield_per=1000))
+
+    def scheduled_links(self, now):
+        return self.session.execute(
+            select(GoLink.short_path, GoLink.not_before, GoLink.expires_at)
+            .where(or_(GoLink.not_before > now, GoLink.expires_at.is_not(None)))).all()
+
+    def short_paths(self, since=None):
+        # The marker is (highest id, its short_path, number of links). New
+        # links get higher ids, so they are found with a primary key range.
+        # A deletion shows up as a count lower than expected, or, since
+        # SQLite reuses the ids of deleted rows at the end of the table, as
+        # a different short_path at the highest id. Counting first means a
+        # write racing with these queries fails the check now or on the
+        # next call, never silently.
+        total = self.session.execute(select(func.count()).select_from(GoLink)).scalar()
+        if since is not None:
+            last_id, last_path, count = since
+            if self.session.execute(select(GoLink.short_path).filter_by(id=last_id)).scalar() == last_path:
+                rows = self.session.execute(select(GoLink.id, GoLink.short_path)
+                                            .where(GoLink.id > last_id).order_by(GoLink.id)).all()
+                if count + len(rows) == total:
+                    marker = (*rows[-1], total) if rows else (last_id, last_path, total)
+                    return [short_path for _, short_path in rows], marker, False
+        # In short_path order, which the unique index gives for free and
+        # makes sorting them again cheap. Through the connection, as the
+        # ORM session's result handling doubles the time for a million rows.
+        last = self.session.execute(select(GoLink.id, GoLink.short_path).order_by(GoLink.id.desc()).limit(1)).first()
+        short_paths = self.session.connection().execute(
+            select(GoLink.short_path).order_by(GoLink.short_path)).scalars().all()
+        return short_paths, (*last, len(short_paths)) if last else (0, None, 0), True
+
+    def link_counts(self, user_ids):
+        return dict(self.session.execute(
+            select(GoLink.user_id, func.count()).where(GoLink.user_id.in_(user_ids))
+            .group_by(GoLink.user_id)).all())
+
+    def links_for_url(self, url):
+        canonical = normalize_url(url)
+        # The hash index narrows it to (almost always) the matching rows; the
+        # canonical_url comparison rules out hash collisions
+        return self.session.query(GoLink).filter_by(url_hash=url_hash(canonical), canonical_url=canonical) \
+            .order_by(GoLink.short_path).all()
+
+    def duplicate_targets(self):
+        shared = select(GoLink.url_hash).where(GoLink.url_hash.is_not(None)) \
+            .group_by(GoLink.url_hash).having(func.count() > 1)
+        rows = self.session.execute(
+            select(GoLink.canonical_url, GoLink.short_path)
+            .where(GoLink.url_hash.in_(shared))
+            .order_by(GoLink.canonical_url, GoLink.short_path))
+        return _group_duplicates(rows)
+
+    def links_for_host(self, host):
+        return self.session.query(GoLink).filter_by(target_host=normalize_host(host)) \
+            .order_by(GoLink.short_path).all()
+
+    def links_with_prefix(self, prefix):
+        return self.session.query(GoLink).filter(_prefix_range(normalize_url(prefix))) \
+            .order_by(GoLink.short_path).all()
+
+    def rewrite_host(self, old_host, new_host):
+        old_host, new_host = normalize_host(old_host), normalize_host(new_host)
+        return self._rewrite(lambda url: _replace_host(url, new_host), GoLink.target_host == old_host)
+
+    def rewrite_prefix(self, old_prefix, new_prefix):
+        old_prefix, new_prefix = normalize_url(old_prefix), normalize_url(new_prefix)
+        return self._rewrite(lambda url: _replace_prefix(url, old_prefix, new_prefix),
+                             _prefix_range(old_prefix))
+
+    def _rewrite(self, rewrite, *conditions):
+        # The matching rows are found on the indexed canonical columns, but the
+        # substitution is made in each target as typed, so its query string
+        # keeps its order and escapes; the derived columns are recomputed from
+        # the result. Then one executemany UPDATE by primary key. Health
+        # results no longer apply.
+        rows = self.session.execute(select(GoLink.id, GoLink.target_url).where(*conditions)).all()
+        if not rows:
+            return 0
+        cleared = {'health_status': None, 'health_error': None, 'health_latency_ms': None,
+                   'health_checked_at': None, 'health_etag': None, 'health_last_modified': None}
+        params = []
+        for link_id, target_url in rows:
+            new_url = rewrite(target_url)
+            params.append(dict(canonical_url_fields(new_url), **cleared, id=link_id, target_url=new_url))
+        self.session.execute(update(GoLink), params)
+        self.session.commit()
+        return len(params)
+
+
+def _prefix_range(prefix):
+    # A range on the canonical_url index, where LIKE 'prefix%' can't use it
+    upper = prefix_upper_bound(prefix)
+    condition = GoLink.canonical_url >= prefix
+    return condition if upper is None else condition & (GoLink.canonical_url < upper)
+
+
+def _split_netloc(url):
+    # (start, end) of the netloc in ``url`` as typed
+    parts = urlsplit(url)
+    start = url.index('//') + 2
+    return start, start + len(parts.netloc)
+
+
+def _replace_host(url, new_host):
+    """``url`` as typed with its host replaced, keeping any userinfo and port."""
+    url = url.strip()
+    start, end = _split_netloc(url)
+    userinfo, at, host_port = url[start:end].rpartition('@')
+    host_end = host_port.index(']') + 1 if host_port.startswith('[') else len(host_port.partition(':')[0])
+    return url[:start] + userinfo + at + new_host + host_port[host_end:] + url[end:]
+
+
+def _replace_prefix(url, old_prefix, new_prefix):
+    """
+    ``url`` (whose canonical form starts with ``old_prefix``) with the
+    prefix replaced. Everything before the query is taken in canonical form
+    and the query and fragment as typed, unless the prefix reaches into
+    them; then the canonical form is all there is to go on.
+    """
+    url = url.strip()
+    _, netloc_end = _split_netloc(url)
+    tail_start = min((i for i in (url.find('?', netloc_end), url.find('#', netloc_end)) if i != -1),
+                     default=len(url))
+    base = normalize_url(url[:tail_start])
+    if len(old_prefix) <= len(base):
+        return new_prefix + base[len(old_prefix):] + url[tail_start:]
+    return new_prefix + normalize_url(url)[len(old_prefix):]
+
+
+def _search_query(user_id, q):
+    query = select(GoLink)
+    if user_id is not None:
+        query = query.filter_by(user_id=user_id)
+    if q:
+        query = query.filter(or_(GoLink.short_path.contains(q), GoLink.target_url.contains(q)))
+    return query
+
+
+def _group_duplicates(rows):
+    # rows are (canonical_url, short_path) in that order; rows that only
+    # shared a hash with another URL are dropped
+    duplicates = {}
+    for canonical, short_path in rows:
+        duplicates.setdefault(canonical, []).append(short_path)
+    return [(canonical, paths) for canonical, paths in duplicates.items() if len(paths) > 1]
+
+
+class LinkPagination(Pagination):
+    """
+    A page of ``query``'s links across one or more ``sessions``, in
+    short_path order.
+
+    With several sessions (partitions), each contributes its first
+    offset + per_page matches and the page is cut from their merge, so
+    later pages cost more than with a single database's LIMIT/OFFSET.
+    """
+
+    def _query_items(self):
+        sessions = self._query_args['sessions']
+        query = self._query_args['query'].order_by(GoLink.short_path)
+        start = self._query_offset
+        if len(sessions) == 1:
+            return sessions[0].scalars(query.limit(self.per_page).offset(start)).all()
+        end = start + self.per_page
+        pages = [session.scalars(query.limit(end)).all() for session in sessions]
+        return list(islice(heapq.merge(*pages, key=attrgetter('short_path')), start, end))
+
+    def _query_count(self):
+        count = select(func.count()).select_from(self._query_args['query'].subquery())
+        return sum(session.execute(count).scalar() for session in self._query_args['sessions'])
+
+
+class ReplicaLinkStore(LinkStore):
+    """
+    Base for read-optimized stores: redirects are resolved locally, while
+    management and listing are delegated to ``primary``.
+    """
+
+    def __init__(self, primary):
+        self.primary = primary
+
+    def list_generation(self):
+        # The replica file only changes when re-exported; listings are live
+        return self.primary.list_generation()
+
+    def get(self, short_path):
+        return self.primary.get(short_path)
+
+    def create(self, short_path, target_url, user_id, not_before=None, expires_at=None):
+        return self.primary.create(short_path, target_url, user_id, not_before, expires_at)
+
+    def create_many(self, entries):
+        return self.primary.create_many(entries)
+
+    def update(self, link, target_url, not_before=UNCHANGED, expires_at=UNCHANGED):
+        self.primary.update(link, target_url, not_before, expires_at)
+
+    def delete(self, link):
+        self.primary.delete(link)
+
+    def search(self, user_id=None, q='', page=1, per_page=10):
+        return self.primary.search(user_id, q, page, per_page)
+
+    def link_sessions(self):
+        return self.primary.link_sessions()
+
+    def iter_links(self):
+        return self.primary.iter_links()
+
+    def scheduled_links(self, now):
+        return self.primary.scheduled_links(now)
+
+    def short_paths(self, since=None):
+        return self.primary.short_paths(since)
+
+    def link_counts(self, user_ids):
+        return self.primary.link_counts(user_ids)
+
+    def links_for_url(self, url):
+        return self.primary.links_for_url(url)
+
+    def duplicate_targets(self):
+        return self.primary.duplicate_targets()
+
+    def links_for_host(self, host):
+        return self.primary.links_for_host(host)
+
+    def links_with_prefix(self, prefix):
+        return self.primary.links_with_prefix(prefix)
+
+    def rewrite_host(self, old_host, new_host):
+        return self.primary.rewrite_host(old_host, new_host)
+
+    def rewrite_prefix(self, old_prefix, new_prefix):
+        return self.primary.rewrite_prefix(old_prefix, new_prefix)
+
+
+class FileBackedLinkStore(ReplicaLinkStore):
+    """
+    Base for replicas that resolve from a file on local disk.
+
+    The file is only ever replaced by renaming a new one over it, so a change
+    of inode, mtime or size means a new version. That is checked at most once
+    per ``check_interval`` seconds and doubles as the store's generation.
+    """
+
+    def __init__(self, path, primary, check_interval=1.0):
+        super().__init__(primary)
+        self.path = path
+        self.check_interval = check_interval
+        self._version = None
+        self._checked_at = 0.0
+
+    def _current_version(self):
+        now = time.monotonic()
+        if self._version is None or now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            st = os.stat(self.path)
+            self._version = (st.st_ino, st.st_mtime_ns, st.st_size)
+        return self._version
+
+    def generation(self):
+        return self._current_version()
+
+
+class SnapshotLinkStore(FileBackedLinkStore):
+    """
+    Redirects resolved from a read-only SQLite snapshot file.
+
+    The snapshot is a single WITHOUT ROWID table, so a lookup is one B-tree
+    probe on the clustered key. It is opened immutable and memory-mapped, so
+    workers on a host share the same page-cache pages.
+    """
+
+    MMAP_SIZE = 256 * 1024 * 1024
+
+    def __init__(self, path, primary, check_interval=1.0):
+        super().__init__(path, primary, check_interval)
+        self._local = threading.local()
+
+    def _connection(self):
+        # sqlite3 connections are per thread; reopen when the file was replaced
+        version = self._current_version()
+        if getattr(self._local, 'version', None) != version:
+            conn = sqlite3.connect(f'file:{self.path}?mode=ro&immutable=1', uri=True)
+            conn.execute(f'PRAGMA mmap_size={self.MMAP_SIZE}')
+            self._local.conn = conn
+            self._local.version = version
+        return self._local.conn
+
+    def resolve(self, short_path):
+        row = self._connection().execute(
+            'SELECT target_url FROM links WHERE short_path = ?', (short_path,)
+        ).fetchone()
+        return row[0] if row else None
+
+
+class LinkTableStore(FileBackedLinkStore):
+    """
+    Redirects resolved from a compiled link table (see linktable.py).
+
+    A lookup is a hash probe over the memory-mapped file with no SQL. It still
+    allocates small objects (the key bytes, a tuple per slot or entry read,
+    and the URL's bytes before decoding), but never copies or slices the
+    mapping otherwise. The mapping is shared by all threads and replaced when
+    the file is recompiled; the old mapping is released once no request is
+    using it.
+    """
+
+    def __init__(self, path, primary, check_interval=1.0):
+        super().__init__(path, primary, check_interval)
+        self._table = None
+        self._table_version = None
+        self._lock = threading.Lock()
+
+    def _current_table(self):
+        version = self._current_version()
+        if self._table_version != version:
+            with self._lock:
+                if self._table_version != version:
+                    self._table = LinkTable(self.path)
+                    self._table_version = version
+        return self._table
+
+    def resolve(self, short_path):
+        return self._current_table().get(short_path)
+
+
+# The tables each partition file holds; users, hit counts and the other
+# generations stay in the main database
+PARTITION_TABLES = [GoLink.__table__, CacheGeneration.__table__]
+
+
+def partition_index(short_path, count):
+    """Return which of ``count`` partitions holds ``short_path``."""
+    # crc32 rather than hash(), which differs between processes
+    return zlib.crc32(short_path.encode()) % count
+
+
+def partition_paths(directory, count):
+    """Return the file paths of a ``count``-way partitioning in ``directory``."""
+    return [os.path.join(directory, f'links-{index}-of-{count}.db') for index in range(count)]
+
+
+def database_path(app):
+    """Return the file path of the app's SQLite database."""
+    path = make_url(app.config['SQLALCHEMY_DATABASE_URI']).database
+    return path if os.path.isabs(path) else os.path.join(app.instance_path, path)
+
+
+def create_partition_tables(engine):
+    try:
+        db.metadata.create_all(engine, tables=PARTITION_TABLES)
+    except OperationalError:
+        # Another worker booting at the same time won the CREATE TABLE race
+        db.metadata.create_all(engine, tables=PARTITION_TABLES)
+
+
+def open_partition(path, users_db_path):
+    """
+    Return a scoped session for the partition file at ``path``.
+
+    Connections attach the main database, so the unqualified ``user`` table
+    (which partitions don't have) resolves there and ``link.creator`` loads
+    as usual. Sessions bump the partition's own 'links' generation on every
+    write, like ``db.session`` does in the main database.
+    """
+    engine = create_engine(f'sqlite:///{path}', connect_args={'timeout': 30})
+
+    @event.listens_for(engine, 'connect')
+    def configure_connection(dbapi_connection, connection_record):
+        # WAL lets redirects read a partition while it is being written
+        dbapi_connection.execute('PRAGMA journal_mode=WAL')
+        dbapi_connection.execute('ATTACH DATABASE ? AS golinks', (users_db_path,))
+
+    create_partition_tables(engine)
+    factory = sessionmaker(bind=engine)
+    event.listen(factory, 'after_flush', bump_generations_after_flush)
+    event.listen(factory, 'do_orm_execute', bump_generations_after_dml)
+    return scoped_session(factory)
+
+
+class PartitionedLinkStore(LinkStore):
+    """
+    Links spread over several SQLite files by a hash of short_path.
+
+    SQLite lets one writer at a time into a database file, so with a single
+    file every create, edit and delete queues behind the others. Here each
+    partition file has its own write lock, and a link lives in partition
+    ``partition_index(short_path, len(paths))``. Anything keyed by short_path
+    goes to that one partition; listings and target lookups query every
+    partition and merge the results in short_path order.
+    """
+
+    def __init__(self, paths, users_db_path):
+        self.paths = list(paths)
+        self.partitions = [SQLAlchemyLinkStore(open_partition(path, users_db_path)) for path in self.paths]
+
+    def _partition(self, short_path):
+        return self.partitions[partition_index(short_path, len(self.partitions))]
+
+    def _merged(self, lists):
+        return list(heapq.merge(*lists, key=attrgetter('short_path')))
+
+    def remove_sessions(self, exc=None):
+        """End this thread's partition sessions, as Flask-SQLAlchemy does for ``db.session``."""
+        for partition in self.partitions:
+            partition.session.remove()
+
+    def close(self):
+        self.remove_sessions()
+        for partition in self.partitions:
+            partition.session.get_bind().dispose()
+
+    def resolve(self, short_path):
+        return self._partition(short_path).resolve(short_path)
+
+    def generation(self):
+        return tuple(partition.generation() for partition in self.partitions)
+
+    def get(self, short_path):
+        return self._partition(short_path).get(short_path)
+
+    def create(self, short_path, target_url, user_id, not_before=None, expires_at=None):
+        return self._partition(short_path).create(short_path, target_url, user_id, not_before, expires_at)
+
+    def create_many(self, entries):
+        # One transaction per partition touched. Entries for the same path
+        # land in the same group, in order, so the first still wins.
+        groups = defaultdict(list)
+        for position, entry in enumerate(entries):
+            groups[partition_index(entry[0], len(self.partitions))].append(position)
+        results = [False] * len(entries)
+        for index, positions in groups.items():
+            created = self.partitions[index].create_many([entries[position] for position in positions])
+            for position, result in zip(positions, created):
+                results[position] = result
+        return results
+
+    def update(self, link, target_url, not_before=UNCHANGED, expires_at=UNCHANGED):
+        self._partition(link.short_path).update(link, target_url, not_before, expires_at)
+
+    def delete(self, link):
+        self._partition(link.short_path).delete(link)
+
+    def search(self, user_id=None, q='', page=1, per_page=10):
+        return LinkPagination(page, per_page, error_out=False, sessions=self.link_sessions(),
+                              query=_search_query(user_id, q))
+
+    def link_sessions(self):
+        # Partitions attach the main database, so joins with link_daily_hits work
+        return [partition.session for partition in self.partitions]
+
+    def iter_links(self):
+        return heapq.merge(*(partition.iter_links() for partition in self.partitions), key=itemgetter(0))
+
+    def scheduled_links(self, now):
+        return [row for partition in self.partitions for row in partition.scheduled_links(now)]
+
+    def short_paths(self, since=None):
+        # One marker per partition; a deletion in any of them reloads all
+        results = [partition.short_paths(marker)
+                   for partition, marker in zip(self.partitions, since or [None] * len(self.partitions))]
+        complete = since is None or any(complete for _, _, complete in results)
+        if complete and since is not None:
+            results = [partition.short_paths() for partition in self.partitions]
+        return ([short_path for paths, _, _ in results for short_path in paths],
+                [marker for _, marker, _ in results], complete)
+
+    def link_counts(self, user_ids):
+        counts = Counter()
+        for partition in self.partitions:
+            counts.update(partition.link_counts(user_ids))
+        return dict(counts)
+
+    def links_for_url(self, url):
+        return self._merged(partition.links_for_url(url) for partition in self.partitions)
+
+    def duplicate_targets(self):
+        # Links sharing a target can sit in different partitions, so count
+        # hashes across all of them before fetching the shared ones
+        counts = Counter()
+        for partition in self.partitions:
+            counts.update(dict(partition.session.execute(
+                select(GoLink.url_hash, func.count()).where(GoLink.url_hash.is_not(None))
+                .group_by(GoLink.url_hash)).all()))
+        shared = [value for value, count in counts.items() if count > 1]
+        rows = []
+        for partition in self.partitions:
+            # Chunked to stay under SQLite's limit on bound parameters
+            for start in range(0, len(shared), 500):
+                rows += partition.session.execute(
+                    select(GoLink.canonical_url, GoLink.short_path)
+                    .where(GoLink.url_hash.in_(shared[start:start + 500]))).all()
+        return _group_duplicates(sorted(rows))
+
+    def links_for_host(self, host):
+        return self._merged(partition.links_for_host(host) for partition in self.partitions)
+
+    def links_with_prefix(self, prefix):
+        return self._merged(partition.links_with_prefix(prefix) for partition in self.partitions)
+
+    def rewrite_host(self, old_host, new_host):
+        return sum(partition.rewrite_host(old_host, new_host) for partition in self.partitions)
+
+    def rewrite_prefix(self, old_prefix, new_prefix):
+        return sum(partition.rewrite_prefix(old_prefix, new_prefix) for partition in self.partitions)
+
+
+def rebalance_partitions(source_paths, target_paths, batch_size=1000):
+    """
+    Copy every link in the ``source_paths`` files into new partition files
+    at ``target_paths``, each link placed by ``partition_index``.
+
+    Sources can be an existing partitioning or the main database (moving
+    from LINK_STORE = 'sql'); they are only read. Targets are built under
+    temporary names and renamed into place once everything is copied, so an
+    interrupted run leaves no partial partitions. Links written to the
+    sources meanwhile are not copied, so stop writes first. Returns the
+    number of links copied.
+    """
+    table = GoLink.__table__
+    columns = [column for column in table.columns if column.name != 'id']
+    tmp_paths = [f'{path}.tmp-{os.getpid()}' for path in target_paths]
+    engines = []
+    copied = 0
+    try:
+        for tmp_path in tmp_paths:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            engine = create_engine(f'sqlite:///{tmp_path}')
+            create_partition_tables(engine)
+            engines.append(engine)
+        targets = [engine.connect() for engine in engines]
+        for source_path in source_paths:
+            source = create_engine(f'sqlite:///{source_path}')
+            with source.connect() as conn:
+                result = conn.execution_options(yield_per=batch_size).execute(select(*columns))
+                for rows in result.partitions():
+                    batches = defaultdict(list)
+                    for row in rows:
+                        batches[partition_index(row.short_path, len(targets))].append(row._asdict())
+                    for index, batch in batches.items():
+                        targets[index].execute(insert(table), batch)
+                    copied += len(rows)
+            source.dispose()
+        for conn in targets:
+            conn.commit()
+            conn.close()
+    except BaseException:
+        for engine in engines:
+            engine.dispose()
+        for tmp_path in tmp_paths:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        raise
+    for engine in engines:
+        engine.dispose()
+    for tmp_path, path in zip(tmp_paths, target_paths):
+        os.replace(tmp_path, path)
+    return copied
+
+
+def export_snapshot(store, path):
+    """
+    Write every link in ``store`` to a snapshot file at ``path``.
+
+    The file is built next to its destination and renamed into place, so
+    readers see either the old snapshot or the new one, never a partial file.
+    Returns the number of links written.
+    """
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    if os.path.exists(tmp_path):
+        os.unlink(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute('PRAGMA journal_mode=OFF')
+        conn.execute('CREATE TABLE links (short_path TEXT PRIMARY KEY, target_url TEXT NOT NULL) WITHOUT ROWID')
+        with conn:
+            conn.executemany('INSERT INTO links VALUES (?, ?)',
+                             ((row[0], row[1]) for row in store.iter_links()))
+        count = conn.execute('SELECT count(*) FROM links').fetchone()[0]
+    except BaseException:
+        conn.close()
+        os.unlink(tmp_path)
+        raise
+    conn.close()
+    with open(tmp_path, 'rb') as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return count
+
+
+def create_store(app):
+    backend = app.config['LINK_STORE']
+    primary = SQLAlchemyLinkStore()
+    if backend == 'sql':
+        return primary
+    if backend == 'snapshot':
+        path = os.path.join(app.instance_path, app.config['LINK_SNAPSHOT_PATH'])
+        return SnapshotLinkStore(path, primary, app.config['LINK_CACHE_CHECK_INTERVAL'])
+    if backend == 'linktable':
+        path = os.path.join(app.instance_path, app.config['LINK_TABLE_PATH'])
+        return LinkTableStore(path, primary, app.config['LINK_CACHE_CHECK_INTERVAL'])
+    if backend == 'partitioned':
+        directory = os.path.join(app.instance_path, app.config['LINK_PARTITION_DIR'])
+        os.makedirs(directory, exist_ok=True)
+        return PartitionedLinkStore(partition_paths(directory, app.config['LINK_PARTITIONS']), database_path(app))
+    raise ValueError(f'Unknown LINK_STORE {backend!r}')
+
+
+def init_storage(app):
+    app.extensions['link_store'] = store = create_store(app)
+    if isinstance(store, PartitionedLinkStore):
+        app.teardown_appcontext(store.remove_sessions)
+    init_group_commit(app, store)
+
+
+def get_store():
+    return current_app.extensions['link_store']
+
+
+def add_link(short_path, target_url, user_id, not_before=None, expires_at=None):
+    """Create a link, through the group-commit writer if it is enabled."""
+    writer = current_app.extensions.get('group_commit')
+    if writer is not None:
+        return writer.submit(short_path, target_url, user_id, not_before, expires_at)
+    return get_store().create(short_path, target_url, user_id, not_before, expires_at)
@@ -0,0 +1,186 @@
+"""
+Address-bar suggestions for go-links.
+
+``/opensearch.xml`` describes the site to browsers, so it can be added as a
+search engine (a keyword such as ``go``) whose suggestions come from
+``/api/suggest?q=PREFIX``. That is requested on every keystroke, so it
+never touches SQLite: each worker keeps a ``SuggestionIndex``, a sorted
+list of every short path in which the links starting with a prefix are
+found by bisection, ranked by their redirect counts over the last
+SUGGEST_RANK_DAYS days (aggregated from the access log; without one,
+suggestions come in short_path order).
+
+A background thread per worker keeps the index current. When the store's
+generation moves it asks the store for the short paths added since its
+last look (a primary key range) and merges them in; only a deletion makes
+it reload every short path. Redirect counts are reloaded every
+SUGGEST_RANK_INTERVAL seconds. Requests never wait for the thread: new
+links are inserted in place, and anything rebuilt is swapped in whole.
+
+Links outside their schedule (see schedule.py) are left out, as they
+don't redirect.
+"""
+
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from itertools import islice
+
+from access_log import hit_counts
+from extensions import link_cache
+from storage import get_store
+from utils import prefix_upper_bound
+
+log = logging.getLogger(__name__)
+
+# Only this many of the most-used links are ranked; the rest tie at zero
+RANKED_LINKS = 10000
+
+
+class SuggestionIndex:
+    """Every short path in sorted order, with redirect counts for ranking."""
+
+    # Up to this many ranked links matching a prefix are sorted by hits;
+    # with more, walking the ranked links from the most used down finds
+    # enough matches sooner.
+    SCAN_LIMIT = 256
+
+    def __init__(self, app=None, limit=10, check_interval=1.0, rank_days=30, rank_interval=300.0):
+        self.app = app
+        self.limit = limit
+        self.check_interval = check_interval
+        self.rank_days = rank_days
+        self.rank_interval = rank_interval
+        self._paths = []
+        # Redirect counts of the RANKED_LINKS most used paths, and those
+        # paths both in short_path order and most used first
+        self._hits = {}
+        self._ranked = []
+        self._by_hits = []
+        self._lock = threading.Lock()
+        self._generation = None
+        self._marker = None
+        self._ranked_at = None
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+
+    def __len__(self):
+        return len(self._paths)
+
+    def replace(self, short_paths):
+        """Make ``short_paths`` the whole index."""
+        self._paths = sorted(short_paths)
+
+    def add(self, short_paths):
+        """Merge newly created ``short_paths`` into the index."""
+        short_paths = list(short_paths)
+        if len(short_paths) > 64:
+            self._paths = sorted(set(self._paths).union(short_paths))
+            return
+        # In place: each insert is one memmove, where copying a large list
+        # would hold the GIL many times longer. Readers may see a slice
+        # shifted by an insert, so they check the prefix of what they take.
+        paths = self._paths
+        for short_path in short_paths:
+            position = bisect_left(paths, short_path)
+            if position == len(paths) or paths[position] != short_path:
+                paths.insert(position, short_path)
+
+    def rank(self, counts):
+        """Rank by (short_path, hits) pairs, most used first."""
+        counts = list(counts)
+        self._hits = dict(counts)
+        self._ranked = sorted(self._hits)
+        self._by_hits = [short_path for short_path, _ in counts]
+
+    def _exists(self, paths, short_path):
+        position = bisect_left(paths, short_path)
+        return position < len(paths) and paths[position] == short_path
+
+    def suggest(self, prefix, limit=None):
+        """Return up to ``limit`` live short paths starting with ``prefix``, most used first."""
+        if self.app is not None and self._pid != os.getpid():
+            self.start()
+        limit = limit or self.limit
+        paths, hits, ranked = self._paths, self._hits, self._ranked
+        held = link_cache.held
+        # Everything from prefix up to (but excluding) its upper bound
+        upper = prefix_upper_bound(prefix)
+        # The most used matches come from the ranked links, which may
+        # include deleted ones; the rest follow in short_path order
+        ranked_start = bisect_left(ranked, prefix)
+        ranked_end = bisect_left(ranked, upper, ranked_start) if upper else len(ranked)
+        if ranked_end - ranked_start <= self.SCAN_LIMIT:
+            # A stable sort keeps ties in short_path order
+            candidates = sorted(ranked[ranked_start:ranked_end], key=lambda short_path: -hits.get(short_path, 0))
+        else:
+            candidates = (short_path for short_path in self._by_hits if short_path.startswith(prefix))
+        result = list(islice((short_path for short_path in candidates
+                              if short_path not in held and self._exists(paths, short_path)), limit))
+        if len(result) < limit:
+            chosen = set(result)
+            # Indexing rather than slicing, which would copy every match of a
+            # short prefix; the list only grows in place, so end stays valid
+            start = bisect_left(paths, prefix)
+            end = bisect_left(paths, upper, start) if upper else len(paths)
+            result += islice((short_path for short_path in (paths[i] for i in range(start, end))
+                              if short_path.startswith(prefix) and short_path not in chosen
+                              and short_path not in held), limit - len(result))
+        return result
+
+    def refresh(self):
+        """Catch up with link writes and, when due, reload redirect counts. Needs an app context."""
+        with self._lock:
+            store = get_store()
+            # Read before the short paths, so a write in between is seen next time
+            generation = store.list_generation()
+            if generation != self._generation:
+                short_paths, self._marker, complete = store.short_paths(self._marker)
+                if complete:
+                    self.replace(short_paths)
+                elif short_paths:
+                    self.add(short_paths)
+                self._generation = generation
+            now = time.monotonic()
+            if self._ranked_at is None or now - self._ranked_at >= self.rank_interval:
+                self.rank(hit_counts(self.rank_days, RANKED_LINKS))
+                self._ranked_at = now
+
+    def start(self):
+        """Load the index if needed and start this process's refresh thread."""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Started lazily so the thread runs in the worker process, not in
+            # a gunicorn master that forks afterwards
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='suggestions', daemon=True)
+        if self._generation is None:
+            self.refresh()
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None and self._thread.is_alive():
+            self._stop.set()
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.check_interval):
+            try:
+                with self.app.app_context():
+                    self.refresh()
+            except Exception:
+                log.exception('Refreshing link suggestions failed')
+
+
+def init_suggestions(app):
+    app.extensions['suggestions'] = SuggestionIndex(
+        app,
+        limit=app.config['SUGGEST_LIMIT'],
+        check_interval=app.config['LINK_CACHE_CHECK_INTERVAL'],
+        rank_days=app.config['SUGGEST_RANK_DAYS'],
+        rank_interval=app.config['SUGGEST_RANK_INTERVAL'])
@@ -1,41 +1,76 @@
-import unittest
+import atexit
+import shutil
 import tempfile
+import unittest
 import os
 import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app import app, db, User
+from app import create_app
+from extensions import db
+from models import User
 from werkzeug.security import generate_password_hash
 
+# Hashing test passwords at full cost dominates the suite's runtime
+TEST_PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1'
+
+_test_dir = None
+_template_db = None
+
+
+def template_database():
+    """
+    Return the path of a database with the schema already created.
+
+    It is built once per process and copied for every test, which is cheaper
+    than running create_all()/drop_all() each time. Each process (including
+    each worker of ``run_tests.py --parallel``) gets its own directory, so
+    test databases never collide.
+    """
+    global _test_dir, _template_db
+    if _template_db is None:
+        _test_dir = tempfile.mkdtemp(prefix='golinks-tests-')
+        atexit.register(shutil.rmtree, _test_dir, ignore_errors=True)
+        _template_db = os.path.join(_test_dir, 'template.db')
+        app = create_app(dict(BaseTestCase.app_config, SQLALCHEMY_DATABASE_URI=f'sqlite:///{_template_db}'))
+        with app.app_context():
+            db.create_all()
+            db.engine.dispose()
+    return _template_db
+
 
 class BaseTestCase(unittest.TestCase):
     """Base test case with common setup and helper methods."""
     
+    # Settings applied on top of the defaults; subclasses may extend this
+    app_config = {
+        'TESTING': True,
+        'SECRET_KEY': 'test-secret-key',
+        'WTF_CSRF_ENABLED': False,
+        'PASSWORD_HASH_METHOD': TEST_PASSWORD_HASH_METHOD,
+    }
+    
     def setUp(self):
         """Set up test fixtures before each test method."""
-        self.db_fd, app.config['DATABASE'] = tempfile.mkstemp()
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-        app.config['TESTING'] = True
-        app.config['WTF_CSRF_ENABLED'] = False
-        self.app = app.test_client()
-        
-        with app.app_context():
-            db.create_all()
+        template = template_database()
+        self.db_path = os.path.join(os.path.dirname(template), 'test.db')
+        shutil.copyfile(template, self.db_path)
+        self.flask_app = create_app(dict(self.app_config, SQLALCHEMY_DATABASE_URI=f'sqlite:///{self.db_path}'))
+        self.app = self.flask_app.test_client()
     
     def tearDown(self):
         """Clean up after each test method."""
-        with app.app_context():
+        with self.flask_app.app_context():
             db.session.remove()
-            db.drop_all()
-        os.close(self.db_fd)
-        os.unlink(app.config['DATABASE'])
+            db.engine.dispose()
+        os.unlink(self.db_path)
     
     def create_user(self, username="testuser", password="testpass", is_admin=False):
         """Helper method to create a user."""
-        with app.app_context():
+        with self.flask_app.app_context():
             user = User(
                 username=username,
-                password_hash=generate_password_hash(password),
+                password_hash=generate_password_hash(password, method=TEST_PASSWORD_HASH_METHOD),
                 is_admin=is_admin
             )
             db.session.add(user)
@@ -53,4 +88,4 @@ class BaseTestCase(unittest.TestCase):
     
     def logout(self):
         """Helper method to log out."""
-        return self.app.get('/logout', follow_redirects=True)
\ No newline at end of file
+        return self.app.get('/logout', follow_redirects=True)
@@ -0,0 +1,174 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from tests.base import BaseTestCase
+from access_log import (AccessLogWriter, aggregate_access_logs, rotate_orphaned_files, rotated_files, top_links,
+                        unused_links)
+from extensions import db
+from models import GoLink, LinkDailyHits
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestAccessLogWriter(unittest.TestCase):
+    """Test buffering, writing and rotating the access log."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def read_all(self):
+        lines = []
+        for name in sorted(os.listdir(self.tmpdir)):
+            with open(os.path.join(self.tmpdir, name)) as f:
+                lines += [json.loads(line) for line in f]
+        return lines
+
+    def test_records_are_written_by_the_background_thread(self):
+        """Test that recorded redirects reach the file after a flush interval."""
+        writer = AccessLogWriter(self.tmpdir, flush_interval=0.01)
+        writer.record('docs')
+        writer.record('café')
+        deadline = time.monotonic() + 2
+        while len(self.read_all()) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        writer.stop()
+        self.assertEqual([r['p'] for r in self.read_all()], ['docs', 'café'])
+        self.assertEqual(rotated_files(self.tmpdir), [])
+
+    def test_size_based_rotation(self):
+        """Test that the file is rotated once it reaches max_bytes."""
+        writer = AccessLogWriter(self.tmpdir, max_bytes=100, flush_interval=60)
+        for batch in range(3):
+            for i in range(5):
+                writer.record(f'link{batch}-{i}')
+            writer.flush()
+        writer.stop(rotate=True)
+        self.assertEqual(len(rotated_files(self.tmpdir)), 3)
+        self.assertEqual(len(self.read_all()), 15)
+
+    def test_age_based_rotation(self):
+        """Test that a quiet file is still rotated after max_age."""
+        writer = AccessLogWriter(self.tmpdir, max_age=0, flush_interval=60)
+        writer.record('docs')
+        writer.flush()
+        writer.stop()
+        self.assertEqual(len(rotated_files(self.tmpdir)), 1)
+
+
+class TestAccessLogAggregation(BaseTestCase):
+    """Test aggregating logs and the usage reports."""
+
+    app_config = dict(BaseTestCase.app_config, ACCESS_LOG_FLUSH_INTERVAL=60)
+
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp()
+        self.app_config = dict(self.app_config, ACCESS_LOG_DIR=self.log_dir)
+        super().setUp()
+        self.user = self.create_user(is_admin=True)
+        with self.flask_app.app_context():
+            for short_path in ('docs', 'wiki', 'old'):
+                db.session.add(GoLink(short_path=short_path, target_url='https://example.com', user_id=self.user.id))
+            db.session.commit()
+
+    def tearDown(self):
+        self.flask_app.extensions['access_log'].stop()
+        super().tearDown()
+        shutil.rmtree(self.log_dir)
+
+    def write_log(self, name, records):
+        with open(os.path.join(self.log_dir, name), 'w') as f:
+            for timestamp, short_path in records:
+                f.write(json.dumps({'t': timestamp, 'p': short_path}) + '\n')
+            f.write('{"truncated\n')
+
+    def test_redirects_are_logged(self):
+        """Test that resolved redirects are recorded, and unknown paths are not."""
+        self.app.get('/docs')
+        self.app.get('/docs')
+        self.app.get('/missing')
+        writer = self.flask_app.extensions['access_log']
+        writer.stop(rotate=True)
+        with self.flask_app.app_context():
+            self.assertEqual(aggregate_access_logs(self.log_dir), (1, 2))
+            self.assertEqual(top_links(), [('docs', 2)])
+        self.assertEqual(os.listdir(self.log_dir), [])
+
+    def test_aggregation_by_link_and_day(self):
+        """Test that records are counted per link and UTC day across files and flushes."""
+        today = datetime.now(timezone.utc).replace(hour=12)
+        yesterday = today - timedelta(days=1)
+        self.write_log('access.1.a-1.jsonl', [(today.timestamp(), 'docs')] * 3 + [(yesterday.timestamp(), 'docs')])
+        self.write_log('access.2.a-1.jsonl', [(today.timestamp(), 'wiki'), (today.timestamp(), 'docs')])
+        # Still being written by a running worker
+        self.write_log(f'access.{os.getpid()}.jsonl', [(today.timestamp(), 'old')])
+        with self.flask_app.app_context():
+            self.assertEqual(aggregate_access_logs(self.log_dir, max_keys=1), (2, 6))
+            hits = {(row.short_path, row.day): row.hits for row in LinkDailyHits.query}
+            self.assertEqual(hits, {('docs', today.date()): 4, ('docs', yesterday.date()): 1,
+                                    ('wiki', today.date()): 1})
+        self.assertEqual(os.listdir(self.log_dir), [f'access.{os.getpid()}.jsonl'])
+    
+    def test_kept_files_are_counted_once(self):
+        """Test that files kept after aggregation are set aside rather than read again."""
+        today = datetime.now(timezone.utc).replace(hour=12)
+        self.write_log('access.1.a-1.jsonl', [(today.timestamp(), 'docs')] * 2)
+        with self.flask_app.app_context():
+            self.assertEqual(aggregate_access_logs(self.log_dir, keep=True), (1, 2))
+            self.assertEqual(aggregate_access_logs(self.log_dir, keep=True), (0, 0))
+            self.assertEqual(top_links(), [('docs', 2)])
+        self.assertEqual(os.listdir(self.log_dir), ['access.1.a-1.jsonl.done'])
+    
+    def test_files_of_exited_workers_are_aggregated(self):
+        """Test that an active file whose worker is gone is rotated and aggregated."""
+        exited = subprocess.Popen([sys.executable, '-c', ''])
+        exited.wait()
+        today = datetime.now(timezone.utc).replace(hour=12)
+        self.write_log(f'access.{exited.pid}.jsonl', [(today.timestamp(), 'wiki')] * 2)
+        self.assertEqual(rotate_orphaned_files(self.log_dir), 1)
+        self.assertEqual(len(rotated_files(self.log_dir)), 1)
+        with self.flask_app.app_context():
+            self.assertEqual(aggregate_access_logs(self.log_dir), (1, 2))
+            self.assertEqual(top_links(), [('wiki', 2)])
+        self.assertEqual(os.listdir(self.log_dir), [])
+    
+    def test_exit_rotates_the_active_file(self):
+        """Test that a worker's last records are flushed and rotated when it exits."""
+        script = ('import sys; sys.path.insert(0, sys.argv[1]); from access_log import AccessLogWriter; '
+                  'AccessLogWriter(sys.argv[2], flush_interval=60).record("docs")')
+        subprocess.run([sys.executable, '-c', script, ROOT, self.log_dir], check=True)
+        self.assertEqual(len(rotated_files(self.log_dir)), 1)
+        with self.flask_app.app_context():
+            self.assertEqual(aggregate_access_logs(self.log_dir), (1, 1))
+
+    def test_reports(self):
+        """Test the top and unused link reports and the stats page."""
+        with self.flask_app.app_context():
+            today = datetime.now(timezone.utc).date()
+            db.session.add_all([
+                LinkDailyHits(short_path='docs', day=today, hits=5),
+                LinkDailyHits(short_path='wiki', day=today, hits=9),
+                LinkDailyHits(short_path='old', day=today - timedelta(days=60), hits=100),
+                LinkDailyHits(short_path='deleted', day=today, hits=50),
+            ])
+            db.session.commit()
+            self.assertEqual(top_links(30), [('wiki', 9), ('docs', 5)])
+            self.assertEqual([l.short_path for l in unused_links(30)], ['old'])
+            self.assertEqual(unused_links(90), [])
+        self.login()
+        rv = self.app.get('/stats?days=30')
+        self.assertEqual(rv.status_code, 200)
+        self.assertIn(b'Top Links', rv.data)
+        self.assertIn(b'Unused Links', rv.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
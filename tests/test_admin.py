@@ -1,6 +1,7 @@
 import unittest
 from tests.base import BaseTestCase
-from app import app, db, User, GoLink
+from extensions import db
+from models import User, GoLink
 
 
 class TestAdminFunctionality(BaseTestCase):
@@ -36,7 +37,7 @@ class TestAdminFunctionality(BaseTestCase):
         self.assertEqual(rv.status_code, 200)
         self.assertIn(b'User created successfully', rv.data)
         
-        with app.app_context():
+        with self.flask_app.app_context():
             new_user = User.query.filter_by(username='newuser').first()
             self.assertIsNotNone(new_user)
             self.assertFalse(new_user.is_admin)
@@ -54,7 +55,7 @@ class TestAdminFunctionality(BaseTestCase):
         self.assertEqual(rv.status_code, 200)
         self.assertIn(b'User created successfully', rv.data)
         
-        with app.app_context():
+        with self.flask_app.app_context():
             new_admin = User.query.filter_by(username='newadmin').first()
             self.assertIsNotNone(new_admin)
             self.assertTrue(new_admin.is_admin)
@@ -88,7 +89,7 @@ class TestAdminFunctionality(BaseTestCase):
         admin = self.create_user("admin", is_admin=True)
         owner = self.create_user("owner")
         
-        with app.app_context():
+        with self.flask_app.app_context():
             link = GoLink(short_path='test', target_url='https://example.com', user_id=owner.id)
             db.session.add(link)
             db.session.commit()
@@ -100,7 +101,7 @@ class TestAdminFunctionality(BaseTestCase):
         self.assertEqual(rv.status_code, 200)
         self.assertIn(b'Link updated successfully', rv.data)
         
-        with app.app_context():
+        with self.flask_app.app_context():
             updated_link = GoLink.query.filter_by(short_path='test').first()
             self.assertEqual(updated_link.target_url, 'https://admin-updated.com')
     
@@ -109,7 +110,7 @@ class TestAdminFunctionality(BaseTestCase):
         admin = self.create_user("admin", is_admin=True)
         owner = self.create_user("owner")
         
-        with app.app_context():
+        with self.flask_app.app_context():
             link = GoLink(short_path='test', target_url='https://example.com', user_id=owner.id)
             db.session.add(link)
             db.session.commit()
@@ -119,7 +120,7 @@ class TestAdminFunctionality(BaseTestCase):
         self.assertEqual(rv.status_code, 200)
         self.assertIn(b'Link deleted successfully', rv.data)
         
-        with app.app_context():
+        with self.flask_app.app_context():
             deleted_link = GoLink.query.filter_by(short_path='test').first()
             self.assertIsNone(deleted_link)
     
@@ -133,7 +134,7 @@ class TestAdminFunctionality(BaseTestCase):
         self.assertEqual(rv.status_code, 200)
         self.assertIn(b'promoted to admin', rv.data)
         
-        with app.app_context():
+        with self.flask_app.app_context():
             updated_user = User.query.get(regular_user.id)
             self.assertTrue(updated_user.is_admin)
         
@@ -142,7 +143,7 @@ class TestAdminFunctionality(BaseTestCase):
         self.assertEqual(rv.status_code, 200)
         self.assertIn(b'demoted from admin', rv.data)
         
-        with app.app_context():
+        with self.flask_app.app_context():
             updated_user = User.query.get(regular_user.id)
             self.assertFalse(updated_user.is_admin)
     
@@ -156,7 +157,7 @@ class TestAdminFunctionality(BaseTestCase):
         self.assertEqual(rv.status_code, 200)
         self.assertIn(b'User deleted successfully', rv.data)
         
-        with app.app_context():
+        with self.flask_app.app_context():
             deleted_user = User.query.get(target_user.id)
             self.assertIsNone(deleted_user)
     
@@ -169,7 +170,7 @@ class TestAdminFunctionality(BaseTestCase):
         self.assertEqual(rv.status_code, 200)
         self.assertIn(b'You cannot delete your own account', rv.data)
         
-        with app.app_context():
+        with self.flask_app.app_context():
             existing_admin = User.query.get(admin.id)
             self.assertIsNotNone(existing_admin)
     
@@ -182,7 +183,7 @@ class TestAdminFunctionality(BaseTestCase):
         self.assertEqual(rv.status_code, 200)
         self.assertIn(b'You cannot modify your own admin status', rv.data)
         
-        with app.app_context():
+        with self.flask_app.app_context():
             unchanged_admin = User.query.get(admin.id)
             self.assertTrue(unchanged_admin.is_admin)
     
@@ -210,7 +211,7 @@ class TestAdminFunctionality(BaseTestCase):
         admin = self.create_user("admin", is_admin=True)
         
         # Create more than 10 users to test pagination
-        with app.app_context():
+        with self.flask_app.app_context():
             for i in range(15):
                 user = User(
                     username=f'user{i}',
@@ -227,5 +228,62 @@ class TestAdminFunctionality(BaseTestCase):
         self.assertIn(b'Next', rv.data)
 
 
+
+class TestTargetLookups(BaseTestCase):
+    """Test the admin reverse-index page and API."""
+    
+    def setUp(self):
+        super().setUp()
+        admin = self.create_user(is_admin=True)
+        with self.flask_app.app_context():
+            db.session.add(GoLink(short_path='wiki', target_url='https://wiki.old.com/', user_id=admin.id))
+            db.session.add(GoLink(short_path='page', target_url='https://wiki.old.com/page', user_id=admin.id))
+            db.session.add(GoLink(short_path='other', target_url='https://example.com/', user_id=admin.id))
+            db.session.commit()
+        self.login()
+    
+    def test_targets_page_lists_links_on_host(self):
+        """Test that the targets page finds links by host."""
+        rv = self.app.get('/targets?kind=host&value=wiki.old.com')
+        self.assertEqual(rv.status_code, 200)
+        self.assertIn(b'2 links point at wiki.old.com', rv.data)
+        self.assertNotIn(b'https://example.com/', rv.data)
+    
+    def test_targets_page_rewrites(self):
+        """Test that the rewrite form moves all matching links."""
+        rv = self.app.post('/targets/rewrite', data={
+            'kind': 'prefix', 'value': 'https://wiki.old.com/', 'new_value': 'https://wiki.new.com/'
+        }, follow_redirects=True)
+        self.assertIn(b'Rewrote 2 links', rv.data)
+        with self.flask_app.app_context():
+            self.assertEqual(db.session.get(GoLink, 2).target_url, 'https://wiki.new.com/page')
+    
+    def test_api_lookup_and_rewrite(self):
+        """Test the JSON API for lookups and bulk rewrites."""
+        rv = self.app.get('/api/targets?prefix=https://wiki.old.com/page')
+        self.assertEqual(rv.get_json(), {'links': [
+            {'short_path': 'page', 'target_url': 'https://wiki.old.com/page', 'owner': 'testuser',
+             'not_before': None, 'expires_at': None}]})
+        rv = self.app.post('/api/targets/rewrite', json={'host': 'wiki.old.com', 'to': 'wiki.new.com'})
+        self.assertEqual(rv.get_json(), {'rewritten': 2})
+        rv = self.app.get('/api/targets?host=wiki.new.com')
+        self.assertEqual([l['short_path'] for l in rv.get_json()['links']], ['page', 'wiki'])
+    
+    def test_api_rejects_bad_requests(self):
+        """Test that the API reports missing or invalid arguments."""
+        self.assertEqual(self.app.get('/api/targets').status_code, 400)
+        self.assertEqual(self.app.get('/api/targets?host=a/b').status_code, 400)
+        self.assertEqual(self.app.post('/api/targets/rewrite', json={'host': 'a.com'}).status_code, 400)
+    
+    def test_api_requires_admin(self):
+        """Test that non-admins get 403 from the API."""
+        self.logout()
+        self.create_user('bob')
+        self.login('bob')
+        self.assertEqual(self.app.get('/api/targets?host=wiki.old.com').status_code, 403)
+        rv = self.app.post('/api/targets/rewrite', json={'host': 'wiki.old.com', 'to': 'x.com'})
+        self.assertEqual(rv.status_code, 403)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,6 +1,6 @@
 import unittest
 from tests.base import BaseTestCase
-from app import app, User
+from models import User
 
 
 class TestAuthentication(BaseTestCase):
@@ -26,7 +26,7 @@ class TestAuthentication(BaseTestCase):
         }, follow_redirects=True)
         self.assertEqual(rv.status_code, 200)
         
-        with app.app_context():
+        with self.flask_app.app_context():
             user = User.query.filter_by(username='firstuser').first()
             self.assertIsNotNone(user)
             self.assertTrue(user.is_admin)
@@ -41,7 +41,7 @@ class TestAuthentication(BaseTestCase):
         }, follow_redirects=True)
         self.assertEqual(rv.status_code, 200)
         
-        with app.app_context():
+        with self.flask_app.app_context():
             user = User.query.filter_by(username='seconduser').first()
             self.assertIsNotNone(user)
             self.assertFalse(user.is_admin)
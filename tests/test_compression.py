@@ -0,0 +1,76 @@
+import gzip
+import re
+import unittest
+from tests.base import BaseTestCase
+from extensions import db
+from models import GoLink
+
+
+class TestResponseCompression(BaseTestCase):
+    """Test gzip compression of HTML responses."""
+    
+    def test_large_html_is_gzipped(self):
+        """Test that HTML above the size threshold is gzip-encoded."""
+        rv = self.app.get('/login', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(rv.headers.get('Content-Encoding'), 'gzip')
+        self.assertIn('Accept-Encoding', rv.headers.get('Vary'))
+        self.assertIn(b'Login', gzip.decompress(rv.data))
+    
+    def test_not_compressed_without_accept_encoding(self):
+        """Test that clients that don't ask for gzip get identity bodies."""
+        rv = self.app.get('/login')
+        self.assertNotIn('Content-Encoding', rv.headers)
+        self.assertIn(b'Login', rv.data)
+    
+    def test_small_responses_not_compressed(self):
+        """Test that bodies below COMPRESS_MIN_SIZE are left alone."""
+        original = self.flask_app.config['COMPRESS_MIN_SIZE']
+        self.flask_app.config['COMPRESS_MIN_SIZE'] = 10 ** 6
+        try:
+            rv = self.app.get('/login', headers={'Accept-Encoding': 'gzip'})
+        finally:
+            self.flask_app.config['COMPRESS_MIN_SIZE'] = original
+        self.assertNotIn('Content-Encoding', rv.headers)
+    
+    def test_redirects_not_compressed(self):
+        """Test that redirect responses are passed through unchanged."""
+        user = self.create_user()
+        with self.flask_app.app_context():
+            db.session.add(GoLink(short_path='test', target_url='https://example.com', user_id=user.id))
+            db.session.commit()
+        rv = self.app.get('/test', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(rv.status_code, 302)
+        self.assertEqual(rv.location, 'https://example.com')
+
+
+class TestStaticAssets(BaseTestCase):
+    """Test content-hashed static asset URLs."""
+    
+    def stylesheet_url(self):
+        rv = self.app.get('/login')
+        match = re.search(rb'href="(/static/css/base\.css\?v=[0-9a-f]+)"', rv.data)
+        self.assertIsNotNone(match)
+        return match.group(1).decode()
+    
+    def test_pages_link_fingerprinted_stylesheet(self):
+        """Test that pages reference static files with a content digest."""
+        self.stylesheet_url()
+    
+    def test_fingerprinted_asset_is_cached_forever(self):
+        """Test that hashed asset URLs get far-future immutable caching."""
+        rv = self.app.get(self.stylesheet_url())
+        self.assertEqual(rv.status_code, 200)
+        self.assertTrue(rv.cache_control.immutable)
+        self.assertEqual(rv.cache_control.max_age, 365 * 24 * 60 * 60)
+        rv.close()
+    
+    def test_unversioned_asset_is_not_cached_forever(self):
+        """Test that plain static URLs keep the default caching."""
+        rv = self.app.get('/static/css/base.css')
+        self.assertEqual(rv.status_code, 200)
+        self.assertFalse(rv.cache_control.immutable)
+        rv.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import threading
+import unittest
+from tests.base import BaseTestCase
+from extensions import db
+from models import GoLink
+
+
+class TestGroupCommit(BaseTestCase):
+    """Test batching of concurrent link creations."""
+    
+    app_config = dict(BaseTestCase.app_config,
+                      GROUP_COMMIT_ENABLED=True,
+                      GROUP_COMMIT_MAX_WAIT=0.05)
+    
+    def setUp(self):
+        super().setUp()
+        self.writer = self.flask_app.extensions['group_commit']
+        self.user = self.create_user()
+    
+    def tearDown(self):
+        self.writer.stop()
+        super().tearDown()
+    
+    def submit_concurrently(self, entries):
+        results = [None] * len(entries)
+        barrier = threading.Barrier(len(entries))
+        
+        def worker(i, entry):
+            barrier.wait()
+            results[i] = self.writer.submit(*entry)
+        
+        threads = [threading.Thread(target=worker, args=(i, entry)) for i, entry in enumerate(entries)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+    
+    def test_concurrent_creations_share_commits(self):
+        """Test that simultaneous creations are committed in fewer transactions."""
+        entries = [(f'link{i}', f'https://example.com/{i}', self.user.id) for i in range(20)]
+        results = self.submit_concurrently(entries)
+        self.assertEqual(results, [True] * 20)
+        self.assertLess(self.writer.batches, 20)
+        with self.flask_app.app_context():
+            self.assertEqual(GoLink.query.count(), 20)
+    
+    def test_each_request_gets_its_own_result(self):
+        """Test that exactly one of several claims on the same path succeeds."""
+        with self.flask_app.app_context():
+            db.session.add(GoLink(short_path='taken', target_url='https://example.com', user_id=self.user.id))
+            db.session.commit()
+        entries = [('taken', 'https://a.example.com', self.user.id)]
+        entries += [('contested', f'https://example.com/{i}', self.user.id) for i in range(5)]
+        results = self.submit_concurrently(entries)
+        self.assertFalse(results[0])
+        self.assertEqual(results[1:].count(True), 1)
+        with self.flask_app.app_context():
+            self.assertEqual(GoLink.query.filter_by(short_path='contested').count(), 1)
+    
+    def test_create_view_uses_writer(self):
+        """Test that the create page goes through the writer and reports duplicates."""
+        self.login()
+        rv = self.app.post('/create', data={'short_path': 'new', 'target_url': 'https://example.com'},
+                           follow_redirects=True)
+        self.assertIn(b'Link created successfully', rv.data)
+        rv = self.app.post('/create', data={'short_path': 'new', 'target_url': 'https://example.com'})
+        self.assertIn(b'This short path is already taken', rv.data)
+        self.assertEqual(self.writer.batches, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
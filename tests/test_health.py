@@ -0,0 +1,242 @@
+import asyncio
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from tests.base import BaseTestCase
+from health import check_links, check_url, run_health_checks
+from storage import get_store
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves a few fixed paths and records every request it gets."""
+
+    def do_HEAD(self):
+        self.respond()
+
+    def do_GET(self):
+        self.respond()
+
+    def respond(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.command, self.path, dict(self.headers), time.monotonic()))
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            if self.path == '/ok':
+                if self.headers.get('If-None-Match') == '"v1"':
+                    self.send_response(304)
+                else:
+                    self.send_response(200)
+                    self.send_header('ETag', '"v1"')
+            elif self.path == '/nohead' and self.command == 'HEAD':
+                self.send_response(405)
+            elif self.path == '/nohead':
+                self.send_response(200)
+            elif self.path == '/slow':
+                time.sleep(0.05)
+                self.send_response(200)
+            elif self.path == '/hang':
+                time.sleep(1)
+                self.send_response(200)
+            else:
+                self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+Link = namedtuple('Link', 'id target_url health_etag health_last_modified health_status')
+
+
+class StubServerMixin:
+    def start_stub_server(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.in_flight = self.server.max_in_flight = 0
+        threading.Thread(target=self.server.serve_forever, args=(0.01,), daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}'
+
+
+class TestCheckUrl(StubServerMixin, unittest.TestCase):
+    """Test checking single URLs against a stub server."""
+
+    def setUp(self):
+        self.start_stub_server()
+
+    def check(self, path, **kwargs):
+        return asyncio.run(check_url(self.base_url + path, **kwargs))
+
+    def test_healthy_link(self):
+        """Test that a 200 is recorded with its latency and validators."""
+        result = self.check('/ok')
+        self.assertEqual(result.status, 200)
+        self.assertIsNone(result.error)
+        self.assertEqual(result.etag, '"v1"')
+        self.assertGreaterEqual(result.latency_ms, 0)
+        self.assertEqual([r[0] for r in self.server.requests], ['HEAD'])
+
+    def test_missing_page(self):
+        """Test that a 404 is reported as the link's status."""
+        self.assertEqual(self.check('/gone').status, 404)
+
+    def test_get_fallback(self):
+        """Test that servers rejecting HEAD are retried with GET."""
+        result = self.check('/nohead')
+        self.assertEqual(result.status, 200)
+        self.assertEqual([r[0] for r in self.server.requests], ['HEAD', 'GET'])
+
+    def test_conditional_recheck(self):
+        """Test that a re-check sends the stored ETag and keeps the old status on 304."""
+        result = self.check('/ok', etag='"v1"', previous_status=200)
+        self.assertEqual(result.status, 200)
+        self.assertEqual(result.etag, '"v1"')
+        self.assertEqual(self.server.requests[0][2].get('If-None-Match'), '"v1"')
+
+    def test_connection_refused(self):
+        """Test that unreachable hosts are reported as errors, not statuses."""
+        self.server.shutdown()
+        self.server.server_close()
+        result = self.check('/ok')
+        self.assertIsNone(result.status)
+        self.assertTrue(result.error)
+
+    def test_port_out_of_range(self):
+        """Test that a port out of range or a malformed host is reported as an error."""
+        for url in ('http://example.com:99999/', 'http://[::1/'):
+            result = asyncio.run(check_url(url))
+            self.assertIsNone(result.status)
+            self.assertTrue(result.error)
+
+    def test_timeout(self):
+        """Test that a server that never answers times out."""
+        result = self.check('/hang', timeout=0.2)
+        self.assertIsNone(result.status)
+        self.assertTrue(result.error)
+
+
+class TestCheckLinks(StubServerMixin, unittest.TestCase):
+    """Test concurrency and per-host limits when checking many links."""
+
+    def setUp(self):
+        self.start_stub_server()
+
+    def links(self, path, count):
+        return [Link(i, self.base_url + path, None, None, None) for i in range(count)]
+
+    def test_concurrency_is_bounded(self):
+        """Test that no more than ``concurrency`` requests are in flight."""
+        results = asyncio.run(check_links(self.links('/slow', 12), concurrency=3, host_interval=0))
+        self.assertEqual(len(results), 12)
+        self.assertTrue(all(result.status == 200 for result in results.values()))
+        self.assertLessEqual(self.server.max_in_flight, 3)
+        self.assertGreater(self.server.max_in_flight, 1)
+
+    def test_requests_to_one_host_are_spaced_out(self):
+        """Test that requests to the same host respect the per-host interval."""
+        asyncio.run(check_links(self.links('/ok', 5), concurrency=5, host_interval=0.05))
+        starts = sorted(r[3] for r in self.server.requests)
+        gaps = [b - a for a, b in zip(starts, starts[1:])]
+        self.assertGreaterEqual(min(gaps), 0.04)
+
+    def test_bad_link_does_not_abort_the_others(self):
+        """Test that every link gets a result when one target can't be checked."""
+        links = self.links('/ok', 2) + [Link(9, 'http://example.com:99999/', None, None, None)]
+        results = asyncio.run(check_links(links, host_interval=0))
+        self.assertEqual([results[i].status for i in (0, 1)], [200, 200])
+        self.assertIn('out of range', results[9].error)
+
+    def test_waiting_for_a_host_holds_no_slot(self):
+        """Test that links queued behind one host don't delay checks of another."""
+        other = Link(99, f'http://localhost:{self.server.server_port}/ok', None, None, None)
+        asyncio.run(check_links(self.links('/ok', 4) + [other], concurrency=2, host_interval=0.3))
+        starts = {}
+        for _, _, headers, started in self.server.requests:
+            starts.setdefault(headers['Host'].partition(':')[0], []).append(started)
+        first = min(starts['127.0.0.1'])
+        self.assertLess(starts['localhost'][0] - first, 0.15)
+        gaps = [b - a for a, b in zip(starts['127.0.0.1'], starts['127.0.0.1'][1:])]
+        self.assertGreaterEqual(min(gaps), 0.25)
+
+
+class TestHealthChecks(StubServerMixin, BaseTestCase):
+    """Test storing health results and flagging broken links."""
+
+    def setUp(self):
+        super().setUp()
+        self.start_stub_server()
+        self.flask_app.config['HEALTH_CHECK_HOST_INTERVAL'] = 0
+        self.user = self.create_user()
+        with self.flask_app.app_context():
+            get_store().create_many([('good', self.base_url + '/ok', self.user.id),
+                                     ('dead', self.base_url + '/gone', self.user.id)])
+
+    def test_results_are_stored(self):
+        """Test that status, latency and validators are saved on each link."""
+        self.assertEqual(run_health_checks(self.flask_app), 1)
+        with self.flask_app.app_context():
+            good = get_store().get('good')
+            dead = get_store().get('dead')
+            self.assertEqual(good.health_status, 200)
+            self.assertEqual(good.health_etag, '"v1"')
+            self.assertIsNotNone(good.health_latency_ms)
+            self.assertIsNotNone(good.health_checked_at)
+            self.assertFalse(good.is_broken)
+            self.assertEqual(dead.health_status, 404)
+            self.assertTrue(dead.is_broken)
+
+    def test_recheck_is_conditional(self):
+        """Test that the second round sends the ETag stored by the first."""
+        run_health_checks(self.flask_app)
+        self.server.requests.clear()
+        run_health_checks(self.flask_app)
+        sent = {path: headers for _, path, headers, _ in self.server.requests}
+        self.assertEqual(sent['/ok'].get('If-None-Match'), '"v1"')
+        with self.flask_app.app_context():
+            self.assertEqual(get_store().get('good').health_status, 200)
+
+    def test_broken_links_are_flagged(self):
+        """Test that the links page marks broken links, even after it was cached."""
+        self.login()
+        response = self.app.get('/links')
+        self.assertNotIn(b'>broken<', response.data)
+        run_health_checks(self.flask_app)
+        response = self.app.get('/links')
+        self.assertEqual(response.data.count(b'>broken<'), 1)
+        self.assertIn(b'HTTP 404', response.data)
+
+
+class TestPartitionedHealthChecks(TestHealthChecks):
+    """Test health checks of links spread over partition files."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.app_config = dict(BaseTestCase.app_config, LINK_STORE='partitioned',
+                               LINK_PARTITIONS=4, LINK_PARTITION_DIR=self.tmpdir)
+        super().setUp()
+        with self.flask_app.app_context():
+            store = get_store()
+            # Link ids repeat across partitions
+            self.assertEqual(store.get('good').id, store.get('dead').id)
+
+    def tearDown(self):
+        self.flask_app.extensions['link_store'].close()
+        super().tearDown()
+        shutil.rmtree(self.tmpdir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 from tests.base import BaseTestCase
-from app import app, db, GoLink
+from extensions import db
+from models import GoLink
 
 
 class TestLinkManagement(BaseTestCase):
@@ -31,7 +32,7 @@ class TestLinkManagement(BaseTestCase):
         self.assertEqual(rv.status_code, 200)
         self.assertIn(b'Link created successfully', rv.data)
         
-        with app.app_context():
+        with self.flask_app.app_context():
             link = GoLink.query.filter_by(short_path='test').first()
             self.assertIsNotNone(link)
             self.assertEqual(link.target_url, 'https://example.com')
@@ -53,7 +54,7 @@ class TestLinkManagement(BaseTestCase):
         user = self.create_user()
         self.login()
         
-        with app.app_context():
+        with self.flask_app.app_context():
             link = GoLink(short_path='test', target_url='https://example.com', user_id=user.id)
             db.session.add(link)
             db.session.commit()
@@ -81,7 +82,7 @@ class TestLinkManagement(BaseTestCase):
         """Test that short links redirect to target URLs."""
         user = self.create_user()
         
-        with app.app_context():
+        with self.flask_app.app_context():
             link = GoLink(short_path='test', target_url='https://example.com', user_id=user.id)
             db.session.add(link)
             db.session.commit()
@@ -102,7 +103,7 @@ class TestLinkManagement(BaseTestCase):
         user = self.create_user()
         self.login()
         
-        with app.app_context():
+        with self.flask_app.app_context():
             link = GoLink(short_path='test', target_url='https://example.com', user_id=user.id)
             db.session.add(link)
             db.session.commit()
@@ -113,7 +114,7 @@ class TestLinkManagement(BaseTestCase):
         self.assertEqual(rv.status_code, 200)
         self.assertIn(b'Link updated successfully', rv.data)
         
-        with app.app_context():
+        with self.flask_app.app_context():
             updated_link = GoLink.query.filter_by(short_path='test').first()
             self.assertEqual(updated_link.target_url, 'https://updated.com')
     
@@ -122,7 +123,7 @@ class TestLinkManagement(BaseTestCase):
         owner = self.create_user("owner")
         other_user = self.create_user("other")
         
-        with app.app_context():
+        with self.flask_app.app_context():
             link = GoLink(short_path='test', target_url='https://example.com', user_id=owner.id)
             db.session.add(link)
             db.session.commit()
@@ -148,7 +149,7 @@ class TestLinkManagement(BaseTestCase):
         user = self.create_user()
         self.login()
         
-        with app.app_context():
+        with self.flask_app.app_context():
             link = GoLink(short_path='test', target_url='https://example.com', user_id=user.id)
             db.session.add(link)
             db.session.commit()
@@ -157,7 +158,7 @@ class TestLinkManagement(BaseTestCase):
         self.assertEqual(rv.status_code, 200)
         self.assertIn(b'Link deleted successfully', rv.data)
         
-        with app.app_context():
+        with self.flask_app.app_context():
             deleted_link = GoLink.query.filter_by(short_path='test').first()
             self.assertIsNone(deleted_link)
     
@@ -166,7 +167,7 @@ class TestLinkManagement(BaseTestCase):
         owner = self.create_user("owner")
         other_user = self.create_user("other")
         
-        with app.app_context():
+        with self.flask_app.app_context():
             link = GoLink(short_path='test', target_url='https://example.com', user_id=owner.id)
             db.session.add(link)
             db.session.commit()
@@ -205,7 +206,7 @@ class TestLinkManagement(BaseTestCase):
         self.login()
         
         # Create more than 10 links to test pagination
-        with app.app_context():
+        with self.flask_app.app_context():
             for i in range(15):
                 link = GoLink(short_path=f'test{i}', target_url=f'https://example{i}.com', user_id=user.id)
                 db.session.add(link)
@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+import unittest
+from tests.base import BaseTestCase
+from extensions import db
+from linktable import LinkTable, LinkTableError, compile_link_table
+from models import GoLink
+from storage import LinkTableStore, SQLAlchemyLinkStore, get_store
+
+
+class TestLinkTable(unittest.TestCase):
+    """Test compiling and reading the binary link table."""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'links.table')
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+    
+    def test_roundtrip(self):
+        """Test that every compiled link resolves and unknown keys miss."""
+        pairs = [(f'link{i}', f'https://example.com/{i}') for i in range(1000)]
+        pairs.append(('café', 'https://example.com/caf%C3%A9'))
+        self.assertEqual(compile_link_table(pairs, self.path), len(pairs))
+        table = LinkTable(self.path)
+        for short_path, target_url in pairs:
+            self.assertEqual(table.get(short_path), target_url)
+        self.assertIsNone(table.get('link1000'))
+        self.assertIsNone(table.get(''))
+    
+    def test_iteration_is_sorted(self):
+        """Test that iterating the table yields links in short_path order."""
+        compile_link_table([('b', 'https://b'), ('a', 'https://a')], self.path)
+        self.assertEqual(list(LinkTable(self.path)), [('a', 'https://a'), ('b', 'https://b')])
+    
+    def test_empty_table(self):
+        """Test that an empty table can be compiled and read."""
+        compile_link_table([], self.path)
+        table = LinkTable(self.path)
+        self.assertEqual(len(table), 0)
+        self.assertIsNone(table.get('anything'))
+    
+    def test_rejects_other_files(self):
+        """Test that a file that isn't a link table is refused."""
+        with open(self.path, 'wb') as f:
+            f.write(b'SQLite format 3\x00')
+        with self.assertRaises(LinkTableError):
+            LinkTable(self.path)
+    
+    def test_recompile_leaves_open_table_intact(self):
+        """Test that a reader keeps its mapping when the file is replaced."""
+        compile_link_table([('a', 'https://old')], self.path)
+        old = LinkTable(self.path)
+        compile_link_table([('a', 'https://new')], self.path)
+        self.assertEqual(old.get('a'), 'https://old')
+        self.assertEqual(LinkTable(self.path).get('a'), 'https://new')
+        self.assertEqual(os.listdir(self.tmpdir), ['links.table'])
+
+
+class TestLinkTableStore(BaseTestCase):
+    """Test redirects served from a compiled link table."""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.table_path = os.path.join(self.tmpdir, 'golinks.linktable')
+        self.app_config = dict(BaseTestCase.app_config,
+                               LINK_STORE='linktable',
+                               LINK_TABLE_PATH=self.table_path,
+                               LINK_CACHE_CHECK_INTERVAL=0)
+        super().setUp()
+    
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.tmpdir)
+    
+    def add_link(self, short_path, target_url):
+        user = self.create_user(short_path)
+        with self.flask_app.app_context():
+            db.session.add(GoLink(short_path=short_path, target_url=target_url, user_id=user.id))
+            db.session.commit()
+    
+    def compile(self):
+        with self.flask_app.app_context():
+            compile_link_table(SQLAlchemyLinkStore().iter_links(), self.table_path)
+    
+    def test_redirects_resolve_from_table(self):
+        """Test that compiled links redirect and new ones appear after a rebuild."""
+        self.add_link('docs', 'https://docs.example.com')
+        self.compile()
+        with self.flask_app.app_context():
+            self.assertIsInstance(get_store(), LinkTableStore)
+        self.assertEqual(self.app.get('/docs').location, 'https://docs.example.com')
+        self.assertIn('/create', self.app.get('/new').location)
+        
+        self.add_link('new', 'https://new.example.com')
+        self.compile()
+        self.assertEqual(self.app.get('/new').location, 'https://new.example.com')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import threading
+import time
+import unittest
+from tests.base import BaseTestCase
+from extensions import db
+from load_shedding import EXPENSIVE, LoadShedder, Overloaded
+from models import GoLink
+
+
+class TestLoadShedder(unittest.TestCase):
+    """Test slot accounting per route class."""
+    
+    def test_expensive_slots_are_bounded(self):
+        """Test that expensive requests beyond their slots are refused quickly."""
+        shedder = LoadShedder(shared_slots=4, expensive_slots=1, expensive_timeout=0.01)
+        held = shedder.acquire(EXPENSIVE)
+        started = time.monotonic()
+        with self.assertRaises(Overloaded):
+            shedder.acquire(EXPENSIVE)
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(shedder.shed[EXPENSIVE], 1)
+        # Cheap requests still get the remaining shared slots
+        shedder.acquire(None)
+        shedder.release(held)
+        shedder.acquire(EXPENSIVE)
+    
+    def test_refused_request_releases_its_expensive_slot(self):
+        """Test that a request refused a shared slot doesn't leak its expensive slot."""
+        shedder = LoadShedder(shared_slots=1, expensive_slots=2, shared_timeout=0.01, expensive_timeout=0.01)
+        shedder.acquire(None)
+        with self.assertRaises(Overloaded):
+            shedder.acquire(EXPENSIVE)
+        self.assertTrue(shedder.expensive.acquire(blocking=False))
+        self.assertTrue(shedder.expensive.acquire(blocking=False))
+    
+    def test_queued_request_gets_a_freed_slot(self):
+        """Test that a request waits for a slot released within its timeout."""
+        shedder = LoadShedder(shared_slots=1, expensive_slots=1, shared_timeout=2)
+        held = shedder.acquire(None)
+        threading.Timer(0.05, shedder.release, args=(held,)).start()
+        self.assertEqual(len(shedder.acquire(None)), 1)
+
+
+class TestLoadSheddingRoutes(BaseTestCase):
+    """Test that the app sheds expensive routes and keeps redirects flowing."""
+    
+    app_config = dict(BaseTestCase.app_config,
+                      LOAD_SHEDDING_ENABLED=True,
+                      LOAD_SHEDDING_SHARED_SLOTS=2,
+                      LOAD_SHEDDING_EXPENSIVE_SLOTS=1,
+                      LOAD_SHEDDING_SHARED_TIMEOUT=0.01,
+                      LOAD_SHEDDING_EXPENSIVE_TIMEOUT=0.01)
+    
+    def setUp(self):
+        super().setUp()
+        self.shedder = self.flask_app.extensions['load_shedder']
+        user = self.create_user()
+        with self.flask_app.app_context():
+            db.session.add(GoLink(short_path='docs', target_url='https://docs.example.com', user_id=user.id))
+            db.session.commit()
+        self.login()
+    
+    def test_saturated_expensive_route_gets_503(self):
+        """Test that a busy search route fast-fails with Retry-After."""
+        held = self.shedder.acquire(EXPENSIVE)
+        rv = self.app.get('/links?user_only=false&q=doc')
+        self.assertEqual(rv.status_code, 503)
+        self.assertEqual(rv.headers['Retry-After'], '2')
+        self.shedder.release(held)
+        self.assertEqual(self.app.get('/links').status_code, 200)
+    
+    def test_redirects_bypass_limits(self):
+        """Test that redirects are served while every other slot is taken."""
+        held = self.shedder.acquire(None) + self.shedder.acquire(None)
+        rv = self.app.get('/docs')
+        self.assertEqual(rv.status_code, 302)
+        self.assertEqual(rv.location, 'https://docs.example.com')
+        self.assertEqual(self.app.get('/create').status_code, 503)
+        self.shedder.release(held)
+    
+    def test_slots_are_released_after_each_request(self):
+        """Test that finished requests give their slots back."""
+        for _ in range(5):
+            self.assertEqual(self.app.get('/links').status_code, 200)
+        self.assertEqual(len(self.shedder.acquire(EXPENSIVE)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import io
+import sys
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from tests.base import BaseTestCase
+import manage
+from extensions import db
+from models import GoLink, User, current_generations
+from storage import get_store
+
+
+class TestManage(BaseTestCase):
+    """Test the management CLI against a test database."""
+
+    def run_command(self, *argv, stdin=''):
+        out, err = io.StringIO(), io.StringIO()
+        old_stdin, sys.stdin = sys.stdin, io.StringIO(stdin)
+        try:
+            with redirect_stdout(out), redirect_stderr(err):
+                status = manage.main(['--database', self.db_path, *argv])
+        finally:
+            sys.stdin = old_stdin
+        return status, out.getvalue() + err.getvalue()
+
+    def generations(self):
+        with self.flask_app.app_context():
+            return current_generations()
+
+    def test_user_commands(self):
+        """Test creating, promoting and demoting users."""
+        status, output = self.run_command('user', 'create', 'alice', '--password-stdin', stdin='secret\n')
+        self.assertEqual((status, output), (0, "Created user 'alice'\n"))
+        self.assertEqual(self.run_command('user', 'create', 'alice', '--password-stdin', stdin='x\n')[0], 1)
+        self.assertEqual(self.run_command('user', 'promote', 'alice'), (0, "Promoted 'alice'\n"))
+        self.assertEqual(self.run_command('user', 'promote', 'alice'), (0, "User 'alice' is already an admin\n"))
+        self.assertEqual(self.run_command('user', 'promote', 'bob'), (1, "Error: User 'bob' not found\n"))
+        with self.flask_app.app_context():
+            self.assertTrue(User.query.filter_by(username='alice').one().is_admin)
+        self.assertEqual(self.run_command('user', 'demote', 'alice')[0], 0)
+        self.assertEqual(self.generations()['users'], 3)
+        self.assertEqual(self.login('alice', 'secret').status_code, 200)
+        self.assertEqual(self.run_command('user', 'ls'), (0, 'alice\n'))
+
+    def test_link_commands(self):
+        """Test adding, listing and removing links, as the app sees them."""
+        self.create_user('alice')
+        self.assertEqual(self.run_command('link', 'add', 'docs', 'https://Docs.example.com', '--user', 'alice')[0], 0)
+        self.assertEqual(self.run_command('link', 'add', 'docs', 'https://other.com', '--user', 'alice')[0], 1)
+        self.assertEqual(self.run_command('link', 'add', 'bad', 'not a url', '--user', 'alice')[0], 1)
+        self.run_command('link', 'add', 'dogs', 'https://dogs.example.com', '--user', 'alice')
+        self.run_command('link', 'add', 'eel', 'https://eel.example.com', '--user', 'alice')
+        with self.flask_app.app_context():
+            link = get_store().get('docs')
+            self.assertEqual(link.canonical_url, 'https://docs.example.com/')
+            self.assertEqual([l.short_path for l in get_store().links_for_host('docs.example.com')], ['docs'])
+        self.assertEqual(self.app.get('/dogs').location, 'https://dogs.example.com')
+        self.assertEqual(self.run_command('link', 'ls', 'do'),
+                         (0, 'docs\thttps://Docs.example.com\ndogs\thttps://dogs.example.com\n'))
+        self.assertEqual(self.run_command('link', 'ls', '\U0010ffff'), (0, ''))
+        self.assertEqual(self.run_command('link', 'ls', '--limit', '1'), (0, 'docs\thttps://Docs.example.com\n'))
+        self.assertEqual(self.run_command('link', 'rm', 'docs'), (0, 'Removed docs\n'))
+        self.assertEqual(self.run_command('link', 'rm', 'docs')[0], 1)
+        self.assertEqual(self.generations()['links'], 4)
+
+    def test_seed_and_maintenance(self):
+        """Test seeding synthetic links in batches and the database commands."""
+        self.create_user('alice')
+        self.assertEqual(self.run_command('seed', '250', '--batch', '100'), (0, 'Inserted 250 links\n'))
+        self.assertEqual(self.run_command('seed', '300', '--batch', '100'), (0, 'Inserted 50 links\n'))
+        with self.flask_app.app_context():
+            self.assertEqual(db.session.query(GoLink).count(), 300)
+            self.assertEqual(len(get_store().links_for_url('https://h7.example.com/seed/107')), 1)
+        for command in ('integrity-check', 'analyze', 'vacuum'):
+            status, output = self.run_command('db', command)
+            self.assertEqual(status, 0, output)
+        self.assertIn(': ok', self.run_command('db', 'integrity-check')[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
-from tests.base import BaseTestCase
-from app import app, db, User, GoLink
+from tests.base import BaseTestCase, TEST_PASSWORD_HASH_METHOD
+from extensions import db
+from models import User, GoLink
 from werkzeug.security import generate_password_hash
 
 
@@ -10,7 +11,7 @@ class TestModels(BaseTestCase):
     def test_user_creation(self):
         """Test user creation and attributes."""
         user = self.create_user()
-        with app.app_context():
+        with self.flask_app.app_context():
             saved_user = User.query.filter_by(username="testuser").first()
             self.assertIsNotNone(saved_user)
             self.assertEqual(saved_user.username, "testuser")
@@ -19,16 +20,16 @@ class TestModels(BaseTestCase):
     def test_admin_user_creation(self):
         """Test admin user creation."""
         user = self.create_user(is_admin=True)
-        with app.app_context():
+        with self.flask_app.app_context():
             saved_user = User.query.filter_by(username="testuser").first()
             self.assertTrue(saved_user.is_admin)
     
     def test_golink_creation(self):
         """Test GoLink creation and relationships."""
-        with app.app_context():
+        with self.flask_app.app_context():
             user = User(
                 username="testuser",
-                password_hash=generate_password_hash("testpass"),
+                password_hash=generate_password_hash("testpass", method=TEST_PASSWORD_HASH_METHOD),
                 is_admin=False
             )
             db.session.add(user)
@@ -50,10 +51,10 @@ class TestModels(BaseTestCase):
     
     def test_user_link_relationship(self):
         """Test User-GoLink relationship."""
-        with app.app_context():
+        with self.flask_app.app_context():
             user = User(
                 username="testuser",
-                password_hash=generate_password_hash("testpass"),
+                password_hash=generate_password_hash("testpass", method=TEST_PASSWORD_HASH_METHOD),
                 is_admin=False
             )
             db.session.add(user)
@@ -0,0 +1,103 @@
+import unittest
+from tests.base import BaseTestCase
+from extensions import db, fragment_cache
+from models import GoLink
+from page_cache import FragmentCache
+
+
+class TestFragmentCache(unittest.TestCase):
+    """Test the LRU fragment cache itself."""
+    
+    def test_evicts_least_recently_used(self):
+        """Test that the oldest untouched entry is evicted first."""
+        cache = FragmentCache(max_entries=2)
+        cache.set('a', 'A')
+        cache.set('b', 'B')
+        cache.get('a')
+        cache.set('c', 'C')
+        self.assertEqual(cache.get('a'), 'A')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 'C')
+    
+    def test_zero_size_disables_cache(self):
+        """Test that a zero-sized cache never stores anything."""
+        cache = FragmentCache(max_entries=0)
+        cache.set('a', 'A')
+        self.assertIsNone(cache.get('a'))
+
+
+class TestListPageCaching(BaseTestCase):
+    """Test fragment caching of the /links and /users pages."""
+    
+    def add_link(self, short_path, user_id):
+        with self.flask_app.app_context():
+            db.session.add(GoLink(short_path=short_path, target_url='https://example.com', user_id=user_id))
+            db.session.commit()
+    
+    def test_repeat_request_is_served_from_cache(self):
+        """Test that an unchanged list page is rendered only once."""
+        self.create_user()
+        self.login()
+        self.app.get('/links?user_only=false')
+        self.app.get('/links?user_only=false')
+        self.assertEqual(fragment_cache.hits, 1)
+    
+    def test_link_write_invalidates_cached_page(self):
+        """Test that creating a link through the UI shows up immediately."""
+        self.create_user()
+        self.login()
+        self.app.get('/links')
+        self.app.post('/create', data={
+            'short_path': 'fresh',
+            'target_url': 'https://example.com'
+        })
+        rv = self.app.get('/links')
+        self.assertIn(b'fresh', rv.data)
+    
+    def test_my_links_are_cached_per_user(self):
+        """Test that one user's cached 'My Links' page is not shown to another."""
+        alice = self.create_user('alice')
+        bob = self.create_user('bob')
+        self.add_link('alices-link', alice.id)
+        self.add_link('bobs-link', bob.id)
+        
+        self.login('alice')
+        self.app.get('/links')
+        self.logout()
+        
+        self.login('bob')
+        rv = self.app.get('/links')
+        self.assertIn(b'bobs-link', rv.data)
+        self.assertNotIn(b'alices-link', rv.data)
+    
+    def test_all_links_controls_are_per_viewer(self):
+        """Test that cached edit controls are not shared between non-admins."""
+        alice = self.create_user('alice')
+        self.create_user('bob')
+        self.add_link('alices-link', alice.id)
+        
+        self.login('alice')
+        rv = self.app.get('/links?user_only=false')
+        self.assertIn(b'/edit/alices-link', rv.data)
+        self.logout()
+        
+        self.login('bob')
+        rv = self.app.get('/links?user_only=false')
+        self.assertNotIn(b'/edit/alices-link', rv.data)
+    
+    def test_user_admin_change_invalidates_users_page(self):
+        """Test that toggling admin status re-renders the users table."""
+        self.create_user('admin', is_admin=True)
+        other = self.create_user('other')
+        self.login('admin')
+        rv = self.app.get('/users')
+        self.assertIn(b'Promote', rv.data)
+        
+        self.app.post(f'/users/{other.id}/toggle-admin')
+        rv = self.app.get('/users')
+        self.assertIn(b'Demote', rv.data)
+        self.assertNotIn(b'Promote', rv.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
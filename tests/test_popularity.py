@@ -0,0 +1,87 @@
+import unittest
+from link_cache import LinkCache
+from popularity import CountMinSketch
+
+
+class TestCountMinSketch(unittest.TestCase):
+    """Test the fixed-memory frequency sketch."""
+    
+    def test_estimates_never_undercount(self):
+        """Test that every key's estimate is at least its true count."""
+        sketch = CountMinSketch(width=64, sample_size=10 ** 9)
+        counts = {f'link{i}': i % 7 + 1 for i in range(500)}
+        for key, count in counts.items():
+            for _ in range(count):
+                sketch.add(key)
+        for key, count in counts.items():
+            self.assertGreaterEqual(sketch.estimate(key), count)
+    
+    def test_estimates_are_exact_without_collisions(self):
+        """Test that a roomy sketch counts a few keys exactly."""
+        sketch = CountMinSketch(width=4096)
+        sketch.add('docs', 5)
+        sketch.add('wiki')
+        self.assertEqual(sketch.estimate('docs'), 5)
+        self.assertEqual(sketch.estimate('wiki'), 1)
+        self.assertEqual(sketch.estimate('other'), 0)
+    
+    def test_aging_halves_counts(self):
+        """Test that counts are halved once sample_size additions are reached."""
+        sketch = CountMinSketch(width=4096, sample_size=100)
+        sketch.add('docs', 60)
+        sketch.add('wiki', 40)
+        self.assertEqual(sketch.estimate('docs'), 30)
+        self.assertEqual(sketch.estimate('wiki'), 20)
+
+
+class TestCacheAdmission(unittest.TestCase):
+    """Test popularity-based admission in the redirect cache."""
+    
+    def request(self, cache, key):
+        if cache.get(key) is None:
+            cache.set(key, f'https://example.com/{key}')
+    
+    def test_scan_does_not_evict_hot_links(self):
+        """Test that one-off paths can't push frequently used links out."""
+        cache = LinkCache(max_entries=10, admission=True)
+        for _ in range(3):
+            for i in range(10):
+                self.request(cache, f'hot{i}')
+        for i in range(1000):
+            self.request(cache, f'scan{i}')
+        self.assertTrue(all(f'hot{i}' in cache for i in range(10)))
+        self.assertEqual(cache.rejected, 1000)
+    
+    def test_plain_lru_is_flushed_by_a_scan(self):
+        """Test the behavior admission prevents."""
+        cache = LinkCache(max_entries=10, admission=False)
+        for i in range(10):
+            self.request(cache, f'hot{i}')
+        for i in range(10):
+            self.request(cache, f'scan{i}')
+        self.assertFalse(any(f'hot{i}' in cache for i in range(10)))
+    
+    def test_popular_newcomer_is_admitted(self):
+        """Test that a link requested more often than the LRU victim gets in."""
+        cache = LinkCache(max_entries=2, admission=True)
+        self.request(cache, 'a')
+        self.request(cache, 'b')
+        self.request(cache, 'new')
+        self.assertNotIn('new', cache)
+        self.request(cache, 'new')
+        self.assertIn('new', cache)
+        self.assertNotIn('a', cache)
+    
+    def test_seeded_popularity(self):
+        """Test that seeded counts protect links before this worker has seen them."""
+        cache = LinkCache(max_entries=1, admission=True)
+        cache.seed_popularity([('docs', 1000)])
+        cache.set('docs', 'https://docs.example.com')
+        self.request(cache, 'other')
+        self.request(cache, 'other')
+        self.assertIn('docs', cache)
+        self.assertEqual(cache.popularity.estimate('docs'), 15)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import threading
+import unittest
+from tests.base import BaseTestCase
+from profiler import SamplingProfiler, collapsed
+
+
+def spin(stop):
+    while not stop.is_set():
+        sum(range(100))
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    """Test sampling thread stacks."""
+
+    def run_busy_thread(self, profiler, route):
+        stop = threading.Event()
+
+        def serve():
+            if route:
+                profiler.track(route)
+            spin(stop)
+            profiler.untrack()
+
+        thread = threading.Thread(target=serve, name='busy')
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(stop.set)
+
+    def test_request_threads_are_tagged_with_their_route(self):
+        """Test that samples start with the route and end in the running function."""
+        profiler = SamplingProfiler(interval=0.001)
+        self.run_busy_thread(profiler, 'main.view_links')
+        counts, samples = profiler.profile(0.1)
+        self.assertGreater(samples, 10)
+        self.assertTrue(counts)
+        for stack in counts:
+            self.assertTrue(stack.startswith('route:main.view_links;threading:Thread._bootstrap;'))
+            self.assertIn(f';{spin.__module__}:spin', stack)
+        line = collapsed(counts).splitlines()[0]
+        self.assertRegex(line, r'^route:main\.view_links;\S+ \d+$')
+
+    def test_idle_threads_only_on_request(self):
+        """Test that threads outside requests are only sampled with all_threads."""
+        profiler = SamplingProfiler(interval=0.001)
+        self.run_busy_thread(profiler, None)
+        self.assertEqual(profiler.profile(0.02)[0], {})
+        counts, _ = profiler.profile(0.02, all_threads=True)
+        self.assertTrue(any(stack.startswith('thread:busy;') for stack in counts))
+
+
+class TestProfileEndpoint(BaseTestCase):
+    """Test the admin profile endpoint."""
+
+    def test_admins_get_a_collapsed_profile(self):
+        """Test that the endpoint returns collapsed stacks and refuses concurrent runs."""
+        self.create_user(is_admin=True)
+        self.login()
+        rv = self.app.get('/admin/profile?seconds=0.05&threads=all')
+        self.assertEqual(rv.status_code, 200)
+        self.assertEqual(rv.mimetype, 'text/plain')
+        self.assertGreater(int(rv.headers['X-Profile-Samples']), 0)
+        self.assertNotIn('route:main.profile_worker', rv.get_data(as_text=True))
+
+        profiler = self.flask_app.extensions['profiler']
+        with profiler._running:
+            self.assertEqual(self.app.get('/admin/profile?seconds=0.05').status_code, 409)
+
+    def test_requires_admin(self):
+        """Test that regular users can't profile the worker."""
+        self.create_user()
+        self.login()
+        rv = self.app.get('/admin/profile?seconds=0.05')
+        self.assertEqual(rv.status_code, 302)
+
+
+if __name__ == '__main__':
+    unittest.main()
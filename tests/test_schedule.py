@@ -0,0 +1,119 @@
+import time
+import unittest
+from datetime import timedelta
+from tests.base import BaseTestCase
+from extensions import link_cache, link_schedule
+from link_cache import HELD, LinkCache
+from schedule import LinkSchedule, utcnow
+from storage import get_store
+
+
+class TestLinkSchedule(unittest.TestCase):
+    """Test applying scheduled transitions to a cache."""
+
+    def setUp(self):
+        self.cache = LinkCache(max_entries=10)
+        self.schedule = LinkSchedule(self.cache)
+        # Relative to the real clock, as the schedule's thread runs transitions too
+        self.now = utcnow()
+
+    def test_load_holds_links_outside_their_schedule(self):
+        """Test that future and expired links are held, and live ones are not."""
+        hour = timedelta(hours=1)
+        self.cache.set('live', 'https://live.example.com')
+        self.cache.set('expired', 'https://expired.example.com')
+        self.schedule.load([('future', self.now + hour, None),
+                            ('expired', None, self.now - hour),
+                            ('live', self.now - hour, self.now + hour)], now=self.now)
+        self.assertEqual(self.cache.get('future'), HELD)
+        self.assertEqual(self.cache.get('expired'), HELD)
+        self.assertEqual(self.cache.get('live'), 'https://live.example.com')
+        self.assertIsNone(self.cache.get('unscheduled'))
+        self.assertEqual(self.schedule.upcoming(), [(self.now + hour, 'future'), (self.now + hour, 'live')])
+        self.cache.set('future', 'https://future.example.com')
+        self.assertEqual(self.cache.get('future'), HELD)
+
+    def test_run_due_applies_transitions_in_order(self):
+        """Test that activations and expiries take effect when due."""
+        start, end = self.now + timedelta(minutes=5), self.now + timedelta(minutes=10)
+        self.schedule.load([('event', start, end)], now=self.now)
+        self.assertEqual(self.schedule.run_due(self.now), 300)
+        self.assertEqual(self.cache.get('event'), HELD)
+        self.assertEqual(self.schedule.run_due(start), 300)
+        self.assertIsNone(self.cache.get('event'))
+        self.cache.set('event', 'https://event.example.com')
+        self.assertEqual(self.cache.get('event'), 'https://event.example.com')
+        self.assertIsNone(self.schedule.run_due(end))
+        self.assertEqual(self.cache.get('event'), HELD)
+
+    def test_background_thread_expires_links(self):
+        """Test that the scheduler thread evicts a link at its expiry time."""
+        self.cache.set('soon', 'https://soon.example.com')
+        self.schedule.load([('soon', None, utcnow() + timedelta(milliseconds=50))])
+        self.assertEqual(self.cache.get('soon'), 'https://soon.example.com')
+        deadline = time.monotonic() + 2
+        while self.cache.get('soon') != HELD and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.cache.get('soon'), HELD)
+
+
+class TestScheduledLinks(BaseTestCase):
+    """Test creating and following scheduled links."""
+
+    def setUp(self):
+        super().setUp()
+        self.create_user()
+        self.login()
+
+    def test_future_link_does_not_redirect_yet(self):
+        """Test that a link is treated as missing before its start time."""
+        start = (utcnow() + timedelta(days=1)).strftime('%Y-%m-%dT%H:%M')
+        self.app.post('/create', data={'short_path': 'launch', 'target_url': 'https://launch.example.com',
+                                       'not_before': start})
+        self.assertIn('/create', self.app.get('/launch').location)
+        with self.flask_app.app_context():
+            link = get_store().get('launch')
+            self.assertEqual(link.not_before.strftime('%Y-%m-%dT%H:%M'), start)
+        self.assertIn(b'from ', self.app.get('/links').data)
+
+    def test_expiry_edits_take_effect(self):
+        """Test that setting an expiry in the past stops a cached link, and clearing it restores it."""
+        self.app.post('/create', data={'short_path': 'incident', 'target_url': 'https://incident.example.com'})
+        self.assertEqual(self.app.get('/incident').location, 'https://incident.example.com')
+        self.assertIn('incident', link_cache)
+        past = (utcnow() - timedelta(minutes=1)).strftime('%Y-%m-%dT%H:%M')
+        self.app.post('/edit/incident', data={'target_url': 'https://incident.example.com', 'expires_at': past})
+        self.assertIn('/create', self.app.get('/incident').location)
+        self.app.post('/edit/incident', data={'target_url': 'https://incident.example.com', 'expires_at': ''})
+        self.assertEqual(self.app.get('/incident').location, 'https://incident.example.com')
+
+    def test_other_workers_pick_up_schedules(self):
+        """Test that the schedule is reloaded when the links generation moves."""
+        with self.flask_app.app_context():
+            get_store().create('old', 'https://old.example.com', 1, expires_at=utcnow() - timedelta(days=1))
+        with self.flask_app.app_context():
+            link_cache.revalidate(force=True)
+        self.assertIn('/create', self.app.get('/old').location)
+        self.assertEqual([path for _, path in link_schedule.upcoming()], [])
+
+    def test_invalid_schedule_is_rejected(self):
+        """Test that an expiry before the start time is refused."""
+        rv = self.app.post('/create', data={'short_path': 'bad', 'target_url': 'https://bad.example.com',
+                                            'not_before': '2030-01-02T00:00', 'expires_at': '2030-01-01T00:00'},
+                           follow_redirects=True)
+        self.assertIn(b'The expiry time must be after the start time', rv.data)
+        with self.flask_app.app_context():
+            self.assertIsNone(get_store().get('bad'))
+
+    def test_rejected_edit_keeps_schedule(self):
+        """Test that a rejected edit shows the submitted schedule again, whatever the error."""
+        self.app.post('/create', data={'short_path': 'event', 'target_url': 'https://event.example.com'})
+        for target_url in ('', 'not a url'):
+            rv = self.app.post('/edit/event', data={'target_url': target_url, 'not_before': '2030-01-01T09:00',
+                                                    'expires_at': '2030-01-02T17:00'})
+            self.assertIn(b'value="2030-01-01T09:00"', rv.data)
+            self.assertIn(b'value="2030-01-02T17:00"', rv.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
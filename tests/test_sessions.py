@@ -0,0 +1,125 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from tests.base import BaseTestCase
+from app import create_app
+from sessions import SQLiteSessionStore, load_or_create_secret_key
+
+
+class TestSecretKey(unittest.TestCase):
+    """Test the persistent secret key file."""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'secret_key')
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+    
+    def test_key_is_created_once(self):
+        """Test that the key is generated on first use and reused afterwards."""
+        key = load_or_create_secret_key(self.path)
+        self.assertEqual(len(key), 64)
+        self.assertEqual(load_or_create_secret_key(self.path), key)
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+    
+    def test_concurrent_workers_agree(self):
+        """Test that workers starting at once all end up with the same key."""
+        keys = []
+        threads = [threading.Thread(target=lambda: keys.append(load_or_create_secret_key(self.path)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(keys)), 1)
+
+
+class TestSQLiteSessionStore(unittest.TestCase):
+    """Test the session table itself."""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = SQLiteSessionStore(os.path.join(self.tmpdir, 'sessions.db'))
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+    
+    def test_expired_sessions_are_hidden_and_swept(self):
+        """Test that expired sessions can't be loaded and are removed by a sweep."""
+        now = time.time()
+        self.store.save('live', '{}', now + 60)
+        self.store.save('dead', '{}', now - 1)
+        self.assertIsNotNone(self.store.load('live', now))
+        self.assertIsNone(self.store.load('dead', now))
+        self.assertEqual(self.store.sweep(now), 1)
+        self.assertEqual(self.store.sweep(now), 0)
+
+
+class TestServerSideSessions(BaseTestCase):
+    """Test logins backed by the server-side session store."""
+    
+    def setUp(self):
+        self.session_dir = tempfile.mkdtemp()
+        self.app_config = dict(self.app_config, SESSION_STORE='sqlite',
+                               SESSION_DB_PATH=os.path.join(self.session_dir, 'sessions.db'))
+        super().setUp()
+        self.create_user()
+    
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.session_dir)
+    
+    def session_count(self):
+        store = self.flask_app.session_interface.store
+        return store._connection().execute('SELECT count(*) FROM sessions').fetchone()[0]
+    
+    def test_cookie_holds_only_the_session_id(self):
+        """Test that login stores the session server-side."""
+        self.login()
+        cookie = self.app.get_cookie('session')
+        self.assertNotIn('.', cookie.value)
+        self.assertEqual(self.session_count(), 1)
+        self.assertEqual(self.app.get('/links').status_code, 200)
+    
+    def test_login_changes_the_session_id(self):
+        """Test that a session id obtained before login isn't the logged-in one."""
+        self.app.get('/links')
+        before = self.app.get_cookie('session').value
+        self.login()
+        after = self.app.get_cookie('session').value
+        self.assertNotEqual(before, after)
+        self.assertEqual(self.session_count(), 1)
+        planted = self.flask_app.test_client()
+        planted.set_cookie('session', before)
+        self.assertEqual(planted.get('/links').status_code, 302)
+        self.assertEqual(self.app.get('/links').status_code, 200)
+    
+    def test_session_survives_restart(self):
+        """Test that another worker (or a restarted one) accepts the same session."""
+        self.login()
+        sid = self.app.get_cookie('session').value
+        other_worker = create_app(dict(self.app_config, SECRET_KEY='a-different-key',
+                                       SQLALCHEMY_DATABASE_URI=f'sqlite:///{self.db_path}'))
+        client = other_worker.test_client()
+        client.set_cookie('session', sid)
+        self.assertEqual(client.get('/links').status_code, 200)
+    
+    def test_logout_deletes_session(self):
+        """Test that logging out removes the stored session."""
+        self.login()
+        self.logout()
+        self.assertEqual(self.session_count(), 0)
+        self.assertEqual(self.app.get('/links').status_code, 302)
+    
+    def test_anonymous_requests_store_nothing(self):
+        """Test that visitors who never log in don't create sessions."""
+        self.app.get('/login')
+        self.assertEqual(self.session_count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,413 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from tests.base import BaseTestCase
+from access_log import popular_links, top_links, unused_links
+from app import create_app
+from extensions import db
+from models import GoLink, LinkDailyHits
+from storage import (PartitionedLinkStore, SnapshotLinkStore, SQLAlchemyLinkStore, export_snapshot, get_store,
+                     partition_index, partition_paths, rebalance_partitions)
+from utils import normalize_url, url_hash
+
+
+class TestSQLAlchemyLinkStore(BaseTestCase):
+    """Test the default database-backed store."""
+    
+    def test_create_and_resolve(self):
+        """Test that created links resolve and duplicates are refused."""
+        user = self.create_user()
+        with self.flask_app.app_context():
+            store = get_store()
+            self.assertIsInstance(store, SQLAlchemyLinkStore)
+            self.assertTrue(store.create('docs', 'https://docs.example.com', user.id))
+            self.assertFalse(store.create('docs', 'https://other.example.com', user.id))
+            self.assertEqual(store.resolve('docs'), 'https://docs.example.com')
+            self.assertIsNone(store.resolve('missing'))
+    
+    def test_search_filters_by_owner_and_substring(self):
+        """Test that search applies the owner and query filters."""
+        alice = self.create_user('alice')
+        bob = self.create_user('bob')
+        with self.flask_app.app_context():
+            store = get_store()
+            store.create('alpha', 'https://a.example.com', alice.id)
+            store.create('beta', 'https://b.example.com', bob.id)
+            store.create('alphabet', 'https://c.example.com', bob.id)
+            self.assertEqual([l.short_path for l in store.search(q='alpha').items], ['alpha', 'alphabet'])
+            self.assertEqual([l.short_path for l in store.search(user_id=bob.id).items], ['alphabet', 'beta'])
+    
+    def test_short_paths_since_marker(self):
+        """Test that short_paths returns only new links until one is deleted."""
+        user = self.create_user()
+        with self.flask_app.app_context():
+            store = get_store()
+            self.assertEqual(store.short_paths(), ([], (0, None, 0), True))
+            store.create_many([('b', 'https://b.example.com', user.id), ('a', 'https://a.example.com', user.id)])
+            paths, marker, complete = store.short_paths()
+            self.assertEqual((sorted(paths), complete), (['a', 'b'], True))
+            self.assertEqual(store.short_paths(marker)[::2], ([], False))
+            store.create('c', 'https://c.example.com', user.id)
+            paths, marker, complete = store.short_paths(marker)
+            self.assertEqual((paths, complete), (['c'], False))
+            # 'c' has the highest id, which SQLite hands to the next insert
+            store.delete(store.get('c'))
+            store.create('d', 'https://d.example.com', user.id)
+            paths, marker, complete = store.short_paths(marker)
+            self.assertEqual((sorted(paths), complete), (['a', 'b', 'd'], True))
+            store.delete(store.get('a'))
+            store.create('e', 'https://e.example.com', user.id)
+            paths, marker, complete = store.short_paths(marker)
+            self.assertEqual((sorted(paths), complete), (['b', 'd', 'e'], True))
+    
+    def test_links_for_url_matches_canonical_form(self):
+        """Test that reverse lookups find links however their URL was spelled."""
+        user = self.create_user()
+        with self.flask_app.app_context():
+            store = get_store()
+            store.create('one', 'https://Example.com:443/docs?b=1&a=2', user.id)
+            self.assertTrue(store.create_many([('two', 'HTTPS://example.com/docs?a=2&b=1', user.id),
+                                               ('other', 'https://example.com/other', user.id)]))
+            link = store.get('one')
+            self.assertEqual(link.canonical_url, 'https://example.com/docs?a=2&b=1')
+            self.assertEqual(link.target_url, 'https://Example.com:443/docs?b=1&a=2')
+            found = store.links_for_url('https://example.com/docs?a=2&b=1')
+            self.assertEqual([l.short_path for l in found], ['one', 'two'])
+            self.assertEqual(store.links_for_url('https://example.com/nothing'), [])
+    
+    def test_updates_renormalize(self):
+        """Test that editing a link's target updates its canonical form."""
+        user = self.create_user()
+        with self.flask_app.app_context():
+            store = get_store()
+            store.create('one', 'https://a.example.com', user.id)
+            store.update(store.get('one'), 'https://B.example.com')
+            self.assertEqual(store.get('one').canonical_url, 'https://b.example.com/')
+            self.assertEqual([l.short_path for l in store.links_for_url('https://b.example.com')], ['one'])
+    
+    def test_duplicate_targets(self):
+        """Test that links sharing a canonical target are reported together."""
+        user = self.create_user()
+        with self.flask_app.app_context():
+            store = get_store()
+            store.create('a', 'https://example.com/x', user.id)
+            store.create('b', 'https://EXAMPLE.com/x', user.id)
+            store.create('c', 'https://example.com/y', user.id)
+            self.assertEqual(store.duplicate_targets(), [('https://example.com/x', ['a', 'b'])])
+    
+    def create_wiki_links(self, user):
+        store = get_store()
+        store.create('a', 'https://Wiki.old.com/space/A?x=1', user.id)
+        store.create('b', 'http://wiki.old.com:8080/space/B', user.id)
+        store.create('c', 'https://wiki.old.com/other', user.id)
+        store.create('d', 'https://notwiki.old.com/space/D', user.id)
+        return store
+    
+    def test_links_for_host_and_prefix(self):
+        """Test reverse lookups by host and by URL prefix."""
+        user = self.create_user()
+        with self.flask_app.app_context():
+            store = self.create_wiki_links(user)
+            self.assertEqual([l.short_path for l in store.links_for_host('WIKI.old.com')], ['a', 'b', 'c'])
+            self.assertEqual([l.short_path for l in store.links_with_prefix('https://wiki.old.com/space/')], ['a'])
+            # The fragment is kept as typed, so a prefix can end in any character
+            self.assertEqual(store.links_with_prefix('https://wiki.old.com/#\U0010ffff'), [])
+            self.assertEqual(store.links_for_host('new.com'), [])
+            with self.assertRaises(ValueError):
+                store.links_for_host('wiki.old.com/space')
+    
+    def test_rewrite_host(self):
+        """Test that a host rewrite moves every link on it, keeping scheme, port and path."""
+        user = self.create_user()
+        with self.flask_app.app_context():
+            store = self.create_wiki_links(user)
+            self.assertEqual(store.rewrite_host('wiki.old.com', 'wiki.new.com'), 3)
+            db.session.expire_all()
+            self.assertEqual(store.resolve('a'), 'https://wiki.new.com/space/A?x=1')
+            self.assertEqual(store.resolve('b'), 'http://wiki.new.com:8080/space/B')
+            self.assertEqual(store.resolve('d'), 'https://notwiki.old.com/space/D')
+            self.assertEqual(store.links_for_host('wiki.old.com'), [])
+            self.assertEqual([l.short_path for l in store.links_for_url('https://wiki.new.com/other')], ['c'])
+    
+    def test_rewrite_prefix(self):
+        """Test that a prefix rewrite replaces only the prefix and updates derived columns."""
+        user = self.create_user()
+        with self.flask_app.app_context():
+            store = self.create_wiki_links(user)
+            link = store.get('a')
+            link.health_status = 404
+            db.session.commit()
+            self.assertEqual(store.rewrite_prefix('https://wiki.old.com/space/', 'https://docs.new.com/wiki/'), 1)
+            db.session.expire_all()
+            link = store.get('a')
+            self.assertEqual(link.target_url, 'https://docs.new.com/wiki/A?x=1')
+            self.assertEqual(link.target_host, 'docs.new.com')
+            self.assertIsNone(link.health_status)
+            self.assertEqual([l.short_path for l in store.links_for_url('https://docs.new.com/wiki/A?x=1')], ['a'])
+    
+    def test_rewrite_keeps_target_as_typed(self):
+        """Test that rewrites keep the query as typed and recompute the canonical columns from the result."""
+        user = self.create_user()
+        with self.flask_app.app_context():
+            store = get_store()
+            query = '?flag&q=a+b&x=%FF&b=2&a=1'
+            store.create('q', f'https://wiki.old.com/page{query}', user.id)
+            store.create('u', 'https://me@Wiki.Old.com:8443/page', user.id)
+            self.assertEqual(store.rewrite_host('wiki.old.com', 'wiki.new.com'), 2)
+            db.session.expire_all()
+            self.assertEqual(store.resolve('q'), f'https://wiki.new.com/page{query}')
+            self.assertEqual(store.resolve('u'), 'https://me@wiki.new.com:8443/page')
+            self.assertEqual(store.rewrite_prefix('https://wiki.new.com/', 'https://docs.new.com/wiki/'), 1)
+            db.session.expire_all()
+            link = store.get('q')
+            self.assertEqual(link.target_url, f'https://docs.new.com/wiki/page{query}')
+            self.assertEqual(link.canonical_url, normalize_url(link.target_url))
+            self.assertEqual(link.url_hash, url_hash(link.canonical_url))
+            self.assertEqual(link.target_host, 'docs.new.com')
+    
+    def test_rewrite_invalidates_redirect_cache(self):
+        """Test that redirects follow a bulk rewrite immediately."""
+        user = self.create_user()
+        with self.flask_app.app_context():
+            store = self.create_wiki_links(user)
+        self.assertEqual(self.app.get('/c').location, 'https://wiki.old.com/other')
+        with self.flask_app.app_context():
+            store.rewrite_host('wiki.old.com', 'wiki.new.com')
+        self.assertEqual(self.app.get('/c').location, 'https://wiki.new.com/other')
+
+
+class TestSnapshotLinkStore(BaseTestCase):
+    """Test redirect resolution from an exported snapshot file."""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.snapshot_path = os.path.join(self.tmpdir, 'links.snapshot')
+        self.app_config = dict(BaseTestCase.app_config,
+                               LINK_STORE='snapshot',
+                               LINK_SNAPSHOT_PATH=self.snapshot_path,
+                               LINK_CACHE_CHECK_INTERVAL=0)
+        super().setUp()
+    
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.tmpdir)
+    
+    def add_link(self, short_path, target_url):
+        user = self.create_user(short_path)
+        with self.flask_app.app_context():
+            db.session.add(GoLink(short_path=short_path, target_url=target_url, user_id=user.id))
+            db.session.commit()
+    
+    def export(self):
+        with self.flask_app.app_context():
+            return export_snapshot(get_store(), self.snapshot_path)
+    
+    def test_redirects_resolve_from_snapshot(self):
+        """Test that exported links redirect without the database."""
+        self.add_link('docs', 'https://docs.example.com')
+        self.assertEqual(self.export(), 1)
+        with self.flask_app.app_context():
+            self.assertIsInstance(get_store(), SnapshotLinkStore)
+            db.session.query(GoLink).delete()
+            db.session.commit()
+        rv = self.app.get('/docs')
+        self.assertEqual(rv.location, 'https://docs.example.com')
+    
+    def test_replaced_snapshot_is_picked_up(self):
+        """Test that a re-exported snapshot replaces the old one for readers."""
+        self.add_link('docs', 'https://docs.example.com')
+        self.export()
+        self.assertEqual(self.app.get('/new').status_code, 302)
+        self.assertIn('/create', self.app.get('/new').location)
+        
+        self.add_link('new', 'https://new.example.com')
+        self.export()
+        rv = self.app.get('/new')
+        self.assertEqual(rv.location, 'https://new.example.com')
+    
+    def test_management_goes_to_database(self):
+        """Test that link creation through the UI still writes to the database."""
+        self.add_link('docs', 'https://docs.example.com')
+        self.export()
+        self.login('docs')
+        self.app.post('/create', data={'short_path': 'fresh', 'target_url': 'https://fresh.example.com'})
+        with self.flask_app.app_context():
+            self.assertIsNotNone(GoLink.query.filter_by(short_path='fresh').first())
+    
+    def test_listings_follow_the_database(self):
+        """Test that cached link and user lists show UI edits before the next export."""
+        self.add_link('docs', 'https://docs.example.com')
+        self.export()
+        self.create_user('admin', is_admin=True)
+        self.login('admin')
+        self.assertNotIn(b'>fresh<', self.app.get('/links').data)
+        self.assertIn(b'<td>0</td>', self.app.get('/users').data)
+        self.app.post('/create', data={'short_path': 'fresh', 'target_url': 'https://fresh.example.com'})
+        self.assertIn(b'>fresh<', self.app.get('/links').data)
+        self.assertNotIn(b'<td>0</td>', self.app.get('/users').data)
+
+
+class TestPartitionedLinkStore(BaseTestCase):
+    """Test links spread over several partition files."""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.app_config = dict(BaseTestCase.app_config,
+                               LINK_STORE='partitioned',
+                               LINK_PARTITIONS=4,
+                               LINK_PARTITION_DIR=self.tmpdir)
+        super().setUp()
+        self.user = self.create_user()
+        self.paths = [f'link{i:02d}' for i in range(20)]
+        with self.flask_app.app_context():
+            self.assertEqual(get_store().create_many(
+                [(path, f'https://example.com/{path}', self.user.id) for path in self.paths]), [True] * 20)
+    
+    def tearDown(self):
+        self.flask_app.extensions['link_store'].close()
+        super().tearDown()
+        shutil.rmtree(self.tmpdir)
+    
+    def partition_contents(self, paths):
+        contents = []
+        for path in paths:
+            conn = sqlite3.connect(path)
+            contents.append(sorted(row[0] for row in conn.execute('SELECT short_path FROM go_link')))
+            conn.close()
+        return contents
+    
+    def test_links_are_routed_by_hash(self):
+        """Test that each link is stored in, and resolved from, its own partition only."""
+        with self.flask_app.app_context():
+            store = get_store()
+            self.assertIsInstance(store, PartitionedLinkStore)
+            self.assertFalse(store.create('link03', 'https://other.example.com', self.user.id))
+            self.assertEqual(store.resolve('link03'), 'https://example.com/link03')
+            self.assertIsNone(store.resolve('missing'))
+            self.assertEqual(GoLink.query.count(), 0)
+        contents = self.partition_contents(partition_paths(self.tmpdir, 4))
+        self.assertTrue(all(contents))
+        for index, paths in enumerate(contents):
+            self.assertTrue(all(partition_index(path, 4) == index for path in paths))
+        self.assertEqual(sorted(sum(contents, [])), self.paths)
+    
+    def test_search_merges_partitions(self):
+        """Test that list pages are merged across partitions in short_path order."""
+        with self.flask_app.app_context():
+            store = get_store()
+            pages = [store.search(page=page, per_page=6) for page in (1, 2, 3, 4)]
+            self.assertEqual([l.short_path for p in pages for l in p.items], self.paths)
+            self.assertEqual((pages[0].total, pages[0].pages), (20, 4))
+            self.assertEqual([l.short_path for l in store.search(q='link1', per_page=3, page=2).items],
+                             ['link13', 'link14', 'link15'])
+            self.assertEqual([row[0] for row in store.iter_links()], self.paths)
+            self.assertEqual(store.search(user_id=self.user.id + 1).total, 0)
+    
+    def test_edits_and_views(self):
+        """Test editing, deleting and listing links through the UI."""
+        self.login()
+        rv = self.app.get('/links')
+        self.assertIn(b'link00', rv.data)
+        self.assertIn(b'testuser', rv.data)
+        self.app.post('/edit/link07', data={'target_url': 'https://new.example.com'})
+        self.app.post('/links/link08/delete')
+        self.assertEqual(self.app.get('/link07').location, 'https://new.example.com')
+        self.assertIn('/create', self.app.get('/link08').location)
+        with self.flask_app.app_context():
+            self.assertEqual(get_store().link_counts([self.user.id]), {self.user.id: 19})
+    
+    def test_short_paths_across_partitions(self):
+        """Test that new links come from every partition, and a deletion in one reloads all."""
+        with self.flask_app.app_context():
+            store = get_store()
+            paths, marker, complete = store.short_paths()
+            self.assertEqual((sorted(paths), complete), (self.paths, True))
+            store.create_many([('new-a', 'https://a.example.com', self.user.id),
+                               ('new-b', 'https://b.example.com', self.user.id)])
+            self.assertNotEqual(partition_index('new-a', 4), partition_index('new-b', 4))
+            paths, marker, complete = store.short_paths(marker)
+            self.assertEqual((sorted(paths), complete), (['new-a', 'new-b'], False))
+            store.delete(store.get('link00'))
+            paths, marker, complete = store.short_paths(marker)
+            self.assertEqual((len(paths), complete), (21, True))
+    
+    def test_cross_partition_target_lookups(self):
+        """Test reverse lookups, duplicates and rewrites across partitions."""
+        with self.flask_app.app_context():
+            store = get_store()
+            store.create('same-a', 'https://Shared.example.com/x', self.user.id)
+            store.create('same-b', 'https://shared.example.com/x', self.user.id)
+            self.assertNotEqual(partition_index('same-a', 4), partition_index('same-b', 4))
+            self.assertEqual(store.duplicate_targets(), [('https://shared.example.com/x', ['same-a', 'same-b'])])
+            self.assertEqual([l.short_path for l in store.links_for_url('https://shared.example.com/x')],
+                             ['same-a', 'same-b'])
+            self.assertEqual(store.rewrite_host('example.com', 'example.org'), 20)
+            self.assertEqual(store.resolve('link19'), 'https://example.org/link19')
+            self.assertEqual(len(store.links_with_prefix('https://example.org/link1')), 10)
+    
+    def test_usage_reports_cover_partitions(self):
+        """Test that top, popular and unused links are found in every partition."""
+        with self.flask_app.app_context():
+            today = datetime.now(timezone.utc).date()
+            db.session.add_all([LinkDailyHits(short_path=path, day=today, hits=hits)
+                                for path, hits in (('link03', 5), ('link07', 9), ('link10', 5), ('gone', 50))])
+            db.session.commit()
+            self.assertEqual(len({partition_index(path, 4) for path in ('link03', 'link07', 'link10')}), 3)
+            self.assertEqual(top_links(30), [('link07', 9), ('link03', 5), ('link10', 5)])
+            self.assertEqual(top_links(30, limit=2), [('link07', 9), ('link03', 5)])
+            self.assertEqual(popular_links(30, limit=1), [('link07', 'https://example.com/link07', 9)])
+            unused = unused_links(30, limit=5)
+            self.assertEqual([l.short_path for l in unused], ['link00', 'link01', 'link02', 'link04', 'link05'])
+            self.assertEqual(unused[0].creator.username, 'testuser')
+    
+    def test_rebalance(self):
+        """Test that rebalancing moves every link to its partition in the new layout."""
+        with self.flask_app.app_context():
+            get_store().rewrite_host('example.com', 'example.org')
+        targets = partition_paths(self.tmpdir, 3)
+        self.assertEqual(rebalance_partitions(partition_paths(self.tmpdir, 4), targets), 20)
+        contents = self.partition_contents(targets)
+        for index, paths in enumerate(contents):
+            self.assertTrue(all(partition_index(path, 3) == index for path in paths))
+        self.assertEqual(sorted(sum(contents, [])), self.paths)
+        self.assertFalse([name for name in os.listdir(self.tmpdir) if '.tmp-' in name])
+        
+        app = create_app(dict(self.app_config, LINK_PARTITIONS=3,
+                              SQLALCHEMY_DATABASE_URI=f'sqlite:///{self.db_path}'))
+        with app.app_context():
+            store = get_store()
+            self.assertEqual(store.resolve('link05'), 'https://example.org/link05')
+            self.assertEqual(store.get('link05').creator.username, 'testuser')
+            store.close()
+    
+    def test_rebalance_from_database(self):
+        """Test moving the links of a plain database into partitions."""
+        with self.flask_app.app_context():
+            db.session.add(GoLink(short_path='legacy', target_url='https://legacy.example.com', user_id=self.user.id))
+            db.session.commit()
+        targets = partition_paths(self.tmpdir, 2)
+        self.assertEqual(rebalance_partitions([self.db_path], targets), 1)
+        self.assertEqual(sum(self.partition_contents(targets), []), ['legacy'])
+
+
+class TestCreateApp(unittest.TestCase):
+    """Test the application factory."""
+    
+    def test_unknown_store_is_rejected(self):
+        """Test that a misconfigured LINK_STORE fails at startup."""
+        with self.assertRaises(ValueError):
+            create_app({'LINK_STORE': 'nope', 'SECRET_KEY': 'test'})
+    
+    def test_apps_are_independent(self):
+        """Test that each app gets its own configuration."""
+        first = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'SECRET_KEY': 'test'})
+        second = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'SECRET_KEY': 'test', 'PAGE_CACHE_SIZE': 7})
+        self.assertEqual(second.config['PAGE_CACHE_SIZE'], 7)
+        self.assertNotEqual(first.config['PAGE_CACHE_SIZE'], 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from tests.base import BaseTestCase
+from extensions import db, link_cache
+from models import LinkDailyHits
+from storage import SnapshotLinkStore, export_snapshot, get_store
+from suggest import SuggestionIndex
+
+
+class TestSuggestionIndex(unittest.TestCase):
+    """Test prefix lookups in the in-memory index."""
+
+    def setUp(self):
+        self.index = SuggestionIndex(limit=3)
+        self.index.replace(['wiki', 'docs', 'dogs', 'do', 'docs/api', 'dash'])
+
+    def test_prefix_matches_in_short_path_order(self):
+        """Test that unranked matches come in short_path order, up to the limit."""
+        self.assertEqual(self.index.suggest('do'), ['do', 'docs', 'docs/api'])
+        self.assertEqual(self.index.suggest('do', limit=10), ['do', 'docs', 'docs/api', 'dogs'])
+        self.assertEqual(self.index.suggest('docs/'), ['docs/api'])
+        self.assertEqual(self.index.suggest('x'), [])
+        self.assertEqual(self.index.suggest(''), ['dash', 'do', 'docs'])
+        self.index.add(['w\U0010ffff', 'w\U0010ffffx'])
+        self.assertEqual(self.index.suggest('w\U0010ffff'), ['w\U0010ffff', 'w\U0010ffffx'])
+        self.assertEqual(self.index.suggest('\U0010ffff'), [])
+
+    def test_ranked_by_hits(self):
+        """Test that more used links come first, and ties stay in short_path order."""
+        self.index.rank([('dogs', 50), ('docs/api', 7), ('gone', 3)])
+        self.assertEqual(self.index.suggest('do'), ['dogs', 'docs/api', 'do'])
+        self.assertEqual(self.index.suggest('d'), ['dogs', 'docs/api', 'dash'])
+
+    def test_large_ranges_use_ranked_links(self):
+        """Test that prefixes matching many links are ranked the same way, skipping deleted links."""
+        self.index.replace(f'p{i:04d}' for i in range(2000))
+        self.index.rank([('p9999', 20), ('p1500', 9), ('p0042', 4), ('q', 2)])
+        self.assertEqual(self.index.suggest('p'), ['p1500', 'p0042', 'p0000'])
+        self.assertEqual(self.index.suggest('p15'), ['p1500', 'p1501', 'p1502'])
+        self.index.add(['p'])
+        self.assertEqual(self.index.suggest('p'), ['p1500', 'p0042', 'p'])
+        # With more ranked matches than SCAN_LIMIT, they are walked most used first
+        self.index.SCAN_LIMIT = 1
+        self.assertEqual(self.index.suggest('p'), ['p1500', 'p0042', 'p'])
+        self.assertEqual(self.index.suggest('p00', limit=2), ['p0042', 'p0000'])
+
+    def test_add_merges_in_order(self):
+        """Test that added paths are merged into place, once each."""
+        self.index.add(['doc', 'zebra', 'docs'])
+        self.assertEqual(self.index.suggest('doc', limit=10), ['doc', 'docs', 'docs/api'])
+        self.assertEqual(len(self.index), 8)
+        self.index.add(f'z{i}' for i in range(100))
+        self.assertEqual(len(self.index), 108)
+        self.assertEqual(self.index.suggest('ze'), ['zebra'])
+
+
+class TestSuggestEndpoint(BaseTestCase):
+    """Test the OpenSearch suggestions API and descriptor."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.index = self.flask_app.extensions['suggestions']
+        with self.flask_app.app_context():
+            get_store().create_many([(path, f'https://{path}.example.com', self.user.id)
+                                     for path in ('docs', 'dogs', 'design', 'wiki')])
+            db.session.add(LinkDailyHits(short_path='dogs', day=datetime.now(timezone.utc).date(), hits=12))
+            db.session.commit()
+
+    def tearDown(self):
+        self.index.stop()
+        super().tearDown()
+
+    def suggest(self, q):
+        rv = self.app.get('/api/suggest', query_string={'q': q})
+        self.assertEqual(rv.mimetype, 'application/x-suggestions+json')
+        return json.loads(rv.data)
+
+    def test_suggestions_are_ranked_by_hits(self):
+        """Test that the response is [query, completions], most used first."""
+        self.login()
+        self.assertEqual(self.suggest('d'), ['d', ['dogs', 'design', 'docs']])
+        self.assertEqual(self.suggest('wi'), ['wi', ['wiki']])
+        self.assertEqual(self.suggest('nothing'), ['nothing', []])
+        self.assertEqual(self.suggest('\U0010ffff'), ['\U0010ffff', []])
+
+    def test_anonymous_requests_get_no_completions(self):
+        """Test that suggestions need a login unless SUGGEST_PUBLIC is set."""
+        self.assertEqual(self.suggest('d'), ['d', []])
+        self.flask_app.config['SUGGEST_PUBLIC'] = True
+        self.assertEqual(self.suggest('d'), ['d', ['dogs', 'design', 'docs']])
+
+    def test_link_writes_are_picked_up(self):
+        """Test that the index catches up with created and deleted links."""
+        self.login()
+        self.assertEqual(self.suggest('do'), ['do', ['dogs', 'docs']])
+        with self.flask_app.app_context():
+            store = get_store()
+            store.create('dot', 'https://dot.example.com', self.user.id)
+            self.index.refresh()
+            self.assertEqual(self.suggest('do'), ['do', ['dogs', 'docs', 'dot']])
+            store.delete(store.get('docs'))
+            self.index.refresh()
+        self.assertEqual(self.suggest('do'), ['do', ['dogs', 'dot']])
+
+    def test_held_links_are_left_out(self):
+        """Test that links outside their schedule aren't suggested."""
+        self.login()
+        self.assertEqual(self.suggest('des'), ['des', ['design']])
+        link_cache.hold(['design'])
+        self.assertEqual(self.suggest('des'), ['des', []])
+
+    def test_replica_stores_follow_the_database(self):
+        """Test that with a snapshot store, links are picked up without a new export."""
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        snapshot_path = os.path.join(tmpdir, 'links.snapshot')
+        with self.flask_app.app_context():
+            export_snapshot(get_store(), snapshot_path)
+            self.flask_app.extensions['link_store'] = SnapshotLinkStore(snapshot_path, get_store())
+            self.index.refresh()
+            get_store().create('dot', 'https://dot.example.com', self.user.id)
+            self.index.refresh()
+        self.assertEqual(self.index.suggest('dot'), ['dot'])
+
+    def test_opensearch_descriptor(self):
+        """Test that the descriptor points at redirects and suggestions, and pages link to it."""
+        rv = self.app.get('/opensearch.xml')
+        self.assertEqual(rv.mimetype, 'application/opensearchdescription+xml')
+        self.assertIn(b'template="http://localhost/{searchTerms}"', rv.data)
+        self.assertIn(b'template="http://localhost/api/suggest?q={searchTerms}"', rv.data)
+        rv = self.app.get('/login')
+        self.assertIn(b'rel="search" type="application/opensearchdescription+xml"', rv.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import threading
+import unittest
+from contextlib import contextmanager
+from sqlalchemy import event
+from tests.base import BaseTestCase
+from extensions import db
+from models import GoLink, User
+
+
+class TestRaceFreeInserts(BaseTestCase):
+    """Test that creates rely on unique constraints rather than check-then-insert."""
+    
+    @contextmanager
+    def count_statements(self):
+        statements = []
+        
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        with self.flask_app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+    
+    def post_concurrently(self, path, forms, login=None):
+        """POST each form from its own client at the same moment; return the statuses."""
+        clients = []
+        for _ in forms:
+            client = self.flask_app.test_client()
+            if login:
+                client.post('/login', data={'username': login, 'password': 'testpass'})
+            clients.append(client)
+        statuses = [None] * len(forms)
+        barrier = threading.Barrier(len(forms))
+        
+        def worker(i):
+            barrier.wait()
+            statuses[i] = clients[i].post(path, data=forms[i]).status_code
+        
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(forms))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return statuses
+    
+    def test_concurrent_link_creation_has_one_winner(self):
+        """Test that racing creates of one short path never produce a 500."""
+        self.create_user()
+        forms = [{'short_path': 'race', 'target_url': f'https://example.com/{i}'} for i in range(8)]
+        statuses = self.post_concurrently('/create', forms, login='testuser')
+        # Winners are redirected to /links, losers re-rendered with a flash
+        self.assertEqual(statuses.count(302), 1)
+        self.assertEqual(statuses.count(200), 7)
+        with self.flask_app.app_context():
+            self.assertEqual(GoLink.query.filter_by(short_path='race').count(), 1)
+    
+    def test_concurrent_registration_has_one_winner(self):
+        """Test that racing registrations of one username never produce a 500."""
+        forms = [{'username': 'racer', 'password': 'pw'} for _ in range(8)]
+        statuses = self.post_concurrently('/register', forms)
+        self.assertEqual(statuses.count(302), 1)
+        self.assertEqual(statuses.count(200), 7)
+        with self.flask_app.app_context():
+            self.assertEqual(User.query.count(), 1)
+            self.assertTrue(User.query.first().is_admin)
+    
+    def test_create_link_is_a_single_insert(self):
+        """Test that creating a link touches go_link exactly once."""
+        self.create_user()
+        self.login()
+        with self.count_statements() as statements:
+            self.app.post('/create', data={'short_path': 'one', 'target_url': 'https://example.com'})
+        link_statements = [s for s in statements if 'go_link' in s]
+        self.assertEqual(len(link_statements), 1)
+        self.assertIn('ON CONFLICT', link_statements[0])
+    
+    def test_duplicate_link_is_a_single_insert(self):
+        """Test that a taken short path is detected by the insert itself."""
+        self.create_user()
+        self.login()
+        self.app.post('/create', data={'short_path': 'one', 'target_url': 'https://example.com'})
+        with self.count_statements() as statements:
+            rv = self.app.post('/create', data={'short_path': 'one', 'target_url': 'https://example.com'})
+        self.assertIn(b'This short path is already taken', rv.data)
+        self.assertEqual(len([s for s in statements if 'go_link' in s]), 1)
+    
+    def test_register_is_a_single_insert(self):
+        """Test that registration checks uniqueness and first-user status in one statement."""
+        with self.count_statements() as statements:
+            self.app.post('/register', data={'username': 'first', 'password': 'pw'})
+        user_statements = [s for s in statements if 'user' in s.lower() and 'cache_generation' not in s]
+        self.assertEqual(len(user_statements), 1)
+        self.assertTrue(user_statements[0].startswith('INSERT'))
+
+
+if __name__ == '__main__':
+    unittest.main()
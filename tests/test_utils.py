@@ -1,5 +1,5 @@
 import unittest
-from app import is_valid_url
+from utils import is_valid_url, normalize_url, prefix_upper_bound, url_hash
 
 
 class TestUtilityFunctions(unittest.TestCase):
@@ -66,6 +66,46 @@ class TestUtilityFunctions(unittest.TestCase):
             self.assertFalse(result)
         except:
             self.fail("is_valid_url should handle non-string input gracefully")
+    
+    def test_normalize_url(self):
+        """Test that equivalent spellings of a URL normalize to the same string."""
+        cases = [
+            ("HTTPS://Example.COM", "https://example.com/"),
+            ("https://example.com:443/a", "https://example.com/a"),
+            ("http://example.com:8080/a", "http://example.com:8080/a"),
+            ("http://bücher.de/", "http://xn--bcher-kva.de/"),
+            ("https://example.com/a b/%7euser/%c3%a9", "https://example.com/a%20b/~user/%C3%A9"),
+            ("https://example.com/?b=2&a=1&a=0", "https://example.com/?a=1&a=0&b=2"),
+            ("https://example.com/Path#Frag", "https://example.com/Path#Frag"),
+            ("  https://example.com/x  ", "https://example.com/x"),
+        ]
+        for url, expected in cases:
+            with self.subTest(url=url):
+                self.assertEqual(normalize_url(url), expected)
+    
+    def test_normalize_url_rejects_invalid_urls(self):
+        """Test that invalid URLs raise ValueError."""
+        for url in ["example.com", "http://", "http://a..b/", "http://example.com:99999"]:
+            with self.subTest(url=url):
+                with self.assertRaises(ValueError):
+                    normalize_url(url)
+    
+    def test_url_hash(self):
+        """Test that the URL hash is a stable signed 64-bit integer."""
+        value = url_hash("https://example.com/")
+        self.assertEqual(value, url_hash("https://example.com/"))
+        self.assertNotEqual(value, url_hash("https://example.com/a"))
+        self.assertTrue(-2**63 <= value < 2**63)
+    
+    def test_prefix_upper_bound(self):
+        """Test the exclusive upper bound of a prefix range, including at the end of Unicode."""
+        self.assertEqual(prefix_upper_bound('abc'), 'abd')
+        self.assertEqual(prefix_upper_bound('a\U0010ffff'), 'b')
+        self.assertEqual(prefix_upper_bound('a\ud7ff'), 'a\ue000')
+        self.assertIsNone(prefix_upper_bound(''))
+        self.assertIsNone(prefix_upper_bound('\U0010ffff\U0010ffff'))
+        for s in ['a\U0010ffffz', 'a\U0010ffff\U0010ffff']:
+            self.assertTrue('a\U0010ffff' <= s < prefix_upper_bound('a\U0010ffff'))
 
 
 if __name__ == '__main__':
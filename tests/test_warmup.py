@@ -0,0 +1,121 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from sqlalchemy import inspect, text
+from tests.base import BaseTestCase
+from extensions import db, link_cache
+from models import GoLink, LinkDailyHits
+from warmup import backfill_canonical_urls, ensure_schema, precompile_templates, warm_start
+
+
+class TestWarmStart(BaseTestCase):
+    """Test startup warming of templates, schema and the link cache."""
+    
+    def add_link(self, short_path, target_url='https://example.com'):
+        user = self.create_user()
+        with self.flask_app.app_context():
+            db.session.add(GoLink(short_path=short_path, target_url=target_url, user_id=user.id))
+            db.session.commit()
+    
+    def test_warm_start_fills_link_cache(self):
+        """Test that existing links are cached before the first request."""
+        self.add_link('warm')
+        link_cache.clear()
+        warm_start(self.flask_app)
+        self.assertIn('warm', link_cache)
+        rv = self.app.get('/warm')
+        self.assertEqual(rv.location, 'https://example.com')
+        self.assertEqual(link_cache.hits, 1)
+    
+    def test_warm_start_prefers_popular_links(self):
+        """Test that links with the most logged redirects are cached first."""
+        user = self.create_user()
+        with self.flask_app.app_context():
+            for short_path in ('a', 'b', 'c', 'popular'):
+                db.session.add(GoLink(short_path=short_path, target_url='https://example.com', user_id=user.id))
+            db.session.add(LinkDailyHits(short_path='popular', day=datetime.now(timezone.utc).date(), hits=40))
+            db.session.commit()
+        link_cache.clear()
+        link_cache.max_entries = 2
+        try:
+            warm_start(self.flask_app)
+            self.assertEqual(len(link_cache), 2)
+            self.assertIn('popular', link_cache)
+            self.assertIn('a', link_cache)
+            self.assertGreater(link_cache.popularity.estimate('popular'), 1)
+        finally:
+            link_cache.max_entries = self.flask_app.config['LINK_CACHE_SIZE']
+    
+    def test_precompile_writes_bytecode_cache(self):
+        """Test that templates are compiled into the on-disk bytecode cache."""
+        cache_dir = tempfile.mkdtemp()
+        env = self.flask_app.jinja_env
+        saved_cache = env.bytecode_cache
+        self.flask_app.config['TEMPLATE_BYTECODE_CACHE_DIR'] = cache_dir
+        env.bytecode_cache = None
+        env.cache.clear()
+        try:
+            count = precompile_templates(self.flask_app)
+            self.assertEqual(count, len(env.list_templates(extensions=['html'])))
+            self.assertEqual(len(os.listdir(cache_dir)), count)
+        finally:
+            env.bytecode_cache = saved_cache
+            self.flask_app.config['TEMPLATE_BYTECODE_CACHE_DIR'] = None
+            shutil.rmtree(cache_dir)
+    
+    def test_ensure_schema_adds_missing_columns(self):
+        """Test that columns added to a model after table creation are created."""
+        with self.flask_app.app_context():
+            db.session.execute(text('ALTER TABLE user DROP COLUMN is_admin'))
+            db.session.commit()
+            added = ensure_schema(db)
+            self.assertEqual(added, ['user.is_admin'])
+            columns = {c['name'] for c in inspect(db.engine).get_columns('user')}
+            self.assertIn('is_admin', columns)
+    
+    def test_backfill_canonical_urls(self):
+        """Test that links stored before normalization existed get canonical URLs."""
+        user = self.create_user()
+        with self.flask_app.app_context():
+            db.session.add(GoLink(short_path='old', target_url='HTTPS://Example.com', user_id=user.id))
+            db.session.add(GoLink(short_path='bad', target_url='not a url', user_id=user.id))
+            db.session.commit()
+            db.session.execute(text('UPDATE go_link SET canonical_url = NULL, url_hash = NULL'))
+            db.session.commit()
+            self.assertEqual(backfill_canonical_urls(db, batch_size=1), 1)
+            link = GoLink.query.filter_by(short_path='old').one()
+            self.assertEqual(link.canonical_url, 'https://example.com/')
+            self.assertIsNotNone(link.url_hash)
+
+
+class TestRedirectCache(BaseTestCase):
+    """Test the per-worker redirect cache."""
+    
+    def test_second_redirect_is_cached(self):
+        """Test that a resolved link is served from the cache afterwards."""
+        user = self.create_user()
+        with self.flask_app.app_context():
+            db.session.add(GoLink(short_path='test', target_url='https://example.com', user_id=user.id))
+            db.session.commit()
+        self.app.get('/test')
+        rv = self.app.get('/test')
+        self.assertEqual(rv.location, 'https://example.com')
+        self.assertEqual(link_cache.hits, 1)
+    
+    def test_edit_invalidates_cached_redirect(self):
+        """Test that editing a link is reflected by the next redirect."""
+        user = self.create_user()
+        self.login()
+        with self.flask_app.app_context():
+            db.session.add(GoLink(short_path='test', target_url='https://example.com', user_id=user.id))
+            db.session.commit()
+        self.app.get('/test')
+        self.app.post('/edit/test', data={'target_url': 'https://updated.com'})
+        rv = self.app.get('/test')
+        self.assertEqual(rv.location, 'https://updated.com')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import hashlib
+import re
+from functools import lru_cache
+from urllib.parse import parse_qsl, quote, urlencode, urlsplit, urlunsplit
+
+DEFAULT_PORTS = {'http': 80, 'https': 443, 'ftp': 21}
+
+# Characters left as they are in paths; everything else is percent-encoded
+PATH_SAFE = "/%:@!$&'()*+,;=~"
+UNRESERVED = re.compile(r'%(2[DdEe]|3[0-9]|[46][1-9A-Fa-f]|[57][0-9Aa]|5[Ff]|7[Ee])')
+ESCAPE = re.compile(r'%[0-9a-fA-F]{2}')
+
+
+@lru_cache(maxsize=4096)
+def normalize_url(url):
+    """
+    Return the canonical form of ``url``, or raise ValueError if it isn't a
+    valid absolute URL.
+
+    Scheme and host are lower-cased, hosts are IDNA-encoded, default ports
+    are dropped, an empty path becomes "/", percent-escapes are upper-cased
+    (and decoded where they stand for unreserved characters), and query
+    parameters are sorted by name. The fragment is kept as is. Memoized, so
+    validating a URL and then storing it only parses it once.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = parts.hostname
+    if not scheme or not host:
+        raise ValueError(f'not an absolute URL: {url!r}')
+    try:
+        host = host.encode('idna').decode('ascii')
+    except UnicodeError:
+        raise ValueError(f'invalid host name in {url!r}') from None
+    if ':' in host:
+        host = f'[{host}]'
+    port = parts.port  # raises ValueError for a bad port
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        host = f'{host}:{port}'
+    userinfo, _, _ = parts.netloc.rpartition('@')
+    netloc = f'{userinfo}@{host}' if userinfo else host
+
+    path = quote(parts.path, safe=PATH_SAFE) or '/'
+    path = UNRESERVED.sub(lambda m: chr(int(m.group(1), 16)), path)
+    path = ESCAPE.sub(lambda m: m.group(0).upper(), path)
+    params = parse_qsl(parts.query, keep_blank_values=True)
+    query = urlencode(sorted(params, key=lambda item: item[0]), quote_via=quote)
+    return urlunsplit((scheme, netloc, path, query, parts.fragment))
+
+
+def canonical_host(canonical_url):
+    """The host of a normalized URL as it appears in it, without userinfo or port."""
+    host = urlsplit(canonical_url).netloc.rpartition('@')[2]
+    if host.startswith('['):
+        return host[:host.index(']') + 1]
+    return host.partition(':')[0]
+
+
+def normalize_host(host):
+    """Normalize a bare host name the way ``normalize_url`` does. Raises ValueError."""
+    host = host.strip()
+    if not host or any(c in host for c in '/?#@'):
+        raise ValueError(f'not a host name: {host!r}')
+    return canonical_host(normalize_url(f'http://{host}/'))
+
+
+def url_hash(canonical_url):
+    """64-bit hash of a canonical URL, for indexed equality lookups."""
+    digest = hashlib.blake2b(canonical_url.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+def prefix_upper_bound(prefix):
+    """
+    The smallest string above every string starting with ``prefix``, so
+    that ``prefix <= s < bound`` selects them with an index range scan
+    rather than LIKE 'prefix%'. None when there is no such string (an empty
+    prefix, or one of U+10FFFF only): then only ``prefix <= s`` applies.
+    """
+    stripped = prefix.rstrip('\U0010ffff')
+    if not stripped:
+        return None
+    bumped = ord(stripped[-1]) + 1
+    # Surrogates can't be encoded for SQLite, and UTF-8 sorts by code point,
+    # so the next character after U+D7FF is U+E000
+    if 0xD800 <= bumped <= 0xDFFF:
+        bumped = 0xE000
+    return stripped[:-1] + chr(bumped)
+
+
+def is_valid_url(url):
+    if not isinstance(url, str):
+        return False
+    try:
+        normalize_url(url)
+    except ValueError:
+        return False
+    return True
+
+
+def hash_password(password, method=None):
+    # PASSWORD_HASH_METHOD lets tests trade hash strength for speed. Flask is
+    # imported here so manage.py can use the URL helpers without loading it.
+    from flask import current_app
+    from werkzeug.security import generate_password_hash
+    return generate_password_hash(password, method=method or current_app.config['PASSWORD_HASH_METHOD'])
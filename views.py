@@ -0,0 +1,430 @@
+import json
+import os
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import Blueprint, Response, current_app, render_template, redirect, request, flash, url_for, jsonify
+from flask_login import login_user, login_required, logout_user, current_user
+from markupsafe import Markup
+from werkzeug.security import check_password_hash
+
+from access_log import top_links, unused_links
+from extensions import db, fragment_cache, link_cache, link_schedule
+from load_shedding import expensive, priority
+from models import User, current_generations, insert_user
+from profiler import ProfilerBusy, collapsed
+from storage import add_link, get_store
+from utils import hash_password, is_valid_url
+
+main = Blueprint('main', __name__)
+
+def admin_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not current_user.is_authenticated or not current_user.is_admin:
+            flash('Admin access required')
+            return redirect(url_for('main.view_links'))
+        return f(*args, **kwargs)
+    return decorated_function
+
+def admin_api_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not current_user.is_authenticated or not current_user.is_admin:
+            return jsonify(error='Admin access required'), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+def viewer_scope():
+    # Admins all see the same controls on every row, so they can share cached
+    # fragments. Everyone else gets their own entries.
+    return 'admin' if current_user.is_admin else current_user.id
+
+SCHEDULE_FIELDS = ('not_before', 'expires_at')
+
+def schedule_fields(form):
+    # Echo the submitted schedule back into a re-rendered form
+    return {name: form.get(name, '') for name in SCHEDULE_FIELDS}
+
+def format_schedule_time(value):
+    # The value format of <input type="datetime-local">
+    return value.strftime('%Y-%m-%dT%H:%M') if value else ''
+
+def schedule_from_form(form):
+    """Return the optional (not_before, expires_at) fields as naive UTC, or raise ValueError."""
+    times = []
+    for name in SCHEDULE_FIELDS:
+        value = form.get(name, '').strip()
+        if not value:
+            times.append(None)
+            continue
+        try:
+            when = datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError('Please enter times as YYYY-MM-DD HH:MM (UTC)') from None
+        if when.tzinfo is not None:
+            when = when.astimezone(timezone.utc).replace(tzinfo=None)
+        times.append(when)
+    not_before, expires_at = times
+    if not_before and expires_at and expires_at <= not_before:
+        raise ValueError('The expiry time must be after the start time')
+    return not_before, expires_at
+
+@main.route('/')
+def index():
+    if current_user.is_authenticated:
+        return redirect(url_for('main.view_links'))
+    return redirect(url_for('main.login'))
+
+@main.route('/<path:short_path>')
+@priority
+def redirect_link(short_path):
+    target_url = link_cache.get(short_path)
+    if target_url is None:
+        target_url = get_store().resolve(short_path)
+        if target_url:
+            link_cache.set(short_path, target_url)
+    if target_url:
+        access_log = current_app.extensions.get('access_log')
+        if access_log is not None:
+            access_log.record(short_path)
+        return redirect(target_url)
+    return redirect(url_for('main.create_link', shortlink=short_path))
+
+@main.route('/create', methods=['GET', 'POST'])
+@login_required
+def create_link():
+    # Get short_path from query parameter or form data
+    short_path = request.args.get('shortlink') or request.form.get('short_path')
+    
+    if request.method == 'POST':
+        target_url = request.form.get('target_url')
+        
+        if not short_path or not target_url:
+            flash('Both short path and target URL are required')
+            return render_template('create_link.html', short_path=short_path or '', target_url=target_url or '')
+        
+        if not is_valid_url(target_url):
+            flash('Please enter a valid URL (including http:// or https://)')
+            return render_template('create_link.html', short_path=short_path, target_url=target_url)
+        
+        try:
+            not_before, expires_at = schedule_from_form(request.form)
+        except ValueError as exc:
+            flash(str(exc))
+            return render_template('create_link.html', short_path=short_path, target_url=target_url,
+                                   **schedule_fields(request.form))
+        
+        if not add_link(short_path, target_url, current_user.id, not_before, expires_at):
+            flash('This short path is already taken')
+            return render_template('create_link.html', short_path=short_path, target_url=target_url,
+                                   **schedule_fields(request.form))
+        if not_before or expires_at:
+            link_schedule.reload()
+        
+        flash('Link created successfully')
+        return redirect(url_for('main.view_links'))
+    
+    return render_template('create_link.html', short_path=short_path or '')
+
+@main.route('/edit/<path:short_path>', methods=['GET', 'POST'])
+@login_required
+def edit_link(short_path):
+    existing_link = get_store().get(short_path)
+    
+    if not existing_link:
+        flash('Link not found')
+        return redirect(url_for('main.view_links'))
+    
+    if existing_link.user_id != current_user.id and not current_user.is_admin:
+        flash('You can only edit your own links')
+        return redirect(url_for('main.view_links'))
+    
+    if request.method == 'POST':
+        target_url = request.form.get('target_url')
+        if not target_url:
+            flash('Target URL is required')
+            return render_template('edit_link.html', short_path=short_path, target_url=target_url,
+                                   **schedule_fields(request.form))
+        
+        if not is_valid_url(target_url):
+            flash('Please enter a valid URL (including http:// or https://)')
+            return render_template('edit_link.html', short_path=short_path, target_url=target_url,
+                                   **schedule_fields(request.form))
+        
+        try:
+            not_before, expires_at = schedule_from_form(request.form)
+        except ValueError as exc:
+            flash(str(exc))
+            return render_template('edit_link.html', short_path=short_path, target_url=target_url,
+                                   **schedule_fields(request.form))
+        
+        get_store().update(existing_link, target_url, not_before, expires_at)
+        link_schedule.reload()
+        flash('Link updated successfully')
+        return redirect(url_for('main.view_links'))
+    
+    return render_template('edit_link.html', 
+                         short_path=short_path,
+                         target_url=existing_link.target_url,
+                         not_before=format_schedule_time(existing_link.not_before),
+                         expires_at=format_schedule_time(existing_link.expires_at))
+
+@main.route('/login', methods=['GET', 'POST'])
+def login():
+    if current_user.is_authenticated:
+        return redirect(url_for('main.view_links'))
+        
+    if request.method == 'POST':
+        username = request.form.get('username')
+        password = request.form.get('password')
+        user = User.query.filter_by(username=username).first()
+        
+        if user and check_password_hash(user.password_hash, password):
+            login_user(user)
+            return redirect(url_for('main.view_links'))
+        flash('Invalid username or password')
+    return render_template('login.html')
+
+@main.route('/register', methods=['GET', 'POST'])
+def register():
+    if request.method == 'POST':
+        username = request.form.get('username')
+        password = request.form.get('password')
+        
+        # The first user becomes an admin; decided in the same statement
+        is_first_user = insert_user(username, hash_password(password))
+        if is_first_user is None:
+            flash('Username already exists')
+            return render_template('register.html')
+        
+        if is_first_user:
+            flash('First user created with admin privileges')
+        return redirect(url_for('main.login'))
+    return render_template('register.html')
+
+@main.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    return redirect(url_for('main.index'))
+
+@main.route('/links')
+@expensive
+@login_required
+def view_links():
+    user_only = request.args.get('user_only', 'true').lower() == 'true'
+    page = request.args.get('page', 1, type=int)
+    per_page = 10
+    q = request.args.get('q', '').strip()
+    generations = current_generations()
+    owner = current_user.id if user_only else None
+    key = ('links', owner, q, page, get_store().list_generation(), generations['health'], viewer_scope())
+    results = fragment_cache.get(key)
+    if results is None:
+        pagination = get_store().search(owner, q, page, per_page)
+        links = pagination.items
+        results = render_template('_links_table.html', links=links, user_only=user_only,
+                                  pagination=pagination, q=q)
+        fragment_cache.set(key, results)
+    return render_template('links.html', results=Markup(results), user_only=user_only, q=q)
+
+@main.route('/links/<path:short_path>/delete', methods=['POST'])
+@login_required
+def delete_link(short_path):
+    link = get_store().get(short_path)
+    if not link:
+        flash('Link not found')
+        return redirect(url_for('main.view_links'))
+    
+    if link.user_id != current_user.id and not current_user.is_admin:
+        flash('You can only delete your own links')
+        return redirect(url_for('main.view_links'))
+    
+    get_store().delete(link)
+    flash('Link deleted successfully')
+    return redirect(url_for('main.view_links'))
+
+@main.route('/users', methods=['GET'])
+@expensive
+@login_required
+@admin_required
+def view_users():
+    page = request.args.get('page', 1, type=int)
+    per_page = 10
+    generations = current_generations()
+    # The link-count column depends on links too; rows for current_user differ
+    key = ('users', page, generations['users'], get_store().list_generation(), current_user.id)
+    results = fragment_cache.get(key)
+    if results is None:
+        pagination = User.query.order_by(User.username.asc()).paginate(page=page, per_page=per_page, error_out=False)
+        users = pagination.items
+        link_counts = get_store().link_counts([user.id for user in users])
+        results = render_template('_users_table.html', users=users, pagination=pagination,
+                                  link_counts=link_counts)
+        fragment_cache.set(key, results)
+    return render_template('users.html', results=Markup(results))
+
+@main.route('/users', methods=['POST'])
+@login_required
+@admin_required
+def create_user():
+    username = request.form.get('username')
+    password = request.form.get('password')
+    is_admin = request.form.get('is_admin') == 'on'
+
+    if insert_user(username, hash_password(password), is_admin) is None:
+        flash('Username already exists')
+        return redirect(url_for('main.view_users'))
+
+    flash('User created successfully')
+    return redirect(url_for('main.view_users'))
+
+@main.route('/users/<int:user_id>/delete', methods=['POST'])
+@login_required
+@admin_required
+def delete_user(user_id):
+    if user_id == current_user.id:
+        flash('You cannot delete your own account')
+        return redirect(url_for('main.view_users'))
+    
+    user = db.get_or_404(User, user_id)
+    db.session.delete(user)
+    db.session.commit()
+    flash('User deleted successfully')
+    return redirect(url_for('main.view_users'))
+
+@main.route('/users/<int:user_id>/toggle-admin', methods=['POST'])
+@login_required
+@admin_required
+def toggle_admin(user_id):
+    if user_id == current_user.id:
+        flash('You cannot modify your own admin status')
+        return redirect(url_for('main.view_users'))
+    
+    user = db.get_or_404(User, user_id)
+    user.is_admin = not user.is_admin
+    db.session.commit()
+    flash(f'User {"promoted to" if user.is_admin else "demoted from"} admin')
+    return redirect(url_for('main.view_users'))
+
+@main.route('/stats')
+@expensive
+@login_required
+@admin_required
+def view_stats():
+    days = max(1, request.args.get('days', 30, type=int))
+    return render_template('stats.html', days=days, top=top_links(days), unused=unused_links(days),
+                           logging_enabled='access_log' in current_app.extensions)
+
+@main.route('/admin/profile')
+@login_required
+@admin_required
+def profile_worker():
+    seconds = request.args.get('seconds', 10, type=float)
+    seconds = min(max(seconds, 0.01), current_app.config['PROFILE_MAX_SECONDS'])
+    try:
+        counts, samples = current_app.extensions['profiler'].profile(
+            seconds, all_threads=request.args.get('threads') == 'all')
+    except ProfilerBusy:
+        return Response('A profile is already running in this worker.\n', 409, mimetype='text/plain')
+    # Requests are spread over workers; the pid says which one this was
+    return Response(collapsed(counts), mimetype='text/plain',
+                    headers={'X-Profile-Samples': str(samples), 'X-Worker-Pid': str(os.getpid())})
+
+@main.route('/opensearch.xml')
+def opensearch():
+    return Response(render_template('opensearch.xml', root=url_for('main.index', _external=True)),
+                    mimetype='application/opensearchdescription+xml')
+
+@main.route('/api/suggest')
+@priority
+def suggest_links():
+    # OpenSearch suggestions format: [query, [completion, ...]]. Browsers
+    # send the session cookie with these requests; anyone else gets no
+    # completions, as they would list every short path prefix by prefix
+    q = request.args.get('q', '')
+    completions = []
+    if current_user.is_authenticated or current_app.config['SUGGEST_PUBLIC']:
+        completions = current_app.extensions['suggestions'].suggest(q)
+    return Response(json.dumps([q, completions]), mimetype='application/x-suggestions+json')
+
+# Reverse lookups by target: kind is 'host' or 'prefix'
+TARGET_LOOKUPS = {'host': 'links_for_host', 'prefix': 'links_with_prefix'}
+TARGET_REWRITES = {'host': 'rewrite_host', 'prefix': 'rewrite_prefix'}
+
+def find_links_by_target(kind, value):
+    """Raises ValueError for an unknown kind or an invalid host/prefix."""
+    if kind not in TARGET_LOOKUPS:
+        raise ValueError(f'Unknown lookup {kind!r}')
+    return getattr(get_store(), TARGET_LOOKUPS[kind])(value)
+
+def rewrite_links_by_target(kind, old, new):
+    if kind not in TARGET_REWRITES:
+        raise ValueError(f'Unknown rewrite {kind!r}')
+    return getattr(get_store(), TARGET_REWRITES[kind])(old, new)
+
+@main.route('/targets', methods=['GET'])
+@expensive
+@login_required
+@admin_required
+def view_targets():
+    kind = request.args.get('kind', 'host')
+    value = request.args.get('value', '').strip()
+    links = []
+    if value:
+        try:
+            links = find_links_by_target(kind, value)
+        except ValueError:
+            flash('Please enter a valid host name or URL prefix')
+    return render_template('targets.html', kind=kind, value=value, links=links,
+                           duplicates=get_store().duplicate_targets())
+
+@main.route('/targets/rewrite', methods=['POST'])
+@expensive
+@login_required
+@admin_required
+def rewrite_targets():
+    kind = request.form.get('kind', 'host')
+    old = request.form.get('value', '').strip()
+    new = request.form.get('new_value', '').strip()
+    try:
+        count = rewrite_links_by_target(kind, old, new)
+    except ValueError:
+        flash('Please enter a valid host name or URL prefix')
+        return redirect(url_for('main.view_targets', kind=kind, value=old))
+    flash(f'Rewrote {count} link{"" if count == 1 else "s"}')
+    return redirect(url_for('main.view_targets', kind=kind, value=new))
+
+def link_json(link):
+    return {'short_path': link.short_path, 'target_url': link.target_url,
+            'owner': link.creator.username,
+            'not_before': link.not_before and link.not_before.isoformat(),
+            'expires_at': link.expires_at and link.expires_at.isoformat()}
+
+@main.route('/api/targets', methods=['GET'])
+@expensive
+@admin_api_required
+def api_targets():
+    kind = next((kind for kind in TARGET_LOOKUPS if kind in request.args), None)
+    if kind is None:
+        return jsonify(error='Pass host or prefix'), 400
+    try:
+        links = find_links_by_target(kind, request.args[kind])
+    except ValueError as exc:
+        return jsonify(error=str(exc)), 400
+    return jsonify(links=[link_json(link) for link in links])
+
+@main.route('/api/targets/rewrite', methods=['POST'])
+@expensive
+@admin_api_required
+def api_rewrite_targets():
+    data = request.get_json(silent=True) or {}
+    kind = next((kind for kind in TARGET_REWRITES if kind in data), None)
+    if kind is None or not isinstance(data.get('to'), str):
+        return jsonify(error='Pass host or prefix, and to'), 400
+    try:
+        count = rewrite_links_by_target(kind, data[kind], data['to'])
+    except (ValueError, AttributeError) as exc:
+        return jsonify(error=str(exc)), 400
+    return jsonify(rewritten=count)
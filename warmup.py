@@ -0,0 +1,139 @@
+"""
+Startup work that would otherwise land on a worker's first requests.
+
+``warm_start(app)`` is run once per process before it accepts traffic: by
+gunicorn's ``post_worker_init`` hook (see gunicorn.conf.py) and by
+``python app.py``.
+"""
+
+import logging
+import time
+from itertools import islice
+
+from jinja2 import FileSystemBytecodeCache
+from sqlalchemy import bindparam, inspect, or_, select, text, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import configure_mappers
+from sqlalchemy.schema import CreateColumn
+
+from access_log import popular_links
+from extensions import db, link_cache
+from models import GoLink, canonical_url_fields
+from storage import get_store
+
+log = logging.getLogger(__name__)
+
+
+def ensure_schema(db):
+    """
+    Create missing tables, columns and indexes.
+
+    ``create_all`` only creates whole tables, so columns added to a model
+    after its table was created are added here with ALTER TABLE. Returns the
+    list of "table.column" names that were added.
+    """
+    try:
+        db.create_all()
+    except OperationalError:
+        # Another worker booting at the same time won the CREATE TABLE race
+        db.create_all()
+    inspector = inspect(db.engine)
+    added = []
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {ddl}'))
+                added.append(f'{table.name}.{column.name}')
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+    return added
+
+
+def backfill_canonical_urls(db, batch_size=1000):
+    """
+    Fill canonical_url, url_hash and target_host for links written before
+    those columns existed. Returns the number of links updated.
+    """
+    table = GoLink.__table__
+    stmt = update(table).where(table.c.id == bindparam('link_id')).values(
+        canonical_url=bindparam('canonical_url'), url_hash=bindparam('url_hash'),
+        target_host=bindparam('target_host'))
+    updated = 0
+    last_id = 0
+    while True:
+        with db.engine.begin() as conn:
+            rows = conn.execute(
+                select(table.c.id, table.c.target_url)
+                .where(or_(table.c.url_hash.is_(None), table.c.target_host.is_(None)),
+                       table.c.id > last_id)
+                .order_by(table.c.id).limit(batch_size)).all()
+            if not rows:
+                return updated
+            last_id = rows[-1].id
+            params = []
+            for row in rows:
+                fields = canonical_url_fields(row.target_url)
+                if fields['canonical_url'] is not None:
+                    params.append(dict(fields, link_id=row.id))
+            if params:
+                conn.execute(stmt, params)
+                updated += len(params)
+
+
+def warm_link_cache():
+    """
+    Fill the redirect cache, most-used links first.
+
+    Usage counts aggregated from the access log also seed the cache's
+    popularity sketch, so a new worker's admission decisions start out
+    knowing which links are hot. Remaining space is filled in short_path
+    order. Returns the number of links cached.
+    """
+    popular = popular_links(limit=link_cache.max_entries)
+    link_cache.seed_popularity((short_path, hits) for short_path, _, hits in popular)
+    link_cache.load((short_path, target_url) for short_path, target_url, _ in popular)
+    room = link_cache.max_entries - len(link_cache)
+    if room > 0:
+        rest = ((short_path, target_url) for short_path, target_url in get_store().iter_links()
+                if short_path not in link_cache)
+        link_cache.load(islice(rest, room))
+    return len(link_cache)
+
+
+def precompile_templates(app):
+    """Compile every template once, optionally persisting bytecode to disk."""
+    env = app.jinja_env
+    cache_dir = app.config.get('TEMPLATE_BYTECODE_CACHE_DIR')
+    if cache_dir and env.bytecode_cache is None:
+        env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    names = env.list_templates(extensions=['html'])
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+
+def warm_start(app):
+    """Configure mappers, compile templates, verify the schema and fill the link cache and suggestions."""
+    started = time.perf_counter()
+    configure_mappers()
+    templates = precompile_templates(app)
+    with app.app_context():
+        added = ensure_schema(db)
+        backfilled = backfill_canonical_urls(db)
+        link_cache.revalidate(force=True)
+        warm_link_cache()
+        suggestions = app.extensions['suggestions']
+        suggestions.refresh()
+        db.session.remove()
+    elapsed = time.perf_counter() - started
+    for column in added:
+        log.warning('Added missing column %s', column)
+    if backfilled:
+        log.info('Normalized target URLs of %d existing links', backfilled)
+    log.info('Warm start: %d templates, %d cached links, %d suggestions in %.1f ms',
+             templates, len(link_cache), len(suggestions), elapsed * 1000)
+    return elapsed